@@ -0,0 +1,117 @@
+"""
+Нагрузочный тест отдачи треков через /track/{id}.mp3.
+
+Поднимает в одном процессе имитацию хранилища Яндекс.Музыки и веб-приложение
+с маршрутом скачивания, затем скачивает трек параллельными клиентами.
+Сравнивается отдача из хранилища (без дискового кэша) и из дискового кэша
+при разных размерах блока. Пропускная способность на ядро считается как
+объем данных на секунду процессорного времени процесса, в котором работают
+и сервер, и клиенты, поэтому это оценка снизу.
+
+Запуск:
+    BOT_TOKEN=123:abc YANDEX_MUSIC_TOKEN=x WEBHOOK_HOST=https://x \\
+    PYTHONPATH=src python benchmarks/bench_track_stream.py [клиентов] [запросов]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from unittest.mock import AsyncMock
+
+from aiohttp import ClientSession, web
+
+from bot.config.config import config
+from bot.services.blob_cache import BlobCache
+from bot.services.http import http_client
+from bot.services.music import music_service
+from bot.web.routes import routes
+
+
+TRACK_SIZE = 8 * 1024 * 1024
+ID3_TAG = b'ID3\x03\x00\x00\x00\x00\x00\x14' + b'\x00' * 20
+TRACK_BODY = ID3_TAG + b'\xff\xfb\x90\x64' * (TRACK_SIZE // 4)
+
+
+async def storage_handler(request: web.Request) -> web.Response:
+    """Имитация хранилища: отдает один и тот же MP3 файл."""
+    return web.Response(body=TRACK_BODY, content_type='audio/mpeg')
+
+
+async def start_site(app: web.Application) -> tuple:
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f'http://127.0.0.1:{port}'
+
+
+async def fetch_all(base_url: str, clients: int, requests: int) -> int:
+    received = 0
+
+    async def client(session: ClientSession, count: int) -> None:
+        nonlocal received
+        for _ in range(count):
+            async with session.get(f'{base_url}/track/1.mp3') as response:
+                async for chunk in response.content.iter_chunked(256 * 1024):
+                    received += len(chunk)
+
+    async with ClientSession() as session:
+        await asyncio.gather(*(client(session, requests // clients) for _ in range(clients)))
+    return received
+
+
+async def run_case(name: str, base_url: str, clients: int, requests: int) -> None:
+    # Прогрев: соединения и, для кэша, заполнение файла
+    await fetch_all(base_url, 1, 1)
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    received = await fetch_all(base_url, clients, requests)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    mb = received / 1024 / 1024
+    print(f"{name:40s} {mb / wall:8.1f} МБ/с  {mb / cpu:8.1f} МБ/с на ядро")
+
+
+async def main() -> None:
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    storage = web.Application()
+    storage.router.add_get('/file.mp3', storage_handler)
+    storage_runner, storage_url = await start_site(storage)
+
+    app = web.Application()
+    app.add_routes(routes)
+    app_runner, app_url = await start_site(app)
+
+    music_service.get_track_full_info = AsyncMock(side_effect=lambda track_id: {
+        'id': track_id,
+        'title': 'Benchmark Track',
+        'artists': ['Benchmark Artist'],
+        'duration_ms': 180000,
+        'download_link': f'{storage_url}/file.mp3',
+        'bitrate': 320,
+    })
+    await http_client.start()
+
+    print(f"Трек {TRACK_SIZE // 1024 // 1024} МБ, клиентов: {clients}, запросов: {requests}")
+    with tempfile.TemporaryDirectory() as directory:
+        for chunk_size in (8 * 1024, 64 * 1024, 256 * 1024):
+            config.stream_chunk_size = chunk_size
+            music_service.blob_cache = BlobCache(directory, max_bytes=0)
+            await run_case(f"хранилище, блок {chunk_size // 1024} КБ", app_url, clients, requests)
+
+        for chunk_size in (8 * 1024, 64 * 1024, 256 * 1024):
+            config.stream_chunk_size = chunk_size
+            music_service.blob_cache = BlobCache(directory, max_bytes=1 << 30)
+            await run_case(f"дисковый кэш, блок {chunk_size // 1024} КБ", app_url, clients, requests)
+
+    await http_client.close()
+    await app_runner.cleanup()
+    await storage_runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""
+Микробенчмарк разбора обновлений вебхука.
+
+Сравнивает стоимость разбора одного обновления в старом варианте
+(stdlib json + Update(**data) + повторная привязка к боту в feed_update)
+и через decode_update с разными JSON декодерами.
+
+Примеры обновлений лежат в payloads/updates.json. Их можно заменить выгрузкой
+реальных тел запросов вебхука в виде JSON списка.
+
+Запуск:
+    PYTHONPATH=src python benchmarks/bench_update_decode.py [количество_повторов]
+"""
+
+import json
+import os
+import sys
+import timeit
+
+from aiogram import Bot
+from aiogram.types import Update
+
+from bot.utils import decoding
+
+
+PAYLOADS_PATH = os.path.join(os.path.dirname(__file__), "payloads", "updates.json")
+
+
+def load_payloads():
+    with open(PAYLOADS_PATH, "rb") as f:
+        return [json.dumps(update, ensure_ascii=False).encode() for update in json.load(f)]
+
+
+def legacy_decode(raw: bytes, bot: Bot) -> Update:
+    # Старый путь: Update(**data) без бота, затем feed_update пересоздает
+    # объект через model_dump/model_validate, чтобы привязать его к боту
+    update = Update(**json.loads(raw))
+    return Update.model_validate(update.model_dump(), context={"bot": bot})
+
+
+def make_decoder(loads):
+    def decode(raw: bytes, bot: Bot) -> Update:
+        return Update.model_validate(loads(raw), context={"bot": bot})
+    return decode
+
+
+def pydantic_json_decode(raw: bytes, bot: Bot) -> Update:
+    return Update.model_validate_json(raw, context={"bot": bot})
+
+
+def candidates():
+    yield "legacy: json + Update(**data) + remount", legacy_decode
+    yield "json + model_validate", make_decoder(json.loads)
+    try:
+        import orjson
+        yield "orjson + model_validate", make_decoder(orjson.loads)
+    except ImportError:
+        pass
+    try:
+        import msgspec
+        yield "msgspec + model_validate", make_decoder(msgspec.json.decode)
+    except ImportError:
+        pass
+    yield "pydantic model_validate_json", pydantic_json_decode
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    payloads = load_payloads()
+    bot = Bot(token="123456:BENCHMARK")
+
+    print(f"Обновлений в наборе: {len(payloads)}, повторов: {repeat}")
+    print(f"Декодер decode_update по умолчанию: {decoding.JSON_BACKEND}")
+
+    for name, decode in candidates():
+        def run():
+            for raw in payloads:
+                decode(raw, bot)
+
+        run()
+        best = min(timeit.repeat(run, number=repeat, repeat=5))
+        per_update = best / (repeat * len(payloads)) * 1e6
+        print(f"{name:45s} {per_update:8.1f} мкс/обновление")
+
+
+if __name__ == "__main__":
+    main()
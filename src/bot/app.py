@@ -10,7 +10,13 @@ from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_applicati
 from aiohttp import web
 from bot.config.config import config
 from bot.handlers import register_handlers
+from bot.middlewares.outbound import OutboundThrottleMiddleware
 from bot.web.routes import routes as download_routes
+from bot.services.blob_cache import blob_cache
+from bot.services.http import http_client
+from bot.services.identity import bot_identity
+from bot.services.scheduler import download_scheduler
+from bot.web.metrics import setup_metrics
 from loguru import logger
 
 
@@ -28,6 +34,12 @@ async def on_startup(bot: Bot) -> None:
         drop_pending_updates=True
     )
     logger.info(f"Установлен вебхук: {config.webhook_url}")
+    
+    # Загружаем данные бота заранее, чтобы не запрашивать их в обработчиках
+    await bot_identity.load(bot)
+    
+    # Восстанавливаем индекс дискового кэша треков
+    await blob_cache.scan()
 
 
 async def on_shutdown(bot: Bot) -> None:
@@ -41,6 +53,12 @@ async def on_shutdown(bot: Bot) -> None:
     """
     await bot.delete_webhook()
     logger.info("Вебхук удален")
+    
+    # Дожидаемся завершения загрузок до закрытия соединений
+    await download_scheduler.shutdown(config.download_shutdown_timeout)
+    
+    # Закрываем пул исходящих HTTP соединений
+    await http_client.close()
 
 
 def init_app() -> web.Application:
@@ -55,7 +73,14 @@ def init_app() -> web.Application:
     """
     # Инициализация бота и диспетчера
     bot = Bot(token=config.bot_token)
+    bot.session.middleware(OutboundThrottleMiddleware(
+        global_rate=config.telegram_global_rate,
+        chat_rate=config.telegram_chat_rate,
+        chat_burst=config.telegram_chat_burst,
+        max_retries=config.telegram_max_retries
+    ))
     dp = Dispatcher()
+    dp["bot_identity"] = bot_identity
     
     # Регистрация обработчиков
     register_handlers(dp)
@@ -77,6 +102,9 @@ def init_app() -> web.Application:
     # Регистрация роутов для скачивания
     app.add_routes(download_routes)
     
+    # Регистрация метрик Prometheus
+    setup_metrics(app)
+    
     # Настройка Middleware
     setup_application(app, dp, bot=bot)
     
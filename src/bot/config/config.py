@@ -25,9 +25,104 @@ class Settings(BaseSettings):
     webapp_host: str = os.getenv("WEBAPP_HOST", "0.0.0.0")
     webapp_port: int = int(os.getenv("PORT", "8000"))  # Railway предоставляет порт через переменную окружения PORT
     
+    # Лимиты исходящих сообщений Telegram
+    telegram_global_rate: float = 30.0  # сообщений в секунду для всех чатов
+    telegram_chat_rate: float = 1.0  # сообщений в секунду в один чат
+    telegram_chat_burst: int = 3  # Telegram допускает короткие всплески в чат
+    telegram_max_retries: int = 3  # повторы после TelegramRetryAfter
+
     # Настройки Яндекс.Музыки
     yandex_music_token: str
-    
+
+    # Настройки кэша поиска
+    search_cache_size: int = 512
+    search_cache_ttl: float = 300.0
+
+    # Настройки кэша file_id отправленных треков
+    file_id_cache_path: str = "data/file_ids.sqlite3"
+    file_id_cache_max_entries: int = 10000
+
+    # Настройки дискового кэша MP3 данных треков
+    blob_cache_dir: str = "data/blobs"
+    blob_cache_max_bytes: int = 2 * 1024 ** 3
+    blob_cache_wait_timeout: float = 10.0
+
+    # Настройки передачи данных треков
+    stream_chunk_size: int = 64 * 1024
+    stream_buffer_chunks: int = 4
+
+    # Настройки записи ID3 тегов
+    cover_size: str = "400x400"
+    cover_cache_size: int = 256
+    cover_timeout: float = 3.0
+
+    # Настройки пула исходящих HTTP соединений
+    http_pool_limit: int = 100
+    http_pool_limit_per_host: int = 20
+    http_keepalive_timeout: float = 30.0
+    http_dns_cache_ttl: int = 300
+
+    # Настройки очереди загрузок
+    download_max_concurrent: int = 3
+    download_queue_size: int = 50
+    download_max_per_chat: int = 5
+    download_shutdown_timeout: float = 30.0
+    # Статус загрузки обновляется не чаще раза в progress_interval секунд
+    # и только при росте прогресса не меньше чем на progress_step процентов
+    progress_interval: float = 3.0
+    progress_step: float = 10.0
+
+    # Настройки фоновой обработки обновлений
+    update_workers: int = 8
+    update_queue_size: int = 1000
+    update_queue_overflow: str = "reject"  # reject или drop
+    update_shutdown_timeout: float = 10.0
+
+    # Настройки заблаговременной подготовки ссылок на скачивание
+    resolve_cache_size: int = 1024
+    resolve_cache_ttl: float = 60.0  # прямые ссылки действуют недолго
+    prefetch_top_k: int = 2
+    prefetch_max_inflight: int = 8
+
+    # Параллельное получение ссылок для результатов поиска
+    resolve_concurrency: int = 5
+    resolve_timeout: float = 10.0
+
+    # Ограничение запросов к API Яндекс.Музыки (запросов в секунду и всплеск)
+    search_rate_limit: float = 10.0
+    search_rate_burst: int = 20
+    tracks_rate_limit: float = 10.0
+    tracks_rate_burst: int = 20
+    download_info_rate_limit: float = 20.0
+    download_info_rate_burst: int = 40
+    # Адаптивная параллельность запросов (AIMD) и повторы при перегрузке
+    upstream_initial_concurrency: int = 8
+    upstream_max_concurrency: int = 32
+    upstream_retries: int = 3
+    upstream_backoff_base: float = 0.2
+    upstream_backoff_max: float = 2.0
+
+    # Автоматический выключатель запросов к API при сбоях Яндекс.Музыки
+    breaker_failure_threshold: int = 5
+    breaker_reset_timeout: float = 30.0
+    breaker_half_open_probes: int = 1
+    # Последние успешные ответы, которые отдаются при недоступности API
+    stale_cache_size: int = 2048
+    stale_cache_ttl: float = 86400.0
+
+    # Объединение запросов треков в пакеты
+    tracks_batch_size: int = 50
+    tracks_batch_wait: float = 0.005
+
+    # Настройки постраничной выдачи inline-поиска
+    inline_page_size: int = 10
+    inline_results_ttl: float = 600.0
+    inline_results_max_queries: int = 1000
+    inline_debounce_delay: float = 0.3
+
+    # Время, после которого данные бота (get_me) обновляются в фоне
+    bot_identity_ttl: float = 3600.0
+
     @property
     def is_prod(self) -> bool:
         """Проверяет, запущен ли бот в production режиме."""
@@ -5,6 +5,7 @@
 таких как /start и /help.
 """
 
+import re
 from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.filters import Command, CommandObject
@@ -37,6 +38,10 @@ async def cmd_start(message: Message, command: CommandObject):
         # Извлекаем ID трека
         track_id = args.replace("download_", "")
         logger.info(f"Найден ID трека для скачивания: {track_id}")
+        if not re.fullmatch(r"\d+", track_id):
+            logger.warning(f"Некорректный ID трека в ссылке: {track_id}")
+            await message.answer("❌ Некорректная ссылка на трек")
+            return
 
         # Создаем статусное сообщение
         status_message = await message.answer("⏳ Начинаем скачивание...")
@@ -15,28 +15,58 @@ from aiogram.types import (
     InlineQueryResultArticle, 
     InputTextMessageContent
 )
-from bot.services.music import music_service
+from bot.config.config import config
+from bot.services.identity import BotIdentity, bot_identity
+from bot.services.pagination import InlinePaginator, inline_paginator
+from bot.utils.debounce import Debouncer
 from bot.utils.formatting import format_duration, format_track_message
 import hashlib
 import asyncio
+from typing import Set
 from loguru import logger
 
 
 # Инициализация роутера для обработчиков inline-запросов
 router = Router()
 
+# Поиск выполняется только по последнему запросу пользователя, набирающего текст
+inline_debouncer = Debouncer(delay=config.inline_debounce_delay)
+
+# Время кэширования ответа в Telegram для настоящих и предварительных результатов
+RESULTS_CACHE_TIME = 300
+PROVISIONAL_CACHE_TIME = 5
+
+# Фоновые поиски после предварительной выдачи (ссылки, чтобы задачи не собрал GC)
+_refreshes: Set[asyncio.Task] = set()
+
 
 @router.inline_query()
-async def inline_search(query: InlineQuery) -> None:
+async def inline_search(
+    query: InlineQuery,
+    bot_identity: BotIdentity = bot_identity,
+    paginator: InlinePaginator = inline_paginator,
+    debouncer: Debouncer = inline_debouncer,
+) -> None:
     """
     Обработка inline-запросов для поиска музыки.
     
     Этот обработчик обрабатывает inline-запросы и возвращает список треков,
     соответствующих поисковому запросу. Каждый результат содержит информацию
-    о треке и команду для скачивания.
+    о треке и команду для скачивания. Результаты отдаются страницами: при
+    прокрутке Telegram присылает запрос со смещением следующей страницы.
+    
+    Пока пользователь набирает текст, Telegram присылает запрос на каждый
+    введенный символ. Поиск запускается после короткой паузы, а более новый
+    запрос того же пользователя отменяет ожидающий. Если запрос уточняет уже
+    найденный, пользователь сразу получает предварительные результаты,
+    отобранные из найденных ранее, а настоящий поиск выполняется в фоновой
+    задаче, не задерживая обработку следующих обновлений.
     
     Аргументы:
         query (InlineQuery): Inline-запрос от Telegram, содержащий текст поиска
+        bot_identity (BotIdentity): Кэш данных бота для формирования ссылок
+        paginator (InlinePaginator): Хранилище страниц результатов поиска
+        debouncer (Debouncer): Подавление устаревших запросов пользователя
     
     Возвращает:
         None: Результаты отправляются обратно в Telegram через query.answer()
@@ -58,13 +88,33 @@ async def inline_search(query: InlineQuery) -> None:
             logger.info("Отправлен ответ на пустой запрос")
             return
 
+        # Предварительные результаты для уточненного запроса
+        provisional = None if query.offset else paginator.provisional_page(query.query)
+        
         # Быстрый поиск треков без получения информации о скачивании
         try:
-            logger.info("Начинаем поиск треков...")
-            tracks = await asyncio.wait_for(
-                music_service.search_track(query.query, limit=10, fetch_download_info=False),
-                timeout=10.0
-            )
+            logger.info(f"Начинаем поиск треков, смещение: {query.offset or 0}")
+            if provisional is not None:
+                logger.info(f"Предварительные результаты из кэша: {len(provisional)}")
+                page = (provisional, "")
+            elif query.offset:
+                # Следующие страницы отдаются из уже найденных результатов
+                page = await asyncio.wait_for(
+                    paginator.get_page(query.query, query.offset),
+                    timeout=10.0
+                )
+            else:
+                page = await asyncio.wait_for(
+                    debouncer.run(
+                        query.from_user.id,
+                        lambda: paginator.get_page(query.query, query.offset)
+                    ),
+                    timeout=10.0
+                )
+            if page is None:
+                logger.info(f"Inline-запрос '{query.query}' заменен более новым")
+                return
+            tracks, next_offset = page
             logger.info(f"Найдено треков: {len(tracks)}")
         except asyncio.TimeoutError:
             logger.warning("Превышен таймаут поиска")
@@ -79,9 +129,8 @@ async def inline_search(query: InlineQuery) -> None:
             await query.answer([timeout_result], cache_time=1)
             return
         
-        # Получаем информацию о боте
-        bot_info = await query.bot.get_me()
-        bot_username = bot_info.username
+        # Имя бота берем из кэша, без запроса к Telegram
+        bot_username = await bot_identity.username(query.bot)
         
         # Обработка и форматирование результатов поиска
         results = []
@@ -116,8 +165,17 @@ async def inline_search(query: InlineQuery) -> None:
         
         # Отправка результатов обратно в Telegram
         logger.info(f"Отправляем {len(results)} результатов")
-        await query.answer(results, cache_time=300)
+        # Предварительные и сохраненные при сбое API результаты Telegram хранит недолго
+        stale = any(track.get('stale') for track in tracks)
+        cache_time = RESULTS_CACHE_TIME if provisional is None and not stale else PROVISIONAL_CACHE_TIME
+        await query.answer(results, cache_time=cache_time, next_offset=next_offset)
         logger.info("Результаты успешно отправлены")
+        
+        if provisional is not None:
+            # Настоящий поиск идет в фоне и не занимает обработчик обновлений
+            task = asyncio.create_task(refresh_results(query, paginator, debouncer))
+            _refreshes.add(task)
+            task.add_done_callback(_refreshes.discard)
     except Exception as e:
         logger.error(f"Необработанная ошибка в inline_search: {e}", exc_info=True)
         error_result = InlineQueryResultArticle(
@@ -128,4 +186,23 @@ async def inline_search(query: InlineQuery) -> None:
                 message_text=f"❌ Произошла ошибка при поиске: {str(e)}"
             )
         )
-        await query.answer([error_result], cache_time=1) 
\ No newline at end of file
+        await query.answer([error_result], cache_time=1)
+
+
+async def refresh_results(query: InlineQuery, paginator: InlinePaginator, debouncer: Debouncer) -> None:
+    """
+    Выполняет настоящий поиск после отправки предварительных результатов.
+
+    Найденные треки сохраняются в постраничной выдаче и используются при
+    следующих запросах. Поиск идет через debouncer, поэтому при наборе
+    текста он выполняется только для последнего запроса пользователя.
+
+    Аргументы:
+        query (InlineQuery): Inline-запрос, на который уже отправлен ответ
+        paginator (InlinePaginator): Хранилище страниц результатов поиска
+        debouncer (Debouncer): Подавление устаревших запросов пользователя
+    """
+    try:
+        await debouncer.run(query.from_user.id, lambda: paginator.get_page(query.query))
+    except Exception as e:
+        logger.warning(f"Ошибка фонового поиска для '{query.query}': {e}")
@@ -8,7 +8,9 @@ from aiogram.types import Message
 from loguru import logger
 from aiogram.filters import Command
 from bot.config.config import config
+from bot.services.identity import BotIdentity, bot_identity
 from bot.services.music import music_service
+from bot.services.scheduler import download_scheduler
 from bot.utils.downloader import download_and_send_track
 from bot.utils.formatting import format_search_results
 
@@ -22,6 +24,7 @@ async def cmd_music_help(message: Message) -> None:
         "• Отправьте название трека или исполнителя для поиска\n"
         "• Используйте инлайн режим для поиска в других чатах: @aamuzbot название\n"
         "• /search название - поиск треков\n"
+        "• /cancel - отменить загрузки\n"
         "• /music - эта справка"
     )
     await message.answer(help_text, parse_mode="HTML")
@@ -39,8 +42,17 @@ async def cmd_download(message: Message) -> None:
     
     await download_and_send_track(message, track_id)
 
+@router.message(Command(commands=["cancel"]))
+async def cmd_cancel(message: Message) -> None:
+    """Отменяет ожидающие и выполняющиеся загрузки чата."""
+    cancelled = await download_scheduler.cancel(message.chat.id)
+    if cancelled:
+        await message.answer(f"❌ Отменено загрузок: {cancelled}")
+    else:
+        await message.answer("Нет активных загрузок")
+
 @router.message(Command(commands=["search"]))
-async def cmd_search(message: Message) -> None:
+async def cmd_search(message: Message, bot_identity: BotIdentity = bot_identity) -> None:
     """Ищет треки по запросу."""
     # Получаем текст после команды
     query = message.text.replace("/search", "").strip()
@@ -52,8 +64,8 @@ async def cmd_search(message: Message) -> None:
         # Отправляем сообщение о поиске
         status = await message.answer("🔍 Ищу трек...")
         
-        # Получаем информацию о боте
-        bot_info = await message.bot.get_me()
+        # Имя бота берем из кэша, без запроса к Telegram
+        bot_username = await bot_identity.username(message.bot)
         
         # Ищем треки
         tracks = await music_service.search_track(query, limit=5, fetch_download_info=False)
@@ -61,8 +73,11 @@ async def cmd_search(message: Message) -> None:
             await status.edit_text("❌ Ничего не найдено")
             return
             
+        # Заранее готовим скачивание первых результатов
+        music_service.prefetch_track_info([track['id'] for track in tracks[:config.prefetch_top_k]])
+        
         # Форматируем результаты
-        response_text = format_search_results(tracks, bot_info.username)
+        response_text = format_search_results(tracks, bot_username)
         await status.edit_text(response_text, parse_mode="HTML", disable_web_page_preview=True)
         
     except Exception as e:
@@ -70,14 +85,14 @@ async def cmd_search(message: Message) -> None:
         await status.edit_text(f"❌ Ошибка при поиске: {str(e)}")
 
 @router.message(~F.text.startswith('/') & ~F.via_bot)
-async def handle_text_search(message: Message) -> None:
+async def handle_text_search(message: Message, bot_identity: BotIdentity = bot_identity) -> None:
     """Обрабатывает текстовые сообщения как поисковые запросы."""
     try:
         # Отправляем сообщение о поиске
         status = await message.answer("🔍 Ищу трек...")
         
-        # Получаем информацию о боте
-        bot_info = await message.bot.get_me()
+        # Имя бота берем из кэша, без запроса к Telegram
+        bot_username = await bot_identity.username(message.bot)
         
         # Ищем треки
         tracks = await music_service.search_track(message.text, limit=5, fetch_download_info=False)
@@ -85,8 +100,11 @@ async def handle_text_search(message: Message) -> None:
             await status.edit_text("❌ Ничего не найдено")
             return
             
+        # Заранее готовим скачивание первых результатов
+        music_service.prefetch_track_info([track['id'] for track in tracks[:config.prefetch_top_k]])
+        
         # Форматируем результаты
-        response_text = format_search_results(tracks, bot_info.username)
+        response_text = format_search_results(tracks, bot_username)
         await status.edit_text(response_text, parse_mode="HTML", disable_web_page_preview=True)
         
     except Exception as e:
@@ -7,15 +7,22 @@
 
 import asyncio
 from aiogram import Bot, Dispatcher
-from aiogram.types import Update
-from aiogram.exceptions import TelegramRetryAfter
 from aiohttp import web
 from bot.config.config import config
 from bot.handlers.base import router as base_router
 from bot.handlers.music import router as music_router
 from bot.handlers.inline import router as inline_router
-from bot.routers.web import setup_routes
 from bot.middlewares.logging import LoggingMiddleware
+from bot.middlewares.outbound import OutboundThrottleMiddleware
+from bot.services.blob_cache import blob_cache
+from bot.services.http import http_client
+from bot.services.identity import bot_identity
+from bot.services.scheduler import download_scheduler
+from bot.services.updates import UpdateQueue
+from bot.utils.decoding import JSON_BACKEND, decode_update
+from bot.utils.metrics import WEBHOOK_LATENCY, stats_collector
+from bot.web.metrics import setup_metrics
+from bot.web.routes import routes as download_routes
 from loguru import logger
 
 
@@ -49,21 +56,42 @@ async def on_shutdown(bot: Bot) -> None:
     await bot.session.close()
 
 
+async def on_app_shutdown(app: web.Application) -> None:
+    """
+    Освобождает общие ресурсы при остановке веб-приложения.
+    
+    Args:
+        app: Веб-приложение
+    """
+    # Обрабатываем уже принятые обновления
+    await app["updates"].shutdown(config.update_shutdown_timeout)
+    
+    # Дожидаемся завершения загрузок до закрытия соединений
+    await download_scheduler.shutdown(config.download_shutdown_timeout)
+    
+    # Закрываем пул исходящих HTTP соединений
+    await http_client.close()
+
+
 async def process_update(request: web.Request) -> web.Response:
     """
-    Обрабатывает входящие обновления от Telegram.
+    Принимает входящие обновления от Telegram.
+    
+    Обновление ставится в очередь и обрабатывается в фоне, поэтому Telegram
+    получает ответ сразу, независимо от времени работы обработчиков.
     
     Args:
         request: Входящий HTTP запрос
         
     Returns:
-        HTTP ответ
+        HTTP ответ: 200 если обновление принято, 503 если очередь переполнена
     """
-    bot = request.app["bot"]
-    dp = request.app["dp"]
-    update = Update(**(await request.json()))
-    await dp.feed_update(bot=bot, update=update)
-    return web.Response()
+    with WEBHOOK_LATENCY.time():
+        update = decode_update(await request.read(), request.app["bot"])
+        if not request.app["updates"].put(update):
+            # Telegram повторит доставку позже
+            return web.Response(status=503)
+        return web.Response()
 
 
 async def init_app() -> web.Application:
@@ -77,8 +105,24 @@ async def init_app() -> web.Application:
     bot = Bot(token=config.bot_token)
     dp = Dispatcher()
     
+    # Исходящие сообщения отправляются в пределах лимитов Telegram
+    outbound = OutboundThrottleMiddleware(
+        global_rate=config.telegram_global_rate,
+        chat_rate=config.telegram_chat_rate,
+        chat_burst=config.telegram_chat_burst,
+        max_retries=config.telegram_max_retries
+    )
+    bot.session.middleware(outbound)
+    stats_collector.register(
+        'telegram_outbound',
+        outbound.stats,
+        counters=('requests', 'coalesced', 'retries')
+    )
+    dp["bot_identity"] = bot_identity
+    
     # Настраиваем логирование
     logger.info("Инициализация бота...")
+    logger.info(f"JSON декодер обновлений: {JSON_BACKEND}")
     
     # Регистрируем обработчики
     dp.include_router(base_router)
@@ -93,13 +137,44 @@ async def init_app() -> web.Application:
     app["bot"] = bot
     app["dp"] = dp
     
+    # Запускаем фоновую обработку обновлений
+    updates = UpdateQueue(
+        lambda update: dp.feed_update(bot=bot, update=update),
+        workers=config.update_workers,
+        max_size=config.update_queue_size,
+        overflow=config.update_queue_overflow
+    )
+    await updates.start()
+    app["updates"] = updates
+    stats_collector.register(
+        'updates',
+        updates.stats,
+        counters=('accepted', 'processed', 'failed', 'rejected', 'dropped')
+    )
+    
     # Настраиваем маршруты
     app.router.add_post(config.webhook_path, process_update)
+    app.add_routes(download_routes)
+    setup_metrics(app)
     
     # Настраиваем запуск и остановку
     dp.startup.register(on_startup)
     dp.shutdown.register(on_shutdown)
     
+    # Восстанавливаем индекс дискового кэша треков
+    await blob_cache.scan()
+    
+    # Создаем общую HTTP сессию и закрываем ее при остановке
+    await http_client.start()
+    app.on_shutdown.append(on_app_shutdown)
+    
+    # Загружаем данные бота заранее, чтобы не запрашивать их в обработчиках
+    try:
+        await bot_identity.load(bot)
+    except Exception as e:
+        # Обработчики загрузят данные при первом обращении
+        logger.warning(f"Не удалось загрузить данные бота при запуске: {e}")
+    
     # Добавляем мидлвари
     dp.message.middleware(LoggingMiddleware())
     dp.inline_query.middleware(LoggingMiddleware())
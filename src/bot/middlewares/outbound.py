@@ -0,0 +1,203 @@
+"""
+Планировщик исходящих запросов к Bot API.
+
+Этот модуль содержит middleware сессии бота, которое удерживает отправку
+сообщений в пределах лимитов Telegram: общего (30 сообщений в секунду) и
+для одного чата (1 сообщение в секунду). Ожидающие изменения одного и того
+же сообщения объединяются, и отправляется только последний текст. При ответе
+Too Many Requests запрос повторяется после указанного Telegram времени, если
+его файлы можно прочитать повторно.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Hashable, Set
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import EditMessageText, TelegramMethod
+from aiogram.types import BufferedInputFile, FSInputFile, InputFile, URLInputFile
+from loguru import logger
+
+from bot.utils.cache import TTLCache
+from bot.utils.metrics import TELEGRAM_LIMITER_WAIT
+from bot.utils.ratelimit import TokenBucket
+
+
+# Файлы, которые можно прочитать заново при повторе запроса
+REPLAYABLE_FILES = (BufferedInputFile, FSInputFile, URLInputFile)
+
+
+def is_replayable(method: TelegramMethod) -> bool:
+    """
+    Проверяет, можно ли отправить запрос повторно.
+
+    Файл, читаемый из потока, второй раз отдает только уже непрочитанные
+    данные, поэтому повтор такого запроса загрузил бы неполный файл.
+
+    Args:
+        method: Метод Bot API
+
+    Returns:
+        True, если все файлы запроса можно прочитать заново
+    """
+    return not any(
+        isinstance(value, InputFile) and not isinstance(value, REPLAYABLE_FILES)
+        for _, value in method
+    )
+
+
+class PendingEdit:
+    """Изменение сообщения, ожидающее отправки."""
+
+    def __init__(self, method: EditMessageText, future: asyncio.Future):
+        self.method = method
+        self.future = future
+
+
+class OutboundThrottleMiddleware(BaseRequestMiddleware):
+    """
+    Middleware сессии бота, ограничивающее частоту исходящих сообщений.
+
+    Ограничиваются только запросы, адресованные чату (с полем chat_id):
+    ответы на inline-запросы и служебные методы проходят без ожидания.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: int = 1,
+        max_retries: int = 3,
+        max_chats: int = 10000,
+    ):
+        """
+        Args:
+            global_rate: Общий лимит сообщений в секунду
+            chat_rate: Лимит сообщений в секунду для одного чата
+            chat_burst: Количество сообщений, которые можно отправить в чат подряд
+            max_retries: Максимальное количество повторов после TelegramRetryAfter
+            max_chats: Количество чатов, для которых хранится состояние лимита
+        """
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, max(1, int(global_rate)))
+        # Лимит неактивного чата восстанавливается полностью, его можно забыть
+        self._chats = TTLCache(maxsize=max_chats, ttl=60.0)
+        self._paused_until: Dict[Hashable, float] = {}
+        self._edits: Dict[tuple, PendingEdit] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.requests = 0
+        self.coalesced = 0
+        self.retries = 0
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot: Bot,
+        method: TelegramMethod,
+    ) -> Any:
+        chat_id = getattr(method, 'chat_id', None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        self.requests += 1
+        if isinstance(method, EditMessageText) and method.message_id is not None:
+            return await self._edit(make_request, bot, method)
+        return await self._send(make_request, bot, method)
+
+    async def _edit(self, make_request: NextRequestMiddlewareType, bot: Bot, method: EditMessageText) -> Any:
+        key = (method.chat_id, method.message_id)
+        pending = self._edits.get(key)
+        if pending is not None:
+            # Более новый текст заменяет ожидающий, отправится только он
+            pending.method = method
+            self.coalesced += 1
+            return await asyncio.shield(pending.future)
+
+        pending = PendingEdit(method, asyncio.get_running_loop().create_future())
+        self._edits[key] = pending
+        # Отправка идет отдельной задачей: отмена одного из ожидающих не отменяет ее
+        task = asyncio.create_task(self._send_edit(make_request, bot, key, pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return await asyncio.shield(pending.future)
+
+    async def _send_edit(
+        self, make_request: NextRequestMiddlewareType, bot: Bot, key: tuple, pending: PendingEdit
+    ) -> None:
+        try:
+            try:
+                await self._wait(key[0])
+            finally:
+                # Изменения, пришедшие после этого момента, составят следующую очередь
+                self._edits.pop(key, None)
+            result = await self._request(make_request, bot, pending.method)
+        except Exception as e:
+            pending.future.set_exception(e)
+            # Помечаем ошибку полученной, даже если все ожидающие уже отменены
+            pending.future.exception()
+        else:
+            pending.future.set_result(result)
+        finally:
+            if not pending.future.done():
+                pending.future.cancel()
+
+    async def _send(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod) -> Any:
+        await self._wait(method.chat_id)
+        return await self._request(make_request, bot, method)
+
+    async def _request(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod) -> Any:
+        attempt = 0
+        while True:
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                # Пауза действует и на остальные запросы в этот чат
+                self._paused_until[method.chat_id] = time.monotonic() + e.retry_after
+                if attempt >= self.max_retries or not is_replayable(method):
+                    raise
+                attempt += 1
+                self.retries += 1
+                logger.warning(
+                    f"Telegram просит подождать {e.retry_after} с перед {type(method).__name__} "
+                    f"в чат {method.chat_id} (попытка {attempt}/{self.max_retries})"
+                )
+                await self._wait(method.chat_id)
+
+    async def _wait(self, chat_id: Hashable) -> None:
+        started = time.monotonic()
+
+        paused_until = self._paused_until.get(chat_id)
+        if paused_until is not None:
+            delay = paused_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self._paused_until.get(chat_id) == paused_until:
+                del self._paused_until[chat_id]
+
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+        self._chats.set(chat_id, bucket)
+        await bucket.acquire()
+        await self._global.acquire()
+
+        TELEGRAM_LIMITER_WAIT.observe(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает статистику исходящих запросов.
+
+        Returns:
+            Словарь с количеством запросов, объединенных изменений и повторов
+        """
+        return {
+            'requests': self.requests,
+            'coalesced': self.coalesced,
+            'retries': self.retries,
+            'pending_edits': len(self._edits),
+            'paused_chats': len(self._paused_until),
+        }
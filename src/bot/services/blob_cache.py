@@ -0,0 +1,278 @@
+"""
+Дисковый кэш MP3 данных треков.
+
+Этот модуль хранит данные треков из хранилища Яндекс.Музыки (без ID3 тега)
+в локальном каталоге, чтобы популярные треки не скачивались заново для
+каждого пользователя. Файлы записываются атомарно через временный файл,
+а при превышении заданного объема удаляются давно не использованные.
+"""
+
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Union
+
+import aiofiles
+from loguru import logger
+from bot.config.config import config
+
+
+BlobKey = Tuple[str, int]
+
+PART_SUFFIX = ".part"
+BLOB_SUFFIX = ".mp3"
+
+
+class BlobWriter:
+    """Запись одного файла кэша через временный файл."""
+
+    def __init__(self, cache: "BlobCache", key: BlobKey, path: str):
+        self._cache = cache
+        self.key = key
+        self.path = path
+        self.tmp_path = path + PART_SUFFIX
+        self._file = None
+        self.size = 0
+        self.finished = False
+
+    async def write(self, chunk: bytes) -> None:
+        """Дописывает данные во временный файл."""
+        if self._file is None:
+            self._file = await aiofiles.open(self.tmp_path, 'wb')
+        await self._file.write(chunk)
+        self.size += len(chunk)
+
+    async def commit(self) -> None:
+        """Переименовывает временный файл в файл кэша."""
+        if self.finished:
+            return
+        self.finished = True
+        try:
+            if self._file is None:
+                self._file = await aiofiles.open(self.tmp_path, 'wb')
+            await self._file.close()
+            os.replace(self.tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении трека {self.key} в кэш: {e}")
+            self._remove_tmp()
+            self._cache._finish(self.key, None)
+            return
+        self._cache._finish(self.key, self.size)
+
+    async def abort(self) -> None:
+        """Удаляет недописанный временный файл."""
+        if self.finished:
+            return
+        self.finished = True
+        if self._file is not None:
+            try:
+                await self._file.close()
+            except Exception:
+                pass
+        self._remove_tmp()
+        self._cache._finish(self.key, None)
+
+    def _remove_tmp(self) -> None:
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+class BlobCache:
+    """Каталог с данными треков и вытеснением по LRU в пределах объема в байтах."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        """
+        Args:
+            directory: Каталог для файлов кэша
+            max_bytes: Максимальный суммарный размер файлов в байтах
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[BlobKey, int]" = OrderedDict()
+        self._fills: Dict[BlobKey, asyncio.Future] = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.fills = 0
+        self.evictions = 0
+        self.wait_timeouts = 0
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @staticmethod
+    def make_key(track_id: Union[int, str], bitrate: int) -> BlobKey:
+        """Возвращает ключ кэша для трека в заданном качестве."""
+        return (str(track_id), int(bitrate))
+
+    def path(self, key: BlobKey) -> str:
+        """Возвращает путь к файлу кэша для ключа."""
+        track_id, bitrate = key
+        return os.path.join(self.directory, f"{track_id}-{bitrate}{BLOB_SUFFIX}")
+
+    @staticmethod
+    def _parse_name(name: str) -> Optional[BlobKey]:
+        if not name.endswith(BLOB_SUFFIX):
+            return None
+        track_id, sep, bitrate = name[:-len(BLOB_SUFFIX)].rpartition('-')
+        if not sep or not bitrate.isdigit():
+            return None
+        return (track_id, int(bitrate))
+
+    def _scan(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(PART_SUFFIX):
+                # Недописанные файлы остаются после аварийной остановки
+                os.remove(entry.path)
+                continue
+            key = self._parse_name(entry.name)
+            if key is None:
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, key, stat.st_size))
+
+        # Порядок вытеснения восстанавливаем по времени последнего использования
+        self._index.clear()
+        self.total_bytes = 0
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self.total_bytes += size
+        self._evict()
+
+    async def scan(self) -> None:
+        """Восстанавливает индекс кэша по содержимому каталога."""
+        await asyncio.to_thread(self._scan)
+        logger.info(
+            f"Кэш треков: {len(self._index)} файлов, "
+            f"{self.total_bytes / 1024 / 1024:.1f} МБ в {self.directory}"
+        )
+
+    def get(self, key: BlobKey) -> Optional[str]:
+        """
+        Возвращает путь к файлу кэша и помечает его как недавно использованный.
+
+        Args:
+            key: Ключ трека
+
+        Returns:
+            Путь к файлу или None, если трека нет в кэше
+        """
+        if key not in self._index:
+            self.misses += 1
+            return None
+
+        path = self.path(key)
+        self._index.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            # Файл удален в обход кэша
+            self.total_bytes -= self._index.pop(key)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def size(self, key: BlobKey) -> Optional[int]:
+        """
+        Возвращает размер файла кэша, не меняя порядок вытеснения.
+
+        Args:
+            key: Ключ трека
+
+        Returns:
+            Размер в байтах или None, если трека нет в кэше
+        """
+        return self._index.get(key)
+
+    def writer(self, key: BlobKey) -> Optional[BlobWriter]:
+        """
+        Начинает заполнение кэша для ключа.
+
+        Args:
+            key: Ключ трека
+
+        Returns:
+            Объект записи или None, если трек уже записывается
+        """
+        if key in self._fills or self.max_bytes <= 0:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        self._fills[key] = asyncio.get_running_loop().create_future()
+        return BlobWriter(self, key, self.path(key))
+
+    async def wait(self, key: BlobKey, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Дожидается заполнения кэша другим запросом.
+
+        Args:
+            key: Ключ трека
+            timeout: Максимальное время ожидания в секундах (None - без ограничения)
+
+        Returns:
+            Путь к файлу или None, если заполнение не выполняется, не удалось
+            или не завершилось за отведенное время
+        """
+        fill = self._fills.get(key)
+        if fill is None:
+            return None
+        try:
+            filled = await asyncio.wait_for(asyncio.shield(fill), timeout)
+        except asyncio.TimeoutError:
+            # Заполнение идет со скоростью самого медленного клиента, не ждем его
+            self.wait_timeouts += 1
+            return None
+        if not filled:
+            return None
+        return self.get(key)
+
+    def _finish(self, key: BlobKey, size: Optional[int]) -> None:
+        if size is not None:
+            self.fills += 1
+            self.total_bytes -= self._index.pop(key, 0)
+            self._index[key] = size
+            self.total_bytes += size
+            self._evict()
+
+        fill = self._fills.pop(key, None)
+        if fill is not None and not fill.done():
+            fill.set_result(size is not None)
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает статистику использования кэша.
+
+        Returns:
+            Словарь с размером кэша и счетчиками попаданий
+        """
+        return {
+            'files': len(self._index),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'filling': len(self._fills),
+            'hits': self.hits,
+            'misses': self.misses,
+            'fills': self.fills,
+            'evictions': self.evictions,
+            'wait_timeouts': self.wait_timeouts,
+        }
+
+
+# Создаем экземпляр-синглтон
+blob_cache = BlobCache(config.blob_cache_dir, config.blob_cache_max_bytes)
@@ -0,0 +1,171 @@
+"""
+Кэш Telegram file_id для отправленных треков.
+
+Этот модуль хранит соответствие track_id → file_id в локальной базе SQLite.
+Повторная отправка уже загруженного трека выполняется по file_id, без скачивания
+и повторной загрузки MP3 файла.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Union
+
+from loguru import logger
+from bot.config.config import config
+
+
+class FileIdCache:
+    """Постоянное хранилище file_id с вытеснением давно не использованных записей."""
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        """
+        Args:
+            path: Путь к файлу базы SQLite
+            max_entries: Максимальное количество хранимых записей
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS file_ids ("
+                "track_id TEXT PRIMARY KEY, "
+                "file_id TEXT NOT NULL, "
+                "title TEXT, "
+                "created_at REAL NOT NULL, "
+                "last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS file_ids_last_used ON file_ids (last_used)")
+            conn.commit()
+            self._conn = conn
+            logger.info(f"Кэш file_id открыт: {self.path}")
+        return self._conn
+
+    def _get(self, track_id: str) -> Optional[tuple]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT file_id, title FROM file_ids WHERE track_id = ?", (track_id,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE file_ids SET last_used = ? WHERE track_id = ?", (time.time(), track_id)
+                )
+                conn.commit()
+            return row
+
+    def _set(self, track_id: str, file_id: str, title: Optional[str]) -> int:
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO file_ids (track_id, file_id, title, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (track_id, file_id, title, now, now)
+            )
+            # Удаляем самые давно использованные записи сверх лимита
+            evicted = conn.execute(
+                "DELETE FROM file_ids WHERE track_id IN ("
+                "SELECT track_id FROM file_ids ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            conn.commit()
+            return evicted
+
+    def _delete(self, track_id: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM file_ids WHERE track_id = ?", (track_id,))
+            conn.commit()
+
+    async def get(self, track_id: Union[int, str]) -> Optional[tuple]:
+        """
+        Возвращает сохраненный file_id трека.
+
+        Args:
+            track_id: ID трека в Яндекс.Музыке
+
+        Returns:
+            Кортеж (file_id, title) или None, если трек еще не отправлялся
+        """
+        try:
+            row = await asyncio.to_thread(self._get, str(track_id))
+        except Exception as e:
+            logger.error(f"Ошибка при чтении кэша file_id: {e}")
+            return None
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row
+
+    async def set(self, track_id: Union[int, str], file_id: str, title: Optional[str] = None) -> None:
+        """
+        Сохраняет file_id отправленного трека.
+
+        Args:
+            track_id: ID трека в Яндекс.Музыке
+            file_id: file_id, который вернул Telegram
+            title: Название трека для статусных сообщений
+        """
+        try:
+            self.evictions += await asyncio.to_thread(self._set, str(track_id), file_id, title)
+        except Exception as e:
+            logger.error(f"Ошибка при записи в кэш file_id: {e}")
+
+    async def invalidate(self, track_id: Union[int, str]) -> None:
+        """
+        Удаляет file_id, который Telegram больше не принимает.
+
+        Args:
+            track_id: ID трека в Яндекс.Музыке
+        """
+        self.invalidations += 1
+        try:
+            await asyncio.to_thread(self._delete, str(track_id))
+        except Exception as e:
+            logger.error(f"Ошибка при удалении из кэша file_id: {e}")
+
+    def close(self) -> None:
+        """Закрывает соединение с базой."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """
+        Возвращает статистику использования кэша.
+
+        Returns:
+            Словарь со счетчиками и долей попаданий
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / total if total else 0.0,
+        }
+
+
+# Создаем экземпляр-синглтон
+file_id_cache = FileIdCache(config.file_id_cache_path, max_entries=config.file_id_cache_max_entries)
@@ -0,0 +1,138 @@
+"""
+Общий HTTP клиент приложения.
+
+Этот модуль содержит долгоживущую aiohttp сессию с пулом соединений,
+которая используется для всех исходящих HTTP запросов (скачивание треков
+из хранилища Яндекс.Музыки). Повторное использование соединений избавляет
+от DNS запроса и TLS рукопожатия на каждое скачивание.
+"""
+
+from typing import Dict, Optional
+
+import aiohttp
+from loguru import logger
+from bot.config.config import config
+
+
+class HttpClient:
+    """Владелец общей aiohttp сессии с настраиваемым пулом соединений."""
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 30.0,
+        dns_cache_ttl: int = 300,
+    ):
+        """
+        Args:
+            limit: Максимальное количество одновременных соединений
+            limit_per_host: Максимальное количество соединений на один хост (0 - без ограничения)
+            keepalive_timeout: Время жизни простаивающего соединения в секундах
+            dns_cache_ttl: Время жизни записей DNS кэша в секундах
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+        )
+        return aiohttp.ClientSession(connector=connector, trace_configs=[self._trace_config()])
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.requests += 1
+
+        async def on_connection_create_end(session, context, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.connections_reused += 1
+
+        async def on_dns_cache_hit(session, context, params):
+            self.dns_cache_hits += 1
+
+        async def on_dns_cache_miss(session, context, params):
+            self.dns_cache_misses += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        Возвращает общую сессию, создавая ее при первом обращении.
+
+        Должно вызываться внутри запущенного event loop.
+        """
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+            logger.info(
+                f"HTTP сессия создана: limit={self.limit}, limit_per_host={self.limit_per_host}"
+            )
+        return self._session
+
+    async def start(self) -> None:
+        """Создает общую сессию при запуске приложения."""
+        _ = self.session
+
+    async def close(self) -> None:
+        """Закрывает общую сессию и все соединения пула."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("HTTP сессия закрыта")
+        self._session = None
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает статистику использования пула соединений.
+
+        Returns:
+            Словарь с размером пула, занятыми и простаивающими соединениями
+            и счетчиками повторного использования соединений
+        """
+        acquired = 0
+        idle = 0
+        if self._session is not None and not self._session.closed:
+            connector = self._session.connector
+            acquired = len(getattr(connector, '_acquired', ()))
+            idle = sum(len(conns) for conns in getattr(connector, '_conns', {}).values())
+
+        return {
+            'limit': self.limit,
+            'limit_per_host': self.limit_per_host,
+            'acquired': acquired,
+            'idle': idle,
+            'requests': self.requests,
+            'connections_created': self.connections_created,
+            'connections_reused': self.connections_reused,
+            'dns_cache_hits': self.dns_cache_hits,
+            'dns_cache_misses': self.dns_cache_misses,
+        }
+
+
+# Создаем экземпляр-синглтон
+http_client = HttpClient(
+    limit=config.http_pool_limit,
+    limit_per_host=config.http_pool_limit_per_host,
+    keepalive_timeout=config.http_keepalive_timeout,
+    dns_cache_ttl=config.http_dns_cache_ttl,
+)
@@ -0,0 +1,118 @@
+"""
+Данные о самом боте.
+
+Этот модуль кэширует результат get_me, чтобы обработчики не делали лишний
+запрос к Telegram API ради имени бота. Данные загружаются при запуске и
+обновляются в фоне после истечения времени жизни.
+"""
+
+import asyncio
+import time
+from typing import Callable, Dict, Optional
+
+from aiogram import Bot
+from aiogram.types import User
+from loguru import logger
+from bot.config.config import config
+
+
+class BotIdentity:
+    """Кэш данных бота с ленивым фоновым обновлением."""
+
+    def __init__(self, ttl: float = 3600.0, timer: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            ttl: Время, после которого данные обновляются, в секундах
+            timer: Источник монотонного времени
+        """
+        self.ttl = ttl
+        self._timer = timer
+        self._me: Optional[User] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.fetches = 0
+        self.errors = 0
+
+    async def load(self, bot: Bot) -> User:
+        """
+        Запрашивает данные бота у Telegram и сохраняет их.
+
+        Args:
+            bot: Экземпляр бота
+
+        Returns:
+            Пользователь Telegram, соответствующий боту
+        """
+        async with self._lock:
+            return await self._fetch(bot)
+
+    async def _fetch(self, bot: Bot) -> User:
+        self.fetches += 1
+        me = await bot.get_me()
+        self._me = me
+        self._loaded_at = self._timer()
+        logger.info(f"Получены данные бота: @{me.username}")
+        return me
+
+    async def _refresh(self, bot: Bot) -> None:
+        try:
+            await self.load(bot)
+        except Exception as e:
+            # Оставляем устаревшие данные, попробуем при следующем обращении
+            self.errors += 1
+            logger.warning(f"Не удалось обновить данные бота: {e}")
+
+    async def get(self, bot: Bot) -> User:
+        """
+        Возвращает данные бота.
+
+        Если данных еще нет, они загружаются сразу. Устаревшие данные
+        возвращаются без ожидания, а обновление запускается в фоне.
+
+        Args:
+            bot: Экземпляр бота
+
+        Returns:
+            Пользователь Telegram, соответствующий боту
+        """
+        if self._me is None:
+            async with self._lock:
+                # Первое обращение загружает данные, остальные ждут его
+                if self._me is None:
+                    return await self._fetch(bot)
+            return self._me
+
+        if self._timer() - self._loaded_at >= self.ttl:
+            if self._refresh_task is None or self._refresh_task.done():
+                self._refresh_task = asyncio.create_task(self._refresh(bot))
+        return self._me
+
+    async def username(self, bot: Bot) -> str:
+        """
+        Возвращает имя бота для ссылок вида t.me/<username>.
+
+        Args:
+            bot: Экземпляр бота
+
+        Returns:
+            Имя бота без символа @
+        """
+        return (await self.get(bot)).username
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает статистику обращений к get_me.
+
+        Returns:
+            Словарь с количеством запросов и ошибок
+        """
+        return {
+            'fetches': self.fetches,
+            'errors': self.errors,
+            'loaded': int(self._me is not None),
+        }
+
+
+# Создаем экземпляр-синглтон
+bot_identity = BotIdentity(ttl=config.bot_identity_ttl)
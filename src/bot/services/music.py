@@ -6,27 +6,312 @@
 """
 
 from yandex_music import ClientAsync
+from yandex_music.exceptions import BadRequestError, NetworkError, NotFoundError
 from loguru import logger
 from bot.config.config import config
+from bot.utils.batching import BatchLoader
+from bot.utils.breaker import CircuitBreaker
+from bot.utils.cache import TTLCache
+from bot.utils.ratelimit import AdaptiveConcurrency, TokenBucket, UpstreamLimiter
+from bot.utils.singleflight import SingleFlight
+from bot.utils.progress import DownloadStats, ProgressCallback
+from bot.utils.id3 import ID3_HEADER_SIZE, build_id3_tag, id3v2_tag_size, strip_id3v2
+from bot.services.blob_cache import BlobCache, BlobWriter, blob_cache as default_blob_cache
+from bot.services.http import http_client
+from bot.utils.metrics import (
+    DOWNLOAD_BYTES, ERRORS, RESOLVE_LATENCY, SEARCH_LATENCY, TAGGING_LATENCY,
+    UPSTREAM_LIMITER_WAIT
+)
+import os
+import re
 import asyncio
 import aiohttp
 import aiofiles
-from typing import List, Dict, Optional, Union
-import mutagen
-from mutagen.easyid3 import EasyID3
-from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterable, List, Dict, Optional, Set, Tuple, Union
+
+
+# ID трека в Яндекс.Музыке
+TRACK_ID_RE = re.compile(r"\d+")
+
+
+class TrackStream:
+    """
+    Поток MP3 данных трека с ID3 тегом в начале.
+    
+    Данные читаются из ответа хранилища по мере потребления и не записываются
+    на диск. Исходный ID3v2 тег файла заменяется тегом с метаданными трека.
+    Если передан writer, прочитанные данные параллельно сохраняются в кэш треков.
+    Если передан stats, в нем учитывается ход скачивания.
+    """
+
+    def __init__(
+        self,
+        response: aiohttp.ClientResponse,
+        header: bytes,
+        chunk_size: Optional[int] = None,
+        writer: Optional[BlobWriter] = None,
+        strip: bool = True,
+        stats: Optional[DownloadStats] = None,
+    ):
+        self._response = response
+        self.header = header
+        self.chunk_size = chunk_size or config.stream_chunk_size
+        self._writer = writer
+        self._strip = strip
+        self.stats = stats
+        self.received = 0
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[bytes]:
+        try:
+            if self.header:
+                yield self.header
+            chunks = self._count(self._response.content.iter_chunked(self.chunk_size))
+            if self._strip:
+                chunks = strip_id3v2(chunks)
+            async for chunk in chunks:
+                await self._write_cache(chunk)
+                yield chunk
+            
+            if self._writer is not None:
+                await self._writer.commit()
+            
+            # Время и скорость учитываем только для полностью прочитанных потоков
+            if self.stats is not None:
+                self.stats.finish()
+        finally:
+            DOWNLOAD_BYTES.inc(self.received)
+            await self.close()
+
+    async def _count(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        async for chunk in chunks:
+            self.received += len(chunk)
+            if self.stats is not None:
+                self.stats.add(len(chunk))
+            yield chunk
+
+    async def _write_cache(self, chunk: bytes) -> None:
+        if self._writer is None:
+            return
+        try:
+            await self._writer.write(chunk)
+        except Exception as e:
+            # Ошибка записи в кэш не должна прерывать отправку трека
+            logger.error(f"Ошибка записи трека в кэш: {e}")
+            await self._writer.abort()
+            self._writer = None
+
+    async def close(self) -> None:
+        """Возвращает соединение с хранилищем в пул и отменяет недописанный кэш."""
+        self._response.release()
+        if self._writer is not None:
+            await self._writer.abort()
+
+
+class CachedTrackStream:
+    """
+    Поток MP3 данных трека из дискового кэша с ID3 тегом в начале.
+    
+    Файл нужно открыть методом open сразу после получения пути из кэша:
+    открытый файл остается доступным, даже если кэш вытеснит его до того,
+    как данные будут прочитаны.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        header: bytes,
+        chunk_size: Optional[int] = None,
+        start: int = 0,
+        end: Optional[int] = None,
+        progress: Optional[ProgressCallback] = None,
+    ):
+        """
+        Args:
+            path: Путь к файлу кэша
+            header: ID3 тег, отдаваемый перед данными
+            chunk_size: Размер читаемого блока
+            start: Первый отдаваемый байт файла
+            end: Последний отдаваемый байт файла включительно
+            progress: Функция, получающая количество прочитанных байт и общий размер
+        """
+        self.path = path
+        self.header = header
+        self.chunk_size = chunk_size or config.stream_chunk_size
+        self.start = start
+        self.end = end
+        self._progress = progress
+        self._file = None
+        self.size: Optional[int] = None
+
+    async def open(self) -> "CachedTrackStream":
+        """
+        Открывает файл кэша и определяет его размер.
+        
+        Returns:
+            Этот же поток
+            
+        Raises:
+            OSError: Файл уже удален из кэша
+        """
+        if self._file is None:
+            self._file = await aiofiles.open(self.path, 'rb')
+            self.size = os.fstat(self._file.fileno()).st_size
+        return self
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[bytes]:
+        await self.open()
+        try:
+            if self.header:
+                yield self.header
+            remaining = None if self.end is None else self.end - self.start + 1
+            total = remaining if remaining is not None else self.size - self.start
+            sent = 0
+            if self.start:
+                await self._file.seek(self.start)
+            while remaining is None or remaining > 0:
+                size = self.chunk_size if remaining is None else min(self.chunk_size, remaining)
+                chunk = await self._file.read(size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                sent += len(chunk)
+                if self._progress is not None:
+                    self._progress(sent, total)
+                yield chunk
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """Закрывает файл кэша."""
+        if self._file is not None:
+            file, self._file = self._file, None
+            await file.close()
 
 
 class MusicService:
-    def __init__(self, client: Optional[ClientAsync] = None):
+    def __init__(self, client: Optional[ClientAsync] = None, blob_cache: Optional[BlobCache] = None):
         if client is None:
             self.client = ClientAsync(config.yandex_music_token)
         else:
             self.client = client
+        self.blob_cache = default_blob_cache if blob_cache is None else blob_cache
         self._initialized = False
-        self._executor = ThreadPoolExecutor(max_workers=4)
+        self._search_cache = TTLCache(maxsize=config.search_cache_size, ttl=config.search_cache_ttl)
+        # Прямые ссылки живут недолго, поэтому и кэш подготовленных треков короткий
+        self._resolve_cache = TTLCache(maxsize=config.resolve_cache_size, ttl=config.resolve_cache_ttl)
+        # Размеры файлов в хранилище не меняются, их можно помнить долго
+        self._layout_cache = TTLCache(maxsize=config.resolve_cache_size, ttl=3600)
+        # Обложки общие для треков одного альбома
+        self._cover_cache = TTLCache(maxsize=config.cover_cache_size, ttl=3600)
+        self._flights = SingleFlight()
+        # Запросы треков от разных обработчиков объединяются в один вызов tracks()
+        self._track_loader = BatchLoader(
+            self._load_tracks,
+            max_batch_size=config.tracks_batch_size,
+            max_wait=config.tracks_batch_wait,
+            # Некорректный ID одного трека не должен ломать запросы других пользователей
+            isolate=(BadRequestError, NotFoundError)
+        )
+        self.limiters = {
+            'search': self._make_limiter('search', config.search_rate_limit, config.search_rate_burst),
+            'tracks': self._make_limiter('tracks', config.tracks_rate_limit, config.tracks_rate_burst),
+            'download_info': self._make_limiter(
+                'download_info', config.download_info_rate_limit, config.download_info_rate_burst
+            ),
+        }
+        self.breakers = {
+            name: CircuitBreaker(
+                name,
+                failure_threshold=config.breaker_failure_threshold,
+                reset_timeout=config.breaker_reset_timeout,
+                half_open_probes=config.breaker_half_open_probes,
+                failures=(NetworkError,),
+                ignore=(BadRequestError, NotFoundError)
+            )
+            for name in self.limiters
+        }
+        # Последние успешные ответы на случай недоступности API
+        self._stale_cache = TTLCache(maxsize=config.stale_cache_size, ttl=config.stale_cache_ttl)
+        self.stale_served = 0
+        self._prefetches: Set[asyncio.Task] = set()
+        self.prefetch_max_inflight = config.prefetch_max_inflight
+        self.prefetch_scheduled = 0
+        self.prefetch_skipped = 0
         logger.info("Клиент Яндекс.Музыки создан")
 
+    @staticmethod
+    def _make_limiter(name: str, rate: float, burst: int) -> UpstreamLimiter:
+        return UpstreamLimiter(
+            name,
+            TokenBucket(rate, burst),
+            AdaptiveConcurrency(
+                initial=config.upstream_initial_concurrency,
+                max_limit=config.upstream_max_concurrency
+            ),
+            # 429 и 5xx клиент Яндекс.Музыки выбрасывает как NetworkError
+            retry_on=(NetworkError,),
+            no_retry=(BadRequestError, NotFoundError),
+            retries=config.upstream_retries,
+            backoff_base=config.upstream_backoff_base,
+            backoff_max=config.upstream_backoff_max,
+            on_wait=UPSTREAM_LIMITER_WAIT.labels(name).observe
+        )
+
+    async def _call(self, operation: str, func, *args, **kwargs):
+        """
+        Выполняет запрос к API через выключатель и ограничитель операции.
+        
+        Пока выключатель разомкнут, запрос сразу завершается ошибкой
+        CircuitOpenError, не дожидаясь таймаутов.
+        
+        Args:
+            operation: Имя ограничителя: search, tracks или download_info
+            func: Асинхронная функция запроса
+            *args: Позиционные аргументы функции
+            **kwargs: Именованные аргументы функции
+            
+        Returns:
+            Результат функции
+        """
+        return await self.breakers[operation].call(self.limiters[operation].call, func, *args, **kwargs)
+
+    def _stale(self, key: tuple):
+        """Возвращает копию последнего успешного ответа с пометкой stale."""
+        stale = self._stale_cache.get(key)
+        if stale is None:
+            return None
+        
+        self.stale_served += 1
+        logger.warning(f"API недоступен, отдаются сохраненные результаты {key}")
+        if isinstance(stale, dict):
+            return dict(stale, stale=True)
+        return [dict(item, stale=True) for item in stale]
+
+    def limiter_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Возвращает статистику ограничителей запросов к API.
+        
+        Returns:
+            Словарь {операция: статистика ограничителя}
+        """
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
+
+    def breaker_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Возвращает статистику выключателей запросов к API.
+        
+        Returns:
+            Словарь {операция: статистика выключателя}
+        """
+        return {name: breaker.stats() for name, breaker in self.breakers.items()}
+
     async def ensure_initialized(self):
         """Убеждаемся, что клиент инициализирован."""
         if not self._initialized:
@@ -34,28 +319,35 @@ class MusicService:
             self._initialized = True
             logger.info("Клиент Яндекс.Музыки инициализирован")
 
-    async def download_track(self, download_url: str, output_path: str) -> bool:
+    async def download_track(
+        self, download_url: str, output_path: str, progress: Optional[ProgressCallback] = None
+    ) -> bool:
         """
         Асинхронно скачивает трек по прямой ссылке.
         
         Args:
             download_url: Прямая ссылка на скачивание
             output_path: Путь для сохранения файла
+            progress: Функция, получающая количество полученных байт и общий
+                размер из Content-Length (None, если он неизвестен)
             
         Returns:
             True если скачивание успешно, False в случае ошибки
         """
+        stats = DownloadStats(download_url, progress)
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(download_url) as response:
-                    if response.status != 200:
-                        logger.error(f"Ошибка при скачивании: HTTP {response.status}")
-                        return False
-                        
-                    async with aiofiles.open(output_path, 'wb') as f:
-                        async for chunk in response.content.iter_chunked(8192):
-                            await f.write(chunk)
-                            
+            async with http_client.session.get(download_url) as response:
+                if response.status != 200:
+                    logger.error(f"Ошибка при скачивании: HTTP {response.status}")
+                    return False
+                
+                stats.start(response.content_length)
+                async with aiofiles.open(output_path, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(config.stream_chunk_size):
+                        stats.add(len(chunk))
+                        await f.write(chunk)
+            
+            stats.finish()
             logger.info(f"Трек успешно скачан в {output_path}")
             return True
             
@@ -63,123 +355,510 @@ class MusicService:
             logger.error(f"Ошибка при скачивании трека: {e}", exc_info=True)
             return False
 
-    async def set_track_metadata(self, file_path: str, track_info: Dict) -> bool:
+    async def open_track_stream(
+        self,
+        download_url: str,
+        track_info: Dict,
+        header: Optional[bytes] = None,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Optional[Union[TrackStream, CachedTrackStream]]:
         """
-        Асинхронно устанавливает метаданные MP3 файла.
+        Открывает поток MP3 данных трека с установленными метаданными.
+        
+        В отличие от download_track, временный файл не
+        создается: ID3 тег формируется в памяти и отдается перед данными.
+        Если известно качество трека (ключ bitrate), данные берутся из дискового
+        кэша, а при промахе сохраняются в него во время скачивания. Запросы,
+        пришедшие во время заполнения кэша, дожидаются его не дольше
+        blob_cache_wait_timeout и читают файл, а по истечении времени скачивают
+        трек напрямую, без записи в кэш.
         
         Args:
-            file_path: Путь к MP3 файлу
+            download_url: Прямая ссылка на скачивание
             track_info: Словарь с информацией о треке
+            header: Уже сформированный ID3 тег трека
+            progress: Функция, получающая количество полученных байт данных
+                и их общий размер (None, если он неизвестен)
             
         Returns:
-            True если метаданные установлены успешно, False в случае ошибки
+            Поток данных трека или None в случае ошибки
         """
+        if header is None:
+            header = self.build_track_header(track_info, await self.get_track_cover(track_info))
+        
+        writer = None
+        if track_info.get('bitrate'):
+            key = BlobCache.make_key(track_info['id'], track_info['bitrate'])
+            path = self.blob_cache.get(key)
+            if path is None:
+                # Заполнение кэша занимаем до запроса, чтобы трек не скачивался дважды
+                writer = self.blob_cache.writer(key)
+                if writer is None:
+                    path = await self.blob_cache.wait(key, timeout=config.blob_cache_wait_timeout)
+                    if path is None:
+                        # Заполнение не удалось или затянулось: скачиваем трек сами
+                        writer = self.blob_cache.writer(key)
+            if path is not None:
+                cached = await self._open_cached(CachedTrackStream(path, header, progress=progress))
+                if cached is not None:
+                    logger.debug(f"Трек {track_info['id']} отдается из дискового кэша")
+                    return cached
+        
+        stats = DownloadStats(download_url, progress)
         try:
-            # Выполняем операции с метаданными в отдельном потоке
-            def set_metadata():
-                try:
-                    # Пробуем открыть как ID3
-                    audio = EasyID3(file_path)
-                except mutagen.id3.ID3NoHeaderError:
-                    # Если нет ID3 тега, создаем его
-                    audio = mutagen.File(file_path, easy=True)
-                    if audio is None:
-                        audio = EasyID3()
-                        audio.save(file_path)
-                    
-                # Устанавливаем метаданные
-                audio['title'] = track_info['title']
-                audio['artist'] = track_info['artists']
-                audio.save(file_path)
-                
-            # Запускаем в thread pool
-            await asyncio.get_event_loop().run_in_executor(
-                self._executor,
-                set_metadata
-            )
+            response = await http_client.session.get(download_url)
+        except Exception as e:
+            logger.error(f"Ошибка при скачивании трека: {e}", exc_info=True)
+            ERRORS.labels('download').inc()
+            if writer is not None:
+                await writer.abort()
+            return None
             
-            logger.info(f"Метаданные успешно установлены для {file_path}")
-            return True
+        if response.status != 200:
+            logger.error(f"Ошибка при скачивании: HTTP {response.status}")
+            ERRORS.labels('download').inc()
+            response.release()
+            if writer is not None:
+                await writer.abort()
+            return None
+            
+        stats.start(response.content_length)
+        return TrackStream(response, header, writer=writer, stats=stats)
+
+    @staticmethod
+    async def _open_cached(stream: CachedTrackStream) -> Optional[CachedTrackStream]:
+        """
+        Открывает файл кэша до того, как его может вытеснить другое заполнение.
+        
+        Args:
+            stream: Поток данных из файла кэша
+            
+        Returns:
+            Открытый поток или None, если файл уже удален
+        """
+        try:
+            return await stream.open()
+        except OSError as e:
+            logger.warning(f"Файл кэша {stream.path} недоступен, трек будет скачан: {e}")
+            return None
+
+    @staticmethod
+    def build_track_header(track_info: Dict, cover: Optional[bytes] = None) -> bytes:
+        """
+        Формирует ID3 тег, отдаваемый перед данными трека.
+        
+        Args:
+            track_info: Словарь с информацией о треке
+            cover: Данные обложки трека
+            
+        Returns:
+            Байты ID3v2 тега
+        """
+        with TAGGING_LATENCY.time():
+            return build_id3_tag(track_info, cover)
+
+    async def get_track_cover(self, track_info: Dict) -> Optional[bytes]:
+        """
+        Получает обложку трека по ссылке из его метаданных.
+        
+        Args:
+            track_info: Словарь с информацией о треке
             
+        Returns:
+            Данные обложки или None, если ее нет или она не загрузилась
+        """
+        url = track_info.get('cover_url')
+        if not url:
+            return None
+        
+        cover = self._cover_cache.get(url)
+        if cover is not None:
+            return cover
+        return await self._flights.do(('cover', url), lambda: self._fetch_cover(url))
+
+    async def _fetch_cover(self, url: str) -> Optional[bytes]:
+        try:
+            timeout = aiohttp.ClientTimeout(total=config.cover_timeout)
+            async with http_client.session.get(url, timeout=timeout) as response:
+                if response.status != 200:
+                    logger.warning(f"Не удалось загрузить обложку: HTTP {response.status}")
+                    return None
+                cover = await response.read()
         except Exception as e:
-            logger.error(f"Ошибка при установке метаданных: {e}", exc_info=True)
-            return False
+            # Без обложки трек все равно можно отдать
+            logger.warning(f"Ошибка при загрузке обложки {url}: {e}")
+            return None
+        
+        self._cover_cache.set(url, cover)
+        return cover
+
+    async def get_track_layout(self, download_url: str, track_info: Dict) -> Optional[Tuple[int, int]]:
+        """
+        Определяет размер исходного ID3 тега и данных трека в хранилище.
+        
+        Для трека из дискового кэша размер известен сразу. Иначе в хранилище
+        запрашиваются первые байты файла: заголовок ID3 и полный размер из
+        Content-Range. Результат запоминается.
+        
+        Args:
+            download_url: Прямая ссылка на скачивание
+            track_info: Словарь с информацией о треке и ключом bitrate
+            
+        Returns:
+            Кортеж (размер исходного тега, размер данных без тега) или None
+        """
+        key = BlobCache.make_key(track_info['id'], track_info['bitrate'])
+        cached_size = self.blob_cache.size(key)
+        if cached_size is not None:
+            return 0, cached_size
+        
+        layout = self._layout_cache.get(key)
+        if layout is not None:
+            return layout
+        
+        try:
+            response = await http_client.session.get(
+                download_url,
+                headers={'Range': f'bytes=0-{ID3_HEADER_SIZE - 1}'}
+            )
+            try:
+                if response.status == 206:
+                    total = int(response.headers['Content-Range'].rpartition('/')[2])
+                    head = await response.read()
+                elif response.status == 200 and response.content_length:
+                    total = response.content_length
+                    head = await response.content.readexactly(ID3_HEADER_SIZE)
+                else:
+                    logger.error(f"Не удалось определить размер трека: HTTP {response.status}")
+                    return None
+            finally:
+                response.release()
+        except Exception as e:
+            logger.error(f"Ошибка при определении размера трека {track_info['id']}: {e}")
+            ERRORS.labels('download').inc()
+            return None
+        
+        tag_size = id3v2_tag_size(head)
+        layout = (tag_size, total - tag_size)
+        self._layout_cache.set(key, layout)
+        return layout
+
+    async def open_track_range(
+        self, download_url: str, track_info: Dict, start: int, end: int, tag_size: int
+    ) -> Optional[Union[TrackStream, CachedTrackStream]]:
+        """
+        Открывает поток части данных трека без ID3 тега.
+        
+        Диапазон отдается из дискового кэша, если трек там есть, иначе
+        запрашивается в хранилище через заголовок Range со сдвигом на
+        размер исходного тега.
+        
+        Args:
+            download_url: Прямая ссылка на скачивание
+            track_info: Словарь с информацией о треке и ключом bitrate
+            start: Первый байт данных
+            end: Последний байт данных включительно
+            tag_size: Размер исходного ID3 тега в хранилище
+            
+        Returns:
+            Поток запрошенной части данных или None в случае ошибки
+        """
+        key = BlobCache.make_key(track_info['id'], track_info['bitrate'])
+        path = self.blob_cache.get(key)
+        if path is not None:
+            cached = await self._open_cached(CachedTrackStream(path, b'', start=start, end=end))
+            if cached is not None:
+                return cached
+        
+        stats = DownloadStats(download_url)
+        try:
+            response = await http_client.session.get(
+                download_url,
+                headers={'Range': f'bytes={tag_size + start}-{tag_size + end}'}
+            )
+        except Exception as e:
+            logger.error(f"Ошибка при скачивании части трека: {e}", exc_info=True)
+            ERRORS.labels('download').inc()
+            return None
+        
+        if response.status != 206:
+            logger.error(f"Хранилище не вернуло часть трека: HTTP {response.status}")
+            ERRORS.labels('download').inc()
+            response.release()
+            return None
+        stats.start(response.content_length)
+        return TrackStream(response, b'', strip=False, stats=stats)
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Приводит поисковый запрос к виду, используемому в качестве ключа кэша."""
+        return " ".join(query.lower().split())
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Возвращает статистику кэшей сервиса.
+
+        Returns:
+            Словарь со статистикой по каждому кэшу
+        """
+        return {
+            'search': self._search_cache.stats(),
+            'resolve': self._resolve_cache.stats(),
+        }
+
+    def flight_stats(self) -> Dict[str, int]:
+        """
+        Возвращает статистику объединения одинаковых параллельных запросов.
+
+        Returns:
+            Словарь с количеством выполненных и объединенных вызовов
+        """
+        return self._flights.stats()
 
     async def search_track(self, query: str, limit: int = 5, fetch_download_info: bool = True) -> List[Dict]:
+        with SEARCH_LATENCY.time():
+            return await self._search_track(query, limit, fetch_download_info)
+
+    async def _search_track(self, query: str, limit: int, fetch_download_info: bool) -> List[Dict]:
+        # Результаты поиска кэшируются без ссылок на скачивание:
+        # прямые ссылки живут недолго и запрашиваются отдельно
+        cache_key = (self._normalize_query(query), limit)
         try:
-            await self.ensure_initialized()
-            
-            # Выполняем поиск через асинхронный клиент
-            search_result = await self.client.search(query)
-            if not search_result or not search_result.tracks:
-                return []
-            
-            tracks = search_result.tracks.results[:limit]
-            results = []
-            
-            for track in tracks:
-                # Создаем базовую информацию о треке
-                track_info = {
-                    'title': track.title,
-                    'artists': [artist.name for artist in track.artists],
-                    'duration_ms': track.duration_ms,
-                    'id': track.id,
-                    'track_link': f"https://music.yandex.ru/track/{track.id}"
-                }
-                results.append(track_info)
-                
-                # Если нужно получить информацию о скачивании
-                if fetch_download_info:
-                    download_link = await self.get_track_download_info(track.id)
-                    if download_link:
-                        track_info['download_link'] = download_link
+            cached = self._search_cache.get(cache_key)
+            if cached is None:
+                # Одинаковые параллельные запросы ждут один общий поиск
+                cached = await self._flights.do(
+                    ('search',) + cache_key,
+                    lambda: self._search_and_cache(query, cache_key)
+                )
+            else:
+                logger.debug(f"Результаты поиска для '{query}' взяты из кэша")
+            
+            # Копируем словари, чтобы не портить закэшированные данные
+            results = [dict(track_info) for track_info in cached]
+            
+            # Если нужно получить информацию о скачивании
+            if fetch_download_info:
+                await self._resolve_download_links(results)
             
             return results
         except Exception as e:
             logger.error(f"Ошибка при поиске треков: {e}")
+            ERRORS.labels('search').inc()
+            return self._stale(('search',) + cache_key) or []
+
+    async def _resolve_download_links(self, results: List[Dict]) -> None:
+        """
+        Параллельно получает ссылки на скачивание для результатов поиска.
+        
+        Число одновременных запросов ограничено, а каждый трек ждет ссылку
+        не дольше resolve_timeout. Треки, для которых ссылку получить не
+        удалось, остаются в результатах без download_link.
+        
+        Args:
+            results: Результаты поиска, дополняемые ключом download_link
+        """
+        semaphore = asyncio.Semaphore(config.resolve_concurrency)
+        
+        async def resolve(track_info: Dict) -> None:
+            async with semaphore:
+                try:
+                    download_link = await asyncio.wait_for(
+                        self.get_track_download_info(track_info['id']),
+                        timeout=config.resolve_timeout
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(f"Превышен таймаут получения ссылки для трека {track_info['id']}")
+                    ERRORS.labels('download_info').inc()
+                    return
+            if download_link:
+                track_info['download_link'] = download_link
+        
+        await asyncio.gather(*(resolve(track_info) for track_info in results))
+
+    async def _search_and_cache(self, query: str, cache_key: tuple) -> List[Dict]:
+        results = await self._search_upstream(query, cache_key[1])
+        self._search_cache.set(cache_key, results)
+        self._stale_cache.set(('search',) + cache_key, results)
+        return results
+
+    async def _search_upstream(self, query: str, limit: int) -> List[Dict]:
+        await self.ensure_initialized()
+        
+        # Выполняем поиск через асинхронный клиент
+        search_result = await self._call('search', self.client.search, query)
+        if not search_result or not search_result.tracks:
             return []
+        
+        return self._track_infos(search_result.tracks.results[:limit])
+
+    async def search_page(self, query: str, page: int = 0) -> Optional[List[Dict]]:
+        """
+        Возвращает одну страницу результатов поиска треков.
+
+        Args:
+            query: Поисковый запрос
+            page: Номер страницы выдачи, начиная с 0
+
+        Returns:
+            Список треков страницы (пустой, если страниц больше нет)
+            или None при ошибке. Если API недоступен, возвращается последняя
+            полученная страница, треки которой помечены ключом stale
+        """
+        stale_key = ('page', self._normalize_query(query), page)
+        with SEARCH_LATENCY.time():
+            try:
+                await self.ensure_initialized()
+                search_result = await self._call('search', self.client.search, query, type_='track', page=page)
+                if not search_result or not search_result.tracks:
+                    return []
+                results = self._track_infos(search_result.tracks.results)
+                self._stale_cache.set(stale_key, results)
+                return results
+            except Exception as e:
+                logger.error(f"Ошибка при получении страницы {page} поиска: {e}")
+                ERRORS.labels('search').inc()
+                return self._stale(stale_key)
+
+    @staticmethod
+    def _track_infos(tracks) -> List[Dict]:
+        results = []
+        
+        for track in tracks:
+            # Создаем базовую информацию о треке
+            track_info = {
+                'title': track.title,
+                'artists': [artist.name for artist in track.artists],
+                'duration_ms': track.duration_ms,
+                'id': track.id,
+                'track_link': f"https://music.yandex.ru/track/{track.id}"
+            }
+            results.append(track_info)
+        
+        return results
 
     async def get_track_download_info(self, track_id: Union[int, str]) -> Optional[str]:
-        try:
-            await self.ensure_initialized()
+        with RESOLVE_LATENCY.labels('download_info').time():
+            # Ссылка могла быть уже получена вместе с полной информацией о треке
+            cached = self._resolve_cache.get(str(track_id))
+            if cached is not None:
+                return cached['download_link']
             
-            # Получаем информацию о треке через асинхронный клиент
-            tracks = await self.client.tracks([track_id])
-            if not tracks:
-                logger.error(f"Трек {track_id} не найден")
+            return await self._flights.do(
+                ('download_info', str(track_id)),
+                lambda: self._get_track_download_info(track_id)
+            )
+
+    async def _get_track_download_info(self, track_id: Union[int, str]) -> Optional[str]:
+        try:
+            track = await self._fetch_track(track_id)
+            if track is None:
                 return None
             
-            track = tracks[0]
-            # Получаем информацию о скачивании
-            info = await track.get_download_info_async()
-            if not info:
+            download_link = await self._get_direct_link(track)
+            if not download_link:
                 logger.error(f"Не удалось получить информацию о скачивании для трека {track_id}")
                 return None
             
-            best_quality = max(info, key=lambda x: x.bitrate_in_kbps)
-            download_link = await best_quality.get_direct_link_async()
-            
             logger.info(f"Получена ссылка на скачивание для трека {track_id}")
             return download_link
             
         except Exception as e:
             logger.error(f"Ошибка при получении информации о скачивании трека {track_id}: {e}", exc_info=True)
+            ERRORS.labels('download_info').inc()
             return None
 
     async def get_track_full_info(self, track_id: Union[int, str]) -> Optional[Dict]:
-        try:
-            await self.ensure_initialized()
+        """
+        Получает метаданные трека вместе с прямой ссылкой на скачивание.
+        
+        Это основной способ подготовить трек к скачиванию: метаданные и ссылка
+        получаются из одного вызова tracks(), поэтому отдельно вызывать
+        get_track_download_info не нужно.
+        
+        Args:
+            track_id: ID трека в Яндекс.Музыке
             
-            # Получаем информацию о треке через асинхронный клиент
-            tracks = await self.client.tracks([track_id])
-            if not tracks:
-                logger.error(f"Трек {track_id} не найден")
+        Returns:
+            Словарь с информацией о треке и ключом download_link или None.
+            Результат, взятый из кэша, помечен ключом cached, а сохраненный
+            результат, отданный при недоступности API, - ключом stale
+        """
+        with RESOLVE_LATENCY.labels('full_info').time():
+            cached = self._resolve_cache.get(str(track_id))
+            if cached is not None:
+                logger.debug(f"Информация о треке {track_id} взята из кэша")
+                return dict(cached, cached=True)
+            
+            result = await self._flights.do(
+                ('full_info', str(track_id)),
+                lambda: self._get_track_full_info(track_id)
+            )
+            return dict(result) if result is not None else None
+
+    def invalidate_track_info(self, track_id: Union[int, str]) -> None:
+        """
+        Удаляет подготовленную информацию о треке из кэша.
+        
+        Args:
+            track_id: ID трека в Яндекс.Музыке
+        """
+        self._resolve_cache.pop(str(track_id))
+
+    def prefetch_track_info(self, track_ids: Iterable[Union[int, str]]) -> int:
+        """
+        Заранее получает информацию для скачивания треков в фоне.
+        
+        Обычно пользователь выбирает один из первых найденных треков, поэтому
+        ссылка на скачивание к этому моменту уже лежит в кэше. Количество
+        одновременных фоновых запросов ограничено, лишние пропускаются.
+        
+        Args:
+            track_ids: ID треков в порядке приоритета
+            
+        Returns:
+            Количество запущенных фоновых запросов
+        """
+        scheduled = 0
+        for track_id in track_ids:
+            if str(track_id) in self._resolve_cache:
+                continue
+            if len(self._prefetches) >= self.prefetch_max_inflight:
+                self.prefetch_skipped += 1
+                continue
+            
+            task = asyncio.create_task(self.get_track_full_info(track_id))
+            self._prefetches.add(task)
+            task.add_done_callback(self._prefetches.discard)
+            scheduled += 1
+        
+        self.prefetch_scheduled += scheduled
+        return scheduled
+
+    def prefetch_stats(self) -> Dict[str, int]:
+        """
+        Возвращает статистику фоновой подготовки треков.
+
+        Returns:
+            Словарь с количеством запущенных, пропущенных и выполняющихся запросов
+        """
+        return {
+            'scheduled': self.prefetch_scheduled,
+            'skipped': self.prefetch_skipped,
+            'inflight': len(self._prefetches),
+        }
+
+    async def _get_track_full_info(self, track_id: Union[int, str]) -> Optional[Dict]:
+        try:
+            track = await self._fetch_track(track_id)
+            if track is None:
                 return None
-                
-            track = tracks[0]
             
-            # Получаем ссылку на скачивание
-            download_link = await self.get_track_download_info(track_id)
+            # Получаем ссылку на скачивание для уже загруженного трека
+            best_quality = await self._get_best_download_info(track)
+            download_link = None
+            if best_quality:
+                download_link = await self._call('download_info', best_quality.get_direct_link_async)
             if not download_link:
                 logger.error(f"Не удалось получить информацию о скачивании для трека {track_id}")
                 return None
@@ -191,15 +870,88 @@ class MusicService:
                 'artists': [artist.name for artist in track.artists],
                 'duration_ms': track.duration_ms,
                 'track_link': f'https://music.yandex.ru/track/{track.id}',
-                'download_link': download_link
+                'download_link': download_link,
+                'bitrate': best_quality.bitrate_in_kbps
             }
+            result.update(self._album_info(track))
+            self._resolve_cache.set(str(track_id), result)
+            self._stale_cache.set(('full_info', str(track_id)), result)
             
             logger.info(f"Получена полная информация о треке {track_id}")
             return result
             
         except Exception as e:
             logger.error(f"Ошибка при получении информации о треке {track_id}: {e}", exc_info=True)
+            ERRORS.labels('full_info').inc()
+            return self._stale(('full_info', str(track_id)))
+
+    @staticmethod
+    def _album_info(track) -> Dict:
+        """Извлекает альбом, номер трека и ссылку на обложку для ID3 тега."""
+        info = {
+            'cover_url': track.get_cover_url(config.cover_size) if track.cover_uri else None
+        }
+        if track.albums:
+            album = track.albums[0]
+            info['album'] = album.title
+            if album.track_position:
+                info['track_number'] = album.track_position.index
+        return info
+
+    async def _fetch_track(self, track_id: Union[int, str]):
+        # ID может быть в виде "<трек>:<альбом>", в пакете трек ищется по своему ID
+        key = str(track_id).partition(':')[0]
+        if not TRACK_ID_RE.fullmatch(key):
+            logger.error(f"Некорректный ID трека: {track_id}")
+            return None
+        
+        await self.ensure_initialized()
+        
+        # Получаем информацию о треке в составе общего пакета запросов
+        track = await self._track_loader.load(key)
+        if track is None:
+            logger.error(f"Трек {track_id} не найден")
+        return track
+
+    async def _load_tracks(self, track_ids: List[str]) -> Dict[str, object]:
+        """
+        Загружает несколько треков одним вызовом tracks().
+        
+        Args:
+            track_ids: ID треков
+            
+        Returns:
+            Словарь {ID трека: трек} для найденных треков
+        """
+        tracks = await self._call('tracks', self.client.tracks, track_ids) or []
+        if len(track_ids) == 1:
+            # Ответ на запрос одного трека не сопоставляем по ID, как и раньше
+            return {track_ids[0]: tracks[0]} if tracks else {}
+        
+        logger.debug(f"Загружено треков одним запросом: {len(track_ids)}")
+        return {str(track.id): track for track in tracks}
+
+    def batch_stats(self) -> Dict[str, float]:
+        """
+        Возвращает статистику объединения запросов треков в пакеты.
+
+        Returns:
+            Словарь с количеством запросов, пакетов и ключей
+        """
+        return self._track_loader.stats()
+
+    async def _get_best_download_info(self, track):
+        # Получаем информацию о скачивании и выбираем лучшее качество
+        info = await self._call('download_info', track.get_download_info_async)
+        if not info:
+            return None
+        return max(info, key=lambda x: x.bitrate_in_kbps)
+
+    async def _get_direct_link(self, track) -> Optional[str]:
+        best_quality = await self._get_best_download_info(track)
+        if best_quality is None:
             return None
+        return await self._call('download_info', best_quality.get_direct_link_async)
 
 
 # Создаем экземпляр-синглтон
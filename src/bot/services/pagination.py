@@ -0,0 +1,318 @@
+"""
+Постраничная выдача результатов inline-поиска.
+
+Этот модуль хранит для каждого поискового запроса накопленный набор
+результатов и отдает из него страницы по смещению inline-запроса. Страницы
+выдачи Яндекс.Музыки запрашиваются по мере необходимости, а следующая
+страница загружается в фоне, пока пользователь смотрит текущую.
+
+Пока пользователь уточняет запрос ("metal" → "metallica"), предварительные
+результаты отбираются из уже найденных по более короткому запросу. Такой
+запрос находится по отсортированному индексу сохраненных запросов.
+"""
+
+import asyncio
+import bisect
+import os
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from loguru import logger
+from bot.config.config import config
+from bot.services.music import music_service
+from bot.utils.cache import TTLCache
+from bot.utils.singleflight import SingleFlight
+
+
+def normalize_query(query: str) -> str:
+    """Приводит поисковый запрос к виду, используемому в качестве ключа."""
+    return " ".join(query.lower().split())
+
+
+def rank_tracks(query: str, tracks: List[Dict]) -> List[Dict]:
+    """
+    Отбирает треки, подходящие под запрос, и сортирует их по совпадению.
+
+    Трек подходит, если каждое слово запроса встречается в названии или
+    именах исполнителей. Выше ставятся треки, название которых начинается
+    с запроса, затем совпадения по названию, затем по исполнителю.
+
+    Args:
+        query: Нормализованный поисковый запрос
+        tracks: Треки для отбора
+
+    Returns:
+        Подходящие треки в порядке убывания совпадения
+    """
+    words = query.split()
+    ranked = []
+    for position, track in enumerate(tracks):
+        title = track['title'].lower()
+        artists = [artist.lower() for artist in track['artists']]
+        text = " ".join([title] + artists)
+        if not all(word in text for word in words):
+            continue
+
+        if title.startswith(query):
+            score = 0
+        elif all(word in title for word in words):
+            score = 1
+        elif any(artist.startswith(query) for artist in artists):
+            score = 2
+        else:
+            score = 3
+        ranked.append((score, position, track))
+
+    ranked.sort(key=lambda item: item[:2])
+    return [track for _, _, track in ranked]
+
+
+class SearchResultSet:
+    """Накопленные результаты поиска по одному запросу."""
+
+    def __init__(self):
+        self.tracks: List[Dict] = []
+        self.seen: Set[str] = set()
+        self.next_page = 0
+        self.exhausted = False
+        # Часть результатов - сохраненные страницы, отданные при недоступности API
+        self.stale = False
+
+    def extend(self, tracks: List[Dict]) -> None:
+        """Добавляет треки, пропуская уже встречавшиеся на предыдущих страницах."""
+        for track in tracks:
+            track_id = str(track['id'])
+            if track_id not in self.seen:
+                self.seen.add(track_id)
+                self.tracks.append(track)
+
+
+class InlinePaginator:
+    """Отдает страницы результатов поиска по смещению с фоновой подгрузкой."""
+
+    def __init__(
+        self,
+        fetch: Callable[[str, int], Awaitable[Optional[List[Dict]]]],
+        page_size: int = 10,
+        ttl: float = 600.0,
+        max_queries: int = 1000,
+        max_results: int = 200,
+        min_prefix: int = 2,
+        prefetch: Optional[Callable[[List], Any]] = None,
+        prefetch_top_k: int = 2,
+    ):
+        """
+        Args:
+            fetch: Функция получения страницы выдачи (запрос, номер страницы),
+                возвращающая список треков или None при ошибке
+            page_size: Количество результатов в одном ответе на inline-запрос
+            ttl: Время хранения результатов запроса с последнего обращения в секундах
+            max_queries: Максимальное количество хранимых запросов
+            max_results: Максимальное количество результатов по одному запросу
+            min_prefix: Минимальная длина запроса, результаты которого
+                используются для предварительной выдачи
+            prefetch: Функция, заранее готовящая скачивание треков по списку ID
+            prefetch_top_k: Количество первых результатов, передаваемых в prefetch
+        """
+        self.fetch = fetch
+        self.page_size = page_size
+        self.max_results = max_results
+        self.min_prefix = min_prefix
+        self.prefetch = prefetch
+        self.prefetch_top_k = prefetch_top_k
+        self.max_queries = max_queries
+        self._sets = TTLCache(maxsize=max_queries, ttl=ttl)
+        # Отсортированные ключи сохраненных запросов для поиска по началу строки.
+        # Вытесненные из кэша ключи удаляются из индекса при поиске.
+        self._keys: List[str] = []
+        self._flights = SingleFlight()
+        self._prefetches: Set[asyncio.Task] = set()
+        self.pages = 0
+        self.upstream_pages = 0
+        self.prefetches = 0
+        self.provisional = 0
+
+    @staticmethod
+    def parse_offset(offset: str) -> int:
+        """
+        Преобразует смещение inline-запроса в номер первого результата.
+
+        Args:
+            offset: Смещение из InlineQuery.offset
+
+        Returns:
+            Номер первого результата страницы
+        """
+        return int(offset) if offset and offset.isdigit() else 0
+
+    async def get_page(self, query: str, offset: str = "") -> Tuple[List[Dict], str]:
+        """
+        Возвращает страницу результатов поиска.
+
+        Args:
+            query: Поисковый запрос
+            offset: Смещение из InlineQuery.offset
+
+        Returns:
+            Кортеж (треки страницы, смещение следующей страницы или пустая строка)
+        """
+        start = self.parse_offset(offset)
+        end = start + self.page_size
+        key = normalize_query(query)
+
+        # Каждое обращение продлевает время хранения результатов запроса
+        state = self._sets.get(key)
+        if state is None:
+            state = SearchResultSet()
+            self._index(key)
+        self._sets.set(key, state)
+
+        await self._fill(key, query, state, end)
+        self.pages += 1
+
+        page = state.tracks[start:end]
+        has_more = len(state.tracks) > end or not state.exhausted
+        next_offset = str(end) if page and has_more else ""
+
+        if state.stale:
+            # Устаревшие результаты не храним: следующий запрос снова обратится к API
+            self._sets.pop(key)
+            return page, next_offset
+
+        # Пользователь обычно выбирает один из первых треков выдачи
+        if start == 0 and page and self.prefetch is not None:
+            self.prefetch([track['id'] for track in page[:self.prefetch_top_k]])
+
+        # Пока пользователь смотрит текущую страницу, в запасе держим еще две
+        if not state.exhausted and len(state.tracks) < end + 2 * self.page_size:
+            self._prefetch(key, query, state, end + 2 * self.page_size)
+
+        return page, next_offset
+
+    def provisional_page(self, query: str) -> Optional[List[Dict]]:
+        """
+        Возвращает предварительные результаты для уточненного запроса.
+
+        Если по запросу еще ничего не найдено, результаты отбираются из уже
+        найденных по самому длинному запросу, который является его началом
+        и дает хотя бы один подходящий трек.
+
+        Args:
+            query: Поисковый запрос
+
+        Returns:
+            Треки первой страницы или None, если предварительной выдачи нет
+        """
+        key = normalize_query(query)
+        state = self._sets.get(key) if key in self._sets else None
+        if state is not None and state.tracks:
+            # Настоящие результаты уже есть
+            return None
+
+        for prefix in self._stored_prefixes(key):
+            tracks = rank_tracks(key, self._sets.get(prefix).tracks)
+            if tracks:
+                self.provisional += 1
+                return tracks[:self.page_size]
+        return None
+
+    def _index(self, key: str) -> None:
+        position = bisect.bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            return
+        self._keys.insert(position, key)
+        if len(self._keys) > 2 * self.max_queries:
+            # Индекс не должен расти из-за давно вытесненных запросов
+            self._keys = [k for k in self._keys if k in self._sets]
+
+    def _stored_prefixes(self, key: str) -> Iterator[str]:
+        """
+        Перебирает сохраненные запросы, которые являются началом key,
+        от самого длинного к самому короткому.
+
+        Ближайший к искомой строке ключ индекса либо является ее началом,
+        либо имеет с ней общее начало, по которому ищется следующий
+        кандидат, поэтому перебор занимает O(len(key) * log n).
+        """
+        probe = key[:-1]
+        while len(probe) >= self.min_prefix:
+            position = bisect.bisect_right(self._keys, probe)
+            if position == 0:
+                return
+            candidate = self._keys[position - 1]
+            if not probe.startswith(candidate):
+                probe = os.path.commonprefix([probe, candidate])
+                continue
+            if len(candidate) < self.min_prefix:
+                return
+            if candidate not in self._sets:
+                # Запрос вытеснен из кэша
+                del self._keys[position - 1]
+                continue
+            yield candidate
+            probe = candidate[:-1]
+
+    async def _fill(self, key: str, query: str, state: SearchResultSet, count: int) -> None:
+        while len(state.tracks) < count and not state.exhausted:
+            page = state.next_page
+            # Фоновая подгрузка и запрос пользователя ждут одну общую загрузку
+            await self._flights.do((key, page), lambda: self._load_page(query, state, page))
+            if state.next_page == page:
+                # Страница не загрузилась, отдаем то, что есть
+                break
+
+    async def _load_page(self, query: str, state: SearchResultSet, page: int) -> None:
+        if state.next_page != page:
+            return
+
+        tracks = await self.fetch(query, page)
+        if tracks is None:
+            return
+
+        self.upstream_pages += 1
+        if any(track.get('stale') for track in tracks):
+            state.stale = True
+        known = len(state.tracks)
+        state.extend(tracks)
+        state.next_page = page + 1
+        # Страница без новых треков означает конец выдачи
+        if len(state.tracks) == known or len(state.tracks) >= self.max_results:
+            state.exhausted = True
+
+    def _prefetch(self, key: str, query: str, state: SearchResultSet, count: int) -> None:
+        async def prefetch():
+            try:
+                await self._fill(key, query, state, count)
+            except Exception as e:
+                logger.warning(f"Ошибка фоновой загрузки результатов для '{query}': {e}")
+
+        self.prefetches += 1
+        task = asyncio.create_task(prefetch())
+        self._prefetches.add(task)
+        task.add_done_callback(self._prefetches.discard)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает статистику постраничной выдачи.
+
+        Returns:
+            Словарь с количеством хранимых запросов, отданных страниц
+            и загруженных страниц выдачи
+        """
+        return {
+            'queries': len(self._sets),
+            'pages': self.pages,
+            'upstream_pages': self.upstream_pages,
+            'prefetches': self.prefetches,
+            'provisional': self.provisional,
+        }
+
+
+# Создаем экземпляр-синглтон
+inline_paginator = InlinePaginator(
+    music_service.search_page,
+    page_size=config.inline_page_size,
+    ttl=config.inline_results_ttl,
+    max_queries=config.inline_results_max_queries,
+    prefetch=music_service.prefetch_track_info,
+    prefetch_top_k=config.prefetch_top_k,
+)
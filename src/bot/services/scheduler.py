@@ -0,0 +1,261 @@
+"""
+Планировщик загрузок треков.
+
+Этот модуль ограничивает количество одновременных скачиваний и распределяет
+их между чатами по очереди (round-robin), чтобы один пользователь с большим
+количеством ссылок не занимал все слоты. Очередь ограничена по размеру,
+при переполнении новые загрузки отклоняются.
+"""
+
+import asyncio
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from loguru import logger
+from bot.config.config import config
+
+
+class DownloadJob:
+    """Задание на скачивание в очереди планировщика."""
+
+    def __init__(
+        self,
+        chat_id: int,
+        func: Callable[[], Awaitable[None]],
+        on_cancel: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        """
+        Args:
+            chat_id: ID чата, которому принадлежит загрузка
+            func: Функция без аргументов, возвращающая корутину загрузки
+            on_cancel: Функция, вызываемая при отмене задания
+        """
+        self.chat_id = chat_id
+        self.func = func
+        self.on_cancel = on_cancel
+
+
+class DownloadScheduler:
+    """Очередь загрузок с общим лимитом параллельности и справедливостью между чатами."""
+
+    def __init__(self, max_concurrent: int = 3, max_queue: int = 50, max_per_chat: int = 5):
+        """
+        Args:
+            max_concurrent: Максимальное количество одновременных загрузок
+            max_queue: Максимальное количество ожидающих загрузок
+            max_per_chat: Максимальное количество ожидающих загрузок одного чата
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_per_chat = max_per_chat
+        self._queues: "OrderedDict[int, Deque[DownloadJob]]" = OrderedDict()
+        self._queued = 0
+        self._running: Dict[asyncio.Task, DownloadJob] = {}
+        self._workers: List[asyncio.Task] = []
+        self._has_jobs = asyncio.Event()
+        self._closing = False
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.cancelled = 0
+
+    @property
+    def queued(self) -> int:
+        """Количество ожидающих загрузок."""
+        return self._queued
+
+    @property
+    def running(self) -> int:
+        """Количество выполняющихся загрузок."""
+        return len(self._running)
+
+    def submit(
+        self,
+        chat_id: int,
+        func: Callable[[], Awaitable[None]],
+        on_cancel: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> Optional[int]:
+        """
+        Ставит загрузку в очередь.
+
+        Args:
+            chat_id: ID чата, которому принадлежит загрузка
+            func: Функция без аргументов, возвращающая корутину загрузки
+            on_cancel: Функция, вызываемая при отмене задания
+
+        Returns:
+            Количество загрузок, которые будут выполнены раньше (0 - загрузка
+            начнется сразу), или None, если очередь переполнена
+        """
+        chat_queue = self._queues.get(chat_id)
+        if (
+            self._closing
+            or self._queued >= self.max_queue
+            or (chat_queue is not None and len(chat_queue) >= self.max_per_chat)
+        ):
+            self.rejected += 1
+            logger.warning(f"Загрузка для чата {chat_id} отклонена: очередь переполнена")
+            return None
+
+        if chat_queue is None:
+            chat_queue = self._queues[chat_id] = deque()
+        chat_queue.append(DownloadJob(chat_id, func, on_cancel))
+        self._queued += 1
+        self.submitted += 1
+
+        position = self._position(chat_id, len(chat_queue) - 1)
+        free_slots = self.max_concurrent - len(self._running)
+
+        self._ensure_workers()
+        self._has_jobs.set()
+        return max(0, position - free_slots)
+
+    def _position(self, chat_id: int, index: int) -> int:
+        # При round-robin до задания с номером index в своем чате успеют
+        # выполниться до index + 1 заданий чатов, стоящих раньше в очереди,
+        # и до index заданий чатов, стоящих позже
+        position = 0
+        before = True
+        for other_chat_id, chat_queue in self._queues.items():
+            if other_chat_id == chat_id:
+                before = False
+                position += index + 1
+            else:
+                position += min(len(chat_queue), index + 1 if before else index)
+        return position
+
+    def _ensure_workers(self) -> None:
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.max_concurrent:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    def _pop_next(self) -> DownloadJob:
+        # Берем задание у первого чата и переносим чат в конец очереди
+        chat_id, chat_queue = self._queues.popitem(last=False)
+        job = chat_queue.popleft()
+        if chat_queue:
+            self._queues[chat_id] = chat_queue
+        self._queued -= 1
+        return job
+
+    async def _next_job(self) -> Optional[DownloadJob]:
+        while True:
+            if self._queues:
+                return self._pop_next()
+            if self._closing:
+                return None
+            self._has_jobs.clear()
+            await self._has_jobs.wait()
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._next_job()
+            if job is None:
+                return
+
+            task = asyncio.ensure_future(job.func())
+            self._running[task] = job
+            try:
+                await asyncio.wait({task})
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            finally:
+                self._running.pop(task, None)
+
+            if task.cancelled():
+                self.cancelled += 1
+                await self._notify_cancel(job)
+            elif task.exception() is not None:
+                self.failed += 1
+                logger.error(f"Ошибка при скачивании: {task.exception()}")
+            else:
+                self.completed += 1
+
+    async def _notify_cancel(self, job: DownloadJob) -> None:
+        if job.on_cancel is None:
+            return
+        try:
+            await job.on_cancel()
+        except Exception as e:
+            logger.warning(f"Ошибка при обработке отмены загрузки: {e}")
+
+    async def cancel(self, chat_id: int) -> int:
+        """
+        Отменяет ожидающие и выполняющиеся загрузки чата.
+
+        Args:
+            chat_id: ID чата
+
+        Returns:
+            Количество отмененных загрузок
+        """
+        chat_queue = self._queues.pop(chat_id, deque())
+        self._queued -= len(chat_queue)
+        for job in chat_queue:
+            self.cancelled += 1
+            await self._notify_cancel(job)
+
+        running = [task for task, job in self._running.items() if job.chat_id == chat_id]
+        for task in running:
+            task.cancel()
+
+        count = len(chat_queue) + len(running)
+        if count:
+            logger.info(f"Отменено загрузок для чата {chat_id}: {count}")
+        return count
+
+    async def shutdown(self, timeout: float = 30.0) -> None:
+        """
+        Останавливает планировщик, дожидаясь завершения загрузок.
+
+        Новые загрузки перестают приниматься, ожидающие и выполняющиеся загрузки
+        получают timeout секунд на завершение, после чего отменяются.
+
+        Args:
+            timeout: Время ожидания завершения загрузок в секундах
+        """
+        self._closing = True
+        self._has_jobs.set()
+        workers = [worker for worker in self._workers if not worker.done()]
+        if not workers:
+            return
+
+        logger.info(f"Ожидаем завершения загрузок: {self.running} активных, {self.queued} в очереди")
+        _, pending = await asyncio.wait(workers, timeout=timeout)
+        if pending:
+            logger.warning(f"Загрузки не завершились за {timeout} с, отменяем")
+            for chat_id in list(self._queues):
+                await self.cancel(chat_id)
+            for worker in pending:
+                worker.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает статистику планировщика.
+
+        Returns:
+            Словарь с размером очереди, количеством активных загрузок и счетчиками
+        """
+        return {
+            'queued': self._queued,
+            'running': len(self._running),
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'cancelled': self.cancelled,
+        }
+
+
+# Создаем экземпляр-синглтон
+download_scheduler = DownloadScheduler(
+    max_concurrent=config.download_max_concurrent,
+    max_queue=config.download_queue_size,
+    max_per_chat=config.download_max_per_chat,
+)
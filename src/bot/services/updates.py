@@ -0,0 +1,177 @@
+"""
+Очередь входящих обновлений Telegram.
+
+Этот модуль позволяет отвечать на запрос вебхука сразу после разбора
+обновления, а обрабатывать его в фоне пулом обработчиков. Обновления одного
+чата обрабатываются строго по порядку, обновления разных чатов - параллельно.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Hashable, List
+
+from aiogram.types import Update
+from loguru import logger
+from bot.utils.metrics import UPDATE_LATENCY, UPDATE_QUEUE_WAIT
+
+
+OVERFLOW_REJECT = "reject"
+OVERFLOW_DROP = "drop"
+
+
+class UpdateQueue:
+    """Ограниченная очередь обновлений с пулом обработчиков и порядком внутри чата."""
+
+    def __init__(
+        self,
+        handler: Callable[[Update], Awaitable[None]],
+        workers: int = 8,
+        max_size: int = 1000,
+        overflow: str = OVERFLOW_REJECT,
+    ):
+        """
+        Args:
+            handler: Функция обработки одного обновления
+            workers: Количество обработчиков
+            max_size: Максимальное количество необработанных обновлений
+            overflow: Поведение при переполнении: "reject" - отказать, чтобы
+                Telegram повторил доставку позже, "drop" - подтвердить и отбросить
+        """
+        if overflow not in (OVERFLOW_REJECT, OVERFLOW_DROP):
+            raise ValueError(f"Неизвестная политика переполнения: {overflow}")
+        self.handler = handler
+        self.workers = workers
+        self.max_size = max_size
+        self.overflow = overflow
+        self._buffers: Dict[Hashable, Deque[tuple]] = {}
+        self._ready: "asyncio.Queue[Hashable]" = asyncio.Queue()
+        self._size = 0
+        self._tasks: List[asyncio.Task] = []
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closing = False
+        self.accepted = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def ordering_key(update: Update) -> Hashable:
+        """
+        Возвращает ключ, внутри которого сохраняется порядок обработки.
+
+        Сообщения и нажатия кнопок упорядочиваются по чату. Inline-запросы
+        независимы друг от друга и обрабатываются без упорядочивания.
+        """
+        if update.message is not None:
+            return update.message.chat.id
+        if update.callback_query is not None:
+            return update.callback_query.from_user.id
+        return ('update', update.update_id)
+
+    def put(self, update: Update) -> bool:
+        """
+        Ставит обновление в очередь.
+
+        Args:
+            update: Обновление Telegram
+
+        Returns:
+            True если обновление принято (в том числе отброшено по политике "drop"),
+            False если Telegram должен повторить доставку
+        """
+        if self._closing:
+            self.rejected += 1
+            return False
+
+        if self._size >= self.max_size:
+            if self.overflow == OVERFLOW_DROP:
+                self.dropped += 1
+                logger.warning(f"Очередь обновлений переполнена, обновление {update.update_id} отброшено")
+                return True
+            self.rejected += 1
+            logger.warning(f"Очередь обновлений переполнена, обновление {update.update_id} отклонено")
+            return False
+
+        key = self.ordering_key(update)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            # Ключ без активной обработки сразу становится доступен обработчикам
+            buffer = self._buffers[key] = deque()
+            self._ready.put_nowait(key)
+        buffer.append((update, time.monotonic()))
+        self._size += 1
+        self._idle.clear()
+        self.accepted += 1
+        return True
+
+    async def start(self) -> None:
+        """Запускает обработчики."""
+        self._closing = False
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._worker()))
+        logger.info(f"Запущено обработчиков обновлений: {self.workers}")
+
+    async def _worker(self) -> None:
+        while True:
+            key = await self._ready.get()
+            buffer = self._buffers[key]
+            update, enqueued_at = buffer.popleft()
+            UPDATE_QUEUE_WAIT.observe(time.monotonic() - enqueued_at)
+            try:
+                with UPDATE_LATENCY.time():
+                    await self.handler(update)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Ошибка при обработке обновления {update.update_id}: {e}", exc_info=True)
+            finally:
+                self._size -= 1
+                # Следующее обновление того же чата встает в конец очереди
+                if buffer:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._buffers[key]
+                if not self._size:
+                    self._idle.set()
+
+    async def shutdown(self, timeout: float = 10.0) -> None:
+        """
+        Останавливает прием обновлений и дожидается обработки очереди.
+
+        Args:
+            timeout: Время ожидания обработки оставшихся обновлений в секундах
+        """
+        self._closing = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Не обработано обновлений при остановке: {self._size}")
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает статистику очереди обновлений.
+
+        Returns:
+            Словарь с размером очереди и счетчиками обработанных обновлений
+        """
+        return {
+            'queued': self._size,
+            'max_size': self.max_size,
+            'workers': len(self._tasks),
+            'accepted': self.accepted,
+            'processed': self.processed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'dropped': self.dropped,
+        }
@@ -0,0 +1,131 @@
+"""
+Объединение одиночных запросов в пакеты (micro-batching).
+
+Этот модуль собирает запросы по ключам, пришедшие от разных обработчиков
+за несколько миллисекунд, и выполняет их одним пакетным вызовом API.
+Каждый вызывающий получает результат для своего ключа, а ошибка, вызванная
+одним некорректным ключом, не передается остальным запросам пакета.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple, Type
+
+
+class BatchLoader:
+    """Загрузчик, объединяющий одновременные запросы по ключам в пакеты."""
+
+    def __init__(
+        self,
+        load: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+        max_batch_size: int = 50,
+        max_wait: float = 0.005,
+        isolate: Tuple[Type[BaseException], ...] = (),
+    ):
+        """
+        Args:
+            load: Функция пакетной загрузки, принимающая список ключей
+                и возвращающая словарь {ключ: значение}
+            max_batch_size: Максимальное количество ключей в одном пакете
+            max_wait: Максимальное время ожидания других запросов в секундах
+            isolate: Ошибки, которые может вызвать один некорректный ключ:
+                пакет с такой ошибкой загружается заново по одному ключу
+        """
+        self._load = load
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.isolate = isolate
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.requests = 0
+        self.batches = 0
+        self.keys = 0
+        self.splits = 0
+
+    async def load(self, key: Hashable) -> Optional[Any]:
+        """
+        Возвращает значение для ключа, загружая его в составе пакета.
+
+        Одинаковые ключи внутри одного пакета загружаются один раз.
+        Отмена одного из ожидающих не отменяет загрузку пакета.
+
+        Args:
+            key: Ключ загружаемого значения
+
+        Returns:
+            Значение или None, если пакетная загрузка его не вернула
+        """
+        self.requests += 1
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            if len(self._pending) >= self.max_batch_size:
+                self._dispatch()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._dispatch)
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Dict[Hashable, asyncio.Future]) -> None:
+        self.batches += 1
+        self.keys += len(batch)
+        try:
+            results = await self._load(list(batch))
+        except Exception as e:
+            if len(batch) > 1 and isinstance(e, self.isolate):
+                # Ошибка может относиться к одному ключу: остальные не должны ее получить
+                self.splits += 1
+                await asyncio.gather(*(self._run_one(key, future) for key, future in batch.items()))
+            else:
+                self._reject(batch, e)
+            return
+        self._resolve(batch, results)
+
+    async def _run_one(self, key: Hashable, future: asyncio.Future) -> None:
+        try:
+            results = await self._load([key])
+        except Exception as e:
+            self._reject({key: future}, e)
+            return
+        self._resolve({key: future}, results)
+
+    @staticmethod
+    def _resolve(batch: Dict[Hashable, asyncio.Future], results: Dict[Hashable, Any]) -> None:
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(key))
+
+    @staticmethod
+    def _reject(batch: Dict[Hashable, asyncio.Future], error: Exception) -> None:
+        for future in batch.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Возвращает статистику объединения запросов.
+
+        Returns:
+            Словарь с количеством запросов, пакетов, ключей и пакетов,
+            загруженных заново по одному ключу
+        """
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'keys': self.keys,
+            'splits': self.splits,
+            'pending': len(self._pending),
+            'avg_batch_size': self.keys / self.batches if self.batches else 0.0,
+        }
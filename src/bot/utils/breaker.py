@@ -0,0 +1,167 @@
+"""
+Автоматический выключатель (circuit breaker) для запросов к внешнему API.
+
+Пока внешний сервис отвечает ошибками, выключатель размыкается и сразу
+отклоняет запросы, не дожидаясь таймаутов. Через заданное время несколько
+пробных запросов проверяют, восстановился ли сервис.
+"""
+
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple, Type
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Числовые значения состояний для метрик
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Запрос отклонен разомкнутым выключателем."""
+
+    def __init__(self, name: str):
+        super().__init__(f"Выключатель {name} разомкнут")
+        self.name = name
+
+
+class CircuitBreaker:
+    """
+    Выключатель для одного типа операций.
+
+    В замкнутом состоянии запросы проходят, а failure_threshold ошибок подряд
+    размыкают его. В разомкнутом запросы сразу отклоняются. Через reset_timeout
+    выключатель переходит в полуоткрытое состояние и пропускает не больше
+    half_open_probes одновременных пробных запросов: успех пробы замыкает его,
+    ошибка снова размыкает.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_probes: int = 1,
+        failures: Tuple[Type[BaseException], ...] = (Exception,),
+        ignore: Tuple[Type[BaseException], ...] = (),
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            name: Имя операции для логов и сообщений об ошибках
+            failure_threshold: Количество ошибок подряд для размыкания
+            reset_timeout: Время в секундах до пробных запросов
+            half_open_probes: Количество одновременных пробных запросов
+            failures: Исключения, считающиеся сбоем сервиса
+            ignore: Подклассы failures, не считающиеся сбоем
+            timer: Функция, возвращающая текущее время (для тестов)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.failures = failures
+        self.ignore = ignore
+        self._timer = timer
+        self.state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.opened = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def _is_failure(self, error: BaseException) -> bool:
+        return isinstance(error, self.failures) and not isinstance(error, self.ignore)
+
+    def allow(self) -> bool:
+        """
+        Проверяет, можно ли выполнить запрос, и занимает слот пробы.
+
+        Returns:
+            True, если запрос разрешен
+        """
+        if self.state == OPEN:
+            if self._timer() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = HALF_OPEN
+            self._probes = 0
+
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_probes:
+                return False
+            self._probes += 1
+        return True
+
+    def record_success(self) -> None:
+        """Учитывает успешный запрос."""
+        self._consecutive_failures = 0
+        if self.state == HALF_OPEN:
+            self.state = CLOSED
+            self._probes = 0
+
+    def record_failure(self) -> None:
+        """Учитывает сбой сервиса."""
+        self.failed += 1
+        self._consecutive_failures += 1
+        if self.state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        if self.state != OPEN:
+            self.opened += 1
+        self.state = OPEN
+        self._opened_at = self._timer()
+        self._probes = 0
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Выполняет запрос через выключатель.
+
+        Args:
+            func: Асинхронная функция запроса
+            *args: Позиционные аргументы функции
+            **kwargs: Именованные аргументы функции
+
+        Returns:
+            Результат функции
+
+        Raises:
+            CircuitOpenError: Выключатель разомкнут
+        """
+        if not self.allow():
+            self.rejected += 1
+            raise CircuitOpenError(self.name)
+
+        probe = self.state == HALF_OPEN
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            if self._is_failure(e):
+                self.record_failure()
+            else:
+                # Ошибка запроса означает, что сервис отвечает
+                self.record_success()
+            raise
+        except BaseException:
+            # Отмененная проба не дает ответа о состоянии сервиса
+            if probe and self.state == HALF_OPEN:
+                self._probes -= 1
+            raise
+        self.record_success()
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает статистику выключателя.
+
+        Returns:
+            Словарь с состоянием и количеством размыканий, отказов и сбоев
+        """
+        return {
+            'state': STATE_CODES[self.state],
+            'opened': self.opened,
+            'rejected': self.rejected,
+            'failures': self.failed,
+        }
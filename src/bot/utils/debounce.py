@@ -0,0 +1,82 @@
+"""
+Подавление частых повторных запросов (debounce).
+
+Этот модуль откладывает выполнение запроса на короткое время тишины и отменяет
+его, если за это время по тому же ключу пришел более новый запрос. Так при
+наборе текста выполняется поиск только по последнему введенному варианту.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class Debouncer:
+    """Выполняет только последний из близких по времени вызовов с одним ключом."""
+
+    def __init__(self, delay: float = 0.3):
+        """
+        Args:
+            delay: Время тишины перед выполнением вызова в секундах
+        """
+        self.delay = delay
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.superseded = 0
+        self.dispatched = 0
+
+    async def _delayed(self, func: Callable[[], Awaitable[Any]], delay: float) -> Any:
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.dispatched += 1
+        return await func()
+
+    async def run(
+        self,
+        key: Hashable,
+        func: Callable[[], Awaitable[Any]],
+        delay: Optional[float] = None,
+    ) -> Optional[Any]:
+        """
+        Выполняет func после времени тишины, отменяя предыдущий вызов с тем же ключом.
+
+        Args:
+            key: Ключ, внутри которого новые вызовы заменяют старые
+            func: Функция без аргументов, возвращающая корутину
+            delay: Время тишины для этого вызова, по умолчанию self.delay
+
+        Returns:
+            Результат func или None, если вызов заменен более новым
+        """
+        self.calls += 1
+        previous = self._pending.get(key)
+        if previous is not None and not previous.done():
+            previous.cancel()
+
+        task = asyncio.ensure_future(self._delayed(func, self.delay if delay is None else delay))
+        self._pending[key] = task
+        try:
+            return await task
+        except asyncio.CancelledError:
+            # Задачу отменил более новый вызов, а не отмена вызывающего
+            if task.cancelled() and self._pending.get(key) is not task:
+                self.superseded += 1
+                return None
+            task.cancel()
+            raise
+        finally:
+            if self._pending.get(key) is task:
+                del self._pending[key]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает статистику подавления запросов.
+
+        Returns:
+            Словарь с количеством вызовов, замененных и выполненных запросов
+        """
+        return {
+            'pending': len(self._pending),
+            'calls': self.calls,
+            'superseded': self.superseded,
+            'dispatched': self.dispatched,
+        }
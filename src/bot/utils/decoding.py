@@ -0,0 +1,53 @@
+"""
+Быстрый разбор входящих обновлений Telegram.
+
+Этот модуль выбирает самый быстрый доступный JSON декодер (orjson, msgspec
+или стандартный json) и создает Update сразу привязанным к боту. Без привязки
+Dispatcher.feed_update повторно сериализует и валидирует каждое обновление.
+"""
+
+import json
+from typing import Any, Callable, Optional, Tuple, Union
+
+from aiogram import Bot
+from aiogram.types import Update
+
+
+def select_json_backend() -> Tuple[str, Callable[[Union[bytes, str]], Any]]:
+    """
+    Выбирает JSON декодер из установленных библиотек.
+
+    Returns:
+        Кортеж (имя библиотеки, функция декодирования)
+    """
+    try:
+        import orjson
+        return "orjson", orjson.loads
+    except ImportError:
+        pass
+
+    try:
+        import msgspec
+        return "msgspec", msgspec.json.decode
+    except ImportError:
+        pass
+
+    return "json", json.loads
+
+
+JSON_BACKEND, json_loads = select_json_backend()
+
+
+def decode_update(raw: Union[bytes, str], bot: Optional[Bot] = None) -> Update:
+    """
+    Разбирает тело запроса вебхука в объект Update.
+
+    Args:
+        raw: Тело запроса в формате JSON
+        bot: Бот, к которому привязывается обновление
+
+    Returns:
+        Объект Update
+    """
+    context = {"bot": bot} if bot is not None else None
+    return Update.model_validate(json_loads(raw), context=context)
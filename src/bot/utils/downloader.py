@@ -4,19 +4,52 @@
 Этот модуль содержит функции для скачивания треков и отправки их пользователю.
 """
 
-import os
-import asyncio
-from typing import Optional
-from aiogram.types import Message, FSInputFile
+from typing import AsyncIterable, Optional
+from aiogram.types import Message, InputFile
+from aiogram.exceptions import TelegramBadRequest
 from loguru import logger
 
+from bot.services.file_cache import file_id_cache
 from bot.services.music import music_service
+from bot.config.config import config
+from bot.services.scheduler import download_scheduler
+from bot.utils.formatting import format_progress
+from bot.utils.metrics import ERRORS, UPLOAD_LATENCY
+from bot.utils.progress import ThrottledProgress
+
+
+class StreamInputFile(InputFile):
+    """
+    Файл для загрузки в Telegram из асинхронного потока байтов.
+    
+    Поток читается один раз: повторное чтение отдало бы неполный файл,
+    поэтому вызывает ошибку.
+    """
+
+    def __init__(self, stream: AsyncIterable[bytes], filename: str):
+        """
+        Args:
+            stream: Асинхронный поток данных файла
+            filename: Имя файла, которое увидит пользователь
+        """
+        super().__init__(filename=filename)
+        self.stream = stream
+        self._consumed = False
+
+    async def read(self, bot):
+        if self._consumed:
+            raise RuntimeError(f"Файл {self.filename} уже отправлялся, поток прочитан")
+        self._consumed = True
+        async for chunk in self.stream:
+            yield chunk
 
 
 async def download_and_send_track(message: Message, track_id: str, status_message: Optional[Message] = None) -> bool:
     """
     Скачивает трек и отправляет его пользователю.
-    Запускает скачивание в фоновом режиме, чтобы не блокировать обработку других команд.
+    Трек, который уже отправлялся, пересылается по file_id сразу. Остальные ставятся
+    в очередь планировщика, чтобы не блокировать обработку других команд
+    и не запускать неограниченное количество загрузок одновременно.
     
     Args:
         message: Сообщение пользователя
@@ -24,13 +57,31 @@ async def download_and_send_track(message: Message, track_id: str, status_messag
         status_message: Сообщение со статусом загрузки
         
     Returns:
-        True если скачивание успешно, False в случае ошибки
+        True если трек отправлен из кэша или скачивание поставлено в очередь,
+        False если очередь переполнена
     """
-    # Создаем задачу для скачивания
-    download_task = asyncio.create_task(_download_and_send(message, track_id, status_message))
+    # Если трек уже отправлялся, пересылаем его по file_id, не занимая место в очереди
+    if await _send_cached_audio(message, track_id, status_message):
+        return True
+    
+    async def on_cancel():
+        if status_message:
+            await status_message.edit_text("❌ Загрузка отменена")
     
-    # Добавляем обработчик ошибок
-    download_task.add_done_callback(lambda t: logger.error(f"Ошибка при скачивании: {t.exception()}") if t.exception() else None)
+    ahead = download_scheduler.submit(
+        message.chat.id,
+        lambda: _download_and_send(message, track_id, status_message),
+        on_cancel=on_cancel
+    )
+    
+    if ahead is None:
+        if status_message:
+            await status_message.edit_text("⚠️ Слишком много загрузок, попробуйте позже")
+        return False
+    
+    # Показываем позицию в очереди, если загрузка не начнется сразу
+    if ahead and status_message:
+        await status_message.edit_text(f"⏳ Трек в очереди, перед ним загрузок: {ahead}")
     
     return True
 
@@ -44,9 +95,9 @@ async def _download_and_send(message: Message, track_id: str, status_message: Op
         track_id: ID трека в Яндекс.Музыке
         status_message: Сообщение со статусом загрузки
     """
-    temp_path = None
+    stream = None
     try:
-        # Получаем информацию о треке
+        # Получаем информацию о треке вместе со ссылкой на скачивание
         track_info = await music_service.get_track_full_info(track_id)
         if not track_info:
             await status_message.edit_text("❌ Трек не найден")
@@ -55,8 +106,8 @@ async def _download_and_send(message: Message, track_id: str, status_message: Op
         # Формируем строку с информацией о треке
         track_str = f"{track_info['title']} - {', '.join(track_info['artists'])}"
         
-        # Получаем ссылку на скачивание
-        download_url = await music_service.get_track_download_info(track_id)
+        # Ссылка на скачивание уже получена вместе с метаданными
+        download_url = track_info.get('download_link')
         if not download_url:
             await status_message.edit_text(f"❌ Не удалось получить ссылку на скачивание для трека {track_str}")
             return
@@ -64,40 +115,51 @@ async def _download_and_send(message: Message, track_id: str, status_message: Op
         # Обновляем статус
         await status_message.edit_text(f"⬇️ Скачиваю трек {track_str}...")
         
-        # Формируем имя файла
-        filename = f"{track_str}.mp3"
-        filename = sanitize_filename(filename)
-        temp_path = f"/tmp/{filename}"
+        # Данные передаются в Telegram по мере скачивания, поэтому прогресс
+        # скачивания показываем в статусе отправки
+        progress = ThrottledProgress(
+            lambda received, total: status_message.edit_text(
+                f"📤 Отправляю файл {track_str}... {format_progress(received, total)}"
+            ),
+            interval=config.progress_interval,
+            step=config.progress_step
+        )
         
-        # Скачиваем файл
-        if not await music_service.download_track(download_url, temp_path):
+        # Открываем поток с уже установленными метаданными
+        stream = await music_service.open_track_stream(download_url, track_info, progress=progress)
+        if stream is None and track_info.get('cached'):
+            # Заранее полученная ссылка могла устареть, получаем новую
+            logger.warning(f"Ссылка из кэша для трека {track_id} не сработала, запрашиваем новую")
+            music_service.invalidate_track_info(track_id)
+            track_info = await music_service.get_track_full_info(track_id)
+            if track_info and track_info.get('download_link'):
+                stream = await music_service.open_track_stream(
+                    track_info['download_link'], track_info, progress=progress
+                )
+        if stream is None:
             await status_message.edit_text(f"❌ Ошибка при скачивании трека {track_str}")
             return
         
-        # Обновляем статус
-        await status_message.edit_text(f"📝 Устанавливаю метаданные для {track_str}...")
-        
-        # Устанавливаем метаданные
-        if not await music_service.set_track_metadata(temp_path, track_info):
-            logger.warning(f"Не удалось установить метаданные для {track_str}")
-        
         # Обновляем статус
         await status_message.edit_text(f"📤 Отправляю файл {track_str}...")
-        
-        # Проверяем существование файла
-        if not os.path.exists(temp_path):
-            await status_message.edit_text(f"❌ Ошибка: файл не найден {track_str}")
-            return
             
-        # Отправляем файл
+        # Отправляем файл, передавая данные в Telegram по мере скачивания
         try:
-            audio = FSInputFile(temp_path)
-            await message.answer_audio(
-                audio,
-                title=track_info['title'],
-                performer=", ".join(track_info['artists']),
-                duration=track_info['duration_ms'] // 1000
-            )
+            audio = StreamInputFile(stream, filename=sanitize_filename(f"{track_str}.mp3"))
+            with UPLOAD_LATENCY.time():
+                sent = await message.answer_audio(
+                    audio,
+                    title=track_info['title'],
+                    performer=", ".join(track_info['artists']),
+                    duration=track_info['duration_ms'] // 1000
+                )
+            
+            # Последнее обновление прогресса не должно перезаписать итоговый статус
+            await progress.wait()
+            
+            # Запоминаем file_id для повторных отправок
+            if sent is not None and sent.audio is not None:
+                await file_id_cache.set(track_id, sent.audio.file_id, track_str)
             
             # Обновляем статус
             await status_message.edit_text(f"✅ Трек {track_str} успешно загружен!")
@@ -105,6 +167,8 @@ async def _download_and_send(message: Message, track_id: str, status_message: Op
         except Exception as e:
             error_msg = f"❌ Ошибка при отправке файла {track_str}: {str(e)}"
             logger.error(error_msg, exc_info=True)
+            ERRORS.labels('upload').inc()
+            await progress.wait()
             await status_message.edit_text(error_msg)
             
     except Exception as e:
@@ -114,13 +178,40 @@ async def _download_and_send(message: Message, track_id: str, status_message: Op
             await status_message.edit_text(error_msg)
             
     finally:
-        # Удаляем временный файл
-        if temp_path and os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-                logger.debug(f"Временный файл {temp_path} удален")
-            except Exception as e:
-                logger.error(f"Ошибка при удалении временного файла {temp_path}: {e}")
+        # Освобождаем соединение, если поток не был дочитан
+        if stream is not None:
+            await stream.close()
+
+
+async def _send_cached_audio(message: Message, track_id: str, status_message: Optional[Message] = None) -> bool:
+    """
+    Отправляет трек по сохраненному file_id.
+    
+    Args:
+        message: Сообщение пользователя
+        track_id: ID трека в Яндекс.Музыке
+        status_message: Сообщение со статусом загрузки
+        
+    Returns:
+        True если трек отправлен из кэша, False если его нужно скачать
+    """
+    cached = await file_id_cache.get(track_id)
+    if cached is None:
+        return False
+    
+    file_id, track_str = cached
+    try:
+        await message.answer_audio(file_id)
+    except TelegramBadRequest as e:
+        # Telegram не принимает устаревший file_id, скачиваем трек заново
+        logger.warning(f"file_id для трека {track_id} отклонен Telegram: {e}")
+        await file_id_cache.invalidate(track_id)
+        return False
+    
+    logger.info(f"Трек {track_id} отправлен по сохраненному file_id")
+    if status_message:
+        await status_message.edit_text(f"✅ Трек {track_str or track_id} успешно загружен!")
+    return True
 
 
 def sanitize_filename(filename: str) -> str:
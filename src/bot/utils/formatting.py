@@ -6,7 +6,7 @@
 """
 
 from loguru import logger
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 
 def format_duration(duration_ms: int) -> str:
@@ -24,6 +24,24 @@ def format_duration(duration_ms: int) -> str:
     return f"{duration_min:02d}:{duration_sec:02d}"
 
 
+def format_progress(received: int, total: Optional[int]) -> str:
+    """
+    Форматирует прогресс скачивания.
+    
+    Args:
+        received: Получено байт
+        total: Общий размер в байтах или None, если он неизвестен
+        
+    Returns:
+        Строка вида "45% (3.2 из 7.1 МБ)" или "3.2 МБ"
+    """
+    received_mb = received / (1024 * 1024)
+    if not total:
+        return f"{received_mb:.1f} МБ"
+    percent = min(100, received * 100 // total)
+    return f"{percent}% ({received_mb:.1f} из {total / (1024 * 1024):.1f} МБ)"
+
+
 def format_track_message(track: Dict, bot_username: str) -> str:
     """
     Форматирует сообщение с информацией о треке.
@@ -83,7 +101,8 @@ def format_help_message() -> str:
     return (
         "<b>📖 Доступные команды</b>\n\n"
         "• /start - начало работы с ботом\n"
-        "• /help - эта справка\n\n"
+        "• /help - эта справка\n"
+        "• /cancel - отменить загрузки\n\n"
         "Для поиска музыки просто отправьте название трека или исполнителя.\n"
         "Также вы можете использовать инлайн режим в других чатах: @aamuzbot название"
     ) 
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""
+Утилиты для работы с ID3 тегами.
+
+Этот модуль формирует ID3v2.3 тег в памяти без сторонних библиотек
+и подставляет его в начало потока MP3 данных вместо исходного тега.
+"""
+
+from typing import AsyncIterable, AsyncIterator, Dict, Optional
+
+
+ID3_HEADER_SIZE = 10
+ID3_FRAME_HEADER_SIZE = 10
+
+# Кодировки текстовых фреймов ID3v2.3
+LATIN1 = b'\x00'
+UTF16 = b'\x01'
+
+# Тип изображения APIC: обложка (front cover)
+COVER_FRONT = b'\x03'
+
+
+def _synchsafe(size: int) -> bytes:
+    # Размер заголовка тега хранится по 7 значащих бит в каждом байте
+    return bytes((size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+
+
+def _frame(frame_id: str, payload: bytes) -> bytes:
+    # В ID3v2.3 размер фрейма - обычное 32-битное число, флаги не используются
+    return frame_id.encode('ascii') + len(payload).to_bytes(4, 'big') + b'\x00\x00' + payload
+
+
+def _text_frame(frame_id: str, text: str) -> bytes:
+    try:
+        payload = LATIN1 + text.encode('latin-1')
+    except UnicodeEncodeError:
+        # UTF-8 появился только в ID3v2.4, поэтому используем UTF-16 с BOM
+        payload = UTF16 + text.encode('utf-16')
+    return _frame(frame_id, payload)
+
+
+def _picture_mime(data: bytes) -> bytes:
+    if data.startswith(b'\x89PNG'):
+        return b'image/png'
+    return b'image/jpeg'
+
+
+def encode_id3_frames(track_info: Dict, cover: Optional[bytes] = None) -> bytes:
+    """
+    Кодирует фреймы ID3v2.3 с метаданными трека.
+
+    Args:
+        track_info: Словарь с информацией о треке
+        cover: Данные обложки в формате JPEG или PNG
+
+    Returns:
+        Байты фреймов без заголовка тега
+    """
+    frames = [
+        _text_frame('TIT2', str(track_info['title'])),
+        _text_frame('TPE1', ", ".join(track_info['artists'])),
+    ]
+    if track_info.get('album'):
+        frames.append(_text_frame('TALB', str(track_info['album'])))
+    if track_info.get('track_number'):
+        frames.append(_text_frame('TRCK', str(track_info['track_number'])))
+    if cover:
+        # Кодировка описания, MIME-тип, тип изображения и пустое описание
+        frames.append(_frame('APIC', LATIN1 + _picture_mime(cover) + b'\x00' + COVER_FRONT + b'\x00' + cover))
+    return b''.join(frames)
+
+
+def build_id3_tag(track_info: Dict, cover: Optional[bytes] = None, padding: int = 0) -> bytes:
+    """
+    Формирует ID3v2 тег с метаданными трека.
+
+    Args:
+        track_info: Словарь с информацией о треке
+        cover: Данные обложки в формате JPEG или PNG
+        padding: Количество нулевых байт отступа после фреймов
+
+    Returns:
+        Байты ID3v2 тега
+    """
+    frames = encode_id3_frames(track_info, cover)
+    size = len(frames) + padding
+    return b'ID3\x03\x00\x00' + _synchsafe(size) + frames + b'\x00' * padding
+
+
+def id3v2_tag_size(header: bytes) -> int:
+    """
+    Определяет полный размер ID3v2 тега по его заголовку.
+
+    Args:
+        header: Первые 10 байт файла
+
+    Returns:
+        Размер тега в байтах вместе с заголовком или 0, если тега нет
+    """
+    if len(header) < ID3_HEADER_SIZE or not header.startswith(b"ID3"):
+        return 0
+
+    # Размер хранится в формате synchsafe: по 7 значащих бит в каждом байте
+    size = 0
+    for byte in header[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+
+    # Флаг наличия футера добавляет еще 10 байт
+    footer = ID3_HEADER_SIZE if header[5] & 0x10 else 0
+    return ID3_HEADER_SIZE + size + footer
+
+
+async def strip_id3v2(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """
+    Удаляет ID3v2 тег из начала потока MP3 данных.
+
+    Args:
+        chunks: Асинхронный поток байтов
+
+    Yields:
+        Байты потока без исходного ID3v2 тега
+    """
+    head = b""
+    skip = None
+    async for chunk in chunks:
+        if skip is None:
+            head += chunk
+            if len(head) < ID3_HEADER_SIZE:
+                continue
+            skip = id3v2_tag_size(head)
+            chunk, head = head, b""
+
+        if skip:
+            dropped = min(skip, len(chunk))
+            chunk = chunk[dropped:]
+            skip -= dropped
+
+        if chunk:
+            yield chunk
+
+    # Поток оказался короче заголовка
+    if head:
+        yield head
@@ -0,0 +1,130 @@
+"""
+Метрики приложения в формате Prometheus.
+
+Этот модуль содержит гистограммы задержек горячих участков кода, счетчики
+ошибок и коллектор, который при каждом запросе /metrics читает статистику
+кэшей, очередей и пулов соединений.
+"""
+
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from prometheus_client import REGISTRY, Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+THROUGHPUT_BUCKETS = (64e3, 128e3, 256e3, 512e3, 1e6, 2e6, 4e6, 8e6, 16e6, 32e6)
+
+SEARCH_LATENCY = Histogram(
+    'aamuzbot_search_track_seconds',
+    'Время выполнения MusicService.search_track',
+    buckets=LATENCY_BUCKETS,
+)
+RESOLVE_LATENCY = Histogram(
+    'aamuzbot_track_resolve_seconds',
+    'Время получения ссылки на скачивание трека',
+    ['operation'],
+    buckets=LATENCY_BUCKETS,
+)
+DOWNLOAD_THROUGHPUT = Histogram(
+    'aamuzbot_download_bytes_per_second',
+    'Скорость скачивания трека из хранилища',
+    buckets=THROUGHPUT_BUCKETS,
+)
+DOWNLOAD_TTFB = Histogram(
+    'aamuzbot_download_ttfb_seconds',
+    'Время от запроса к хранилищу до первого байта данных трека',
+    buckets=LATENCY_BUCKETS,
+)
+DOWNLOAD_DURATION = Histogram(
+    'aamuzbot_download_seconds',
+    'Общее время скачивания трека из хранилища',
+    buckets=LATENCY_BUCKETS,
+)
+DOWNLOAD_BYTES = Counter(
+    'aamuzbot_download_bytes',
+    'Количество байт, скачанных из хранилища',
+)
+TAGGING_LATENCY = Histogram(
+    'aamuzbot_tagging_seconds',
+    'Время установки ID3 тегов',
+    buckets=LATENCY_BUCKETS,
+)
+UPLOAD_LATENCY = Histogram(
+    'aamuzbot_telegram_upload_seconds',
+    'Время отправки аудио в Telegram',
+    buckets=LATENCY_BUCKETS,
+)
+WEBHOOK_LATENCY = Histogram(
+    'aamuzbot_webhook_seconds',
+    'Время обработки запроса вебхука',
+    buckets=LATENCY_BUCKETS,
+)
+UPDATE_LATENCY = Histogram(
+    'aamuzbot_update_handling_seconds',
+    'Время обработки обновления в диспетчере',
+    buckets=LATENCY_BUCKETS,
+)
+UPDATE_QUEUE_WAIT = Histogram(
+    'aamuzbot_update_queue_wait_seconds',
+    'Время ожидания обновления в очереди',
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_LIMITER_WAIT = Histogram(
+    'aamuzbot_upstream_limiter_wait_seconds',
+    'Время ожидания разрешения ограничителя запросов к API Яндекс.Музыки',
+    ['bucket'],
+    buckets=(0.001, 0.005) + LATENCY_BUCKETS,
+)
+TELEGRAM_LIMITER_WAIT = Histogram(
+    'aamuzbot_telegram_limiter_wait_seconds',
+    'Время ожидания лимитов Telegram перед отправкой сообщения',
+    buckets=(0.001, 0.005) + LATENCY_BUCKETS,
+)
+ERRORS = Counter(
+    'aamuzbot_errors',
+    'Количество ошибок по операциям',
+    ['operation'],
+)
+
+
+class StatsCollector:
+    """
+    Коллектор, экспортирующий словари статистики компонентов.
+
+    Каждый источник возвращает словарь вида {имя: число}. Поля, перечисленные
+    в counters, экспортируются как счетчики, остальные - как gauge.
+    """
+
+    def __init__(self):
+        self._sources: Dict[str, Tuple[Callable[[], Dict], Tuple[str, ...]]] = {}
+
+    def register(self, name: str, stats: Callable[[], Dict], counters: Iterable[str] = ()) -> None:
+        """
+        Регистрирует источник статистики.
+
+        Args:
+            name: Имя компонента, используется в именах метрик
+            stats: Функция, возвращающая словарь статистики
+            counters: Поля, которые только растут
+        """
+        self._sources[name] = (stats, tuple(counters))
+
+    def collect(self) -> List:
+        metrics = []
+        for name, (stats, counters) in self._sources.items():
+            for key, value in stats().items():
+                if not isinstance(value, (int, float)):
+                    continue
+                metric_name = f'aamuzbot_{name}_{key}'
+                if key in counters:
+                    metric = CounterMetricFamily(metric_name, f'{name}: {key}')
+                else:
+                    metric = GaugeMetricFamily(metric_name, f'{name}: {key}')
+                metric.add_metric([], value)
+                metrics.append(metric)
+        return metrics
+
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
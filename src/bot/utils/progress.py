@@ -0,0 +1,189 @@
+"""
+Ход скачивания треков.
+
+Этот модуль содержит запись о ходе одного скачивания (время до первого байта,
+скорость и общее время), которая по завершении попадает в метрики, и обертку
+для вызова уведомлений о прогрессе не чаще заданного интервала или шага
+в процентах.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+from loguru import logger
+
+from bot.utils.metrics import DOWNLOAD_DURATION, DOWNLOAD_THROUGHPUT, DOWNLOAD_TTFB
+
+
+# Уведомление о прогрессе: получено байт и общий размер, если он известен
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+
+class DownloadStats:
+    """Запись о ходе скачивания одного трека из хранилища."""
+
+    def __init__(
+        self,
+        url: str,
+        progress: Optional[ProgressCallback] = None,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            url: Ссылка на скачивание, по ней определяется узел хранилища
+            progress: Функция, получающая количество полученных байт и общий размер
+            timer: Функция, возвращающая текущее время (для тестов)
+        """
+        self.host = urlparse(url).hostname or ''
+        self._progress = progress
+        self._timer = timer
+        self.started = timer()
+        self.first_byte_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.received = 0
+        self.total: Optional[int] = None
+
+    def start(self, content_length: Optional[int]) -> None:
+        """
+        Запоминает размер ответа из заголовка Content-Length.
+
+        Args:
+            content_length: Размер ответа или None, если он неизвестен
+        """
+        self.total = content_length
+
+    def add(self, size: int) -> None:
+        """
+        Учитывает полученный блок данных.
+
+        Args:
+            size: Размер блока в байтах
+        """
+        if self.first_byte_at is None:
+            self.first_byte_at = self._timer()
+        self.received += size
+        if self._progress is not None:
+            try:
+                self._progress(self.received, self.total)
+            except Exception as e:
+                # Ошибка уведомления не должна прерывать скачивание
+                logger.warning(f"Ошибка уведомления о прогрессе скачивания: {e}")
+
+    @property
+    def ttfb(self) -> Optional[float]:
+        """Время от запроса до первого байта данных в секундах."""
+        if self.first_byte_at is None:
+            return None
+        return self.first_byte_at - self.started
+
+    @property
+    def elapsed(self) -> float:
+        """Общее время скачивания в секундах."""
+        end = self.finished_at if self.finished_at is not None else self._timer()
+        return end - self.started
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """Скорость передачи данных после первого байта в байтах в секунду."""
+        if self.first_byte_at is None:
+            return None
+        end = self.finished_at if self.finished_at is not None else self._timer()
+        transfer = end - self.first_byte_at
+        return self.received / transfer if transfer > 0 else None
+
+    def finish(self) -> None:
+        """Завершает запись и передает ее в метрики."""
+        self.finished_at = self._timer()
+        DOWNLOAD_DURATION.observe(self.elapsed)
+        if self.ttfb is not None:
+            DOWNLOAD_TTFB.observe(self.ttfb)
+        if self.throughput is not None:
+            DOWNLOAD_THROUGHPUT.observe(self.throughput)
+
+        stats = self.as_dict()
+        logger.info(
+            "Скачивание с {host}: {received} байт за {elapsed:.2f} с, "
+            "до первого байта {ttfb:.3f} с, {throughput:.0f} байт/с",
+            **{key: value or 0 for key, value in stats.items()}
+        )
+
+    def as_dict(self) -> Dict:
+        """
+        Возвращает запись в виде словаря.
+
+        Returns:
+            Словарь с узлом хранилища, размером, TTFB, скоростью и общим временем
+        """
+        return {
+            'host': self.host,
+            'received': self.received,
+            'total': self.total,
+            'ttfb': self.ttfb,
+            'throughput': self.throughput,
+            'elapsed': self.elapsed,
+        }
+
+
+class ThrottledProgress:
+    """
+    Уведомление о прогрессе, вызываемое не чаще заданного интервала.
+
+    Вызов пропускается, пока не прошло interval секунд или прогресс не вырос
+    на step процентов с предыдущего уведомления (шаг не проверяется, если общий
+    размер неизвестен, и для 100%). Уведомления выполняются в фоне и не
+    задерживают передачу данных, а пока выполняется предыдущее, новые
+    пропускаются.
+    """
+
+    def __init__(
+        self,
+        report: Callable[[int, Optional[int]], Awaitable[None]],
+        interval: float = 3.0,
+        step: float = 10.0,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            report: Асинхронная функция уведомления
+            interval: Минимальный интервал между уведомлениями в секундах
+            step: Минимальный рост прогресса в процентах между уведомлениями
+            timer: Функция, возвращающая текущее время (для тестов)
+        """
+        self._report = report
+        self.interval = interval
+        self.step = step
+        self._timer = timer
+        self._last_time = timer()
+        self._last_percent = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.reports = 0
+
+    def __call__(self, received: int, total: Optional[int]) -> None:
+        if self._task is not None and not self._task.done():
+            return
+
+        now = self._timer()
+        percent = received * 100 / total if total else None
+        if now - self._last_time < self.interval:
+            return
+        if percent is not None and percent < 100 and percent - self._last_percent < self.step:
+            return
+
+        self._last_time = now
+        if percent is not None:
+            self._last_percent = percent
+        self.reports += 1
+        self._task = asyncio.ensure_future(self._run(received, total))
+
+    async def _run(self, received: int, total: Optional[int]) -> None:
+        try:
+            await self._report(received, total)
+        except Exception as e:
+            logger.warning(f"Ошибка обновления прогресса: {e}")
+
+    async def wait(self) -> None:
+        """Дожидается выполнения начатого уведомления."""
+        if self._task is not None:
+            await self._task
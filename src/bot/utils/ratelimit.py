@@ -0,0 +1,276 @@
+"""
+Ограничение частоты и параллельности запросов к внешнему API.
+
+Этот модуль содержит token bucket для ограничения частоты запросов,
+адаптивный ограничитель параллельности по схеме AIMD (аддитивное увеличение,
+мультипликативное уменьшение) и обертку, которая объединяет их с повтором
+запросов при перегрузке сервера.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, Type
+
+from loguru import logger
+
+
+class TokenBucket:
+    """
+    Token bucket: в среднем rate запросов в секунду со всплесками до burst.
+
+    Жетоны выдаются в порядке очереди: запрос, которому жетона не хватило,
+    резервирует его заранее и ждет ровно столько, сколько нужно на пополнение.
+    """
+
+    def __init__(self, rate: float, burst: int, timer: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            rate: Скорость пополнения в жетонах в секунду
+            burst: Емкость ведра
+            timer: Функция, возвращающая текущее время (для тестов)
+        """
+        self.rate = rate
+        self.burst = burst
+        self._timer = timer
+        self._tokens = float(burst)
+        self._updated = timer()
+
+    def reserve(self) -> float:
+        """
+        Резервирует жетон.
+
+        Returns:
+            Время в секундах, через которое жетон станет доступен
+        """
+        now = self._timer()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+    async def acquire(self) -> float:
+        """
+        Ожидает жетон.
+
+        Returns:
+            Время ожидания в секундах
+        """
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
+class AdaptiveConcurrency:
+    """
+    Ограничитель параллельности с лимитом, подстраиваемым по схеме AIMD.
+
+    Каждый успешный запрос увеличивает лимит на increase / limit, то есть
+    примерно на increase за «поколение» запросов. Признак перегрузки сервера
+    уменьшает лимит в decrease раз, но не чаще одного раза за поколение.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+    ):
+        """
+        Args:
+            initial: Начальный лимит
+            min_limit: Минимальный лимит
+            max_limit: Максимальный лимит
+            increase: Аддитивное увеличение за поколение запросов
+            decrease: Множитель уменьшения при перегрузке
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.inflight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Запросы, начатые до уменьшения лимита, не должны уменьшать его снова
+        self._generation = 0
+
+    async def acquire(self) -> int:
+        """
+        Ожидает свободный слот. Слоты выдаются в порядке очереди.
+
+        Returns:
+            Поколение лимита, в котором был выдан слот
+        """
+        if self.inflight < int(self.limit) and not self._waiters:
+            self.inflight += 1
+            return self._generation
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Слот уже был передан этому запросу, возвращаем его
+                self.release(self._generation)
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+        return self._generation
+
+    def release(self, generation: int, overloaded: Optional[bool] = None) -> None:
+        """
+        Освобождает слот и подстраивает лимит по результату запроса.
+
+        Args:
+            generation: Поколение, полученное из acquire
+            overloaded: True при признаке перегрузки сервера, False при успехе,
+                None, если запрос не завершился (например, был отменен)
+        """
+        self.inflight -= 1
+        if overloaded:
+            if generation == self._generation:
+                self.limit = max(self.min_limit, self.limit * self.decrease)
+                self._generation += 1
+        elif overloaded is not None:
+            self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+
+        while self._waiters and self.inflight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self.inflight += 1
+
+
+class UpstreamLimiter:
+    """
+    Ограничитель запросов к одному типу операций внешнего API.
+
+    Перед каждым запросом ожидает жетон и свободный слот, а запросы,
+    завершившиеся ошибкой перегрузки, повторяет с экспоненциальной
+    задержкой со случайным разбросом (full jitter).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        bucket: TokenBucket,
+        concurrency: AdaptiveConcurrency,
+        retry_on: Tuple[Type[BaseException], ...] = (),
+        no_retry: Tuple[Type[BaseException], ...] = (),
+        retries: int = 3,
+        backoff_base: float = 0.2,
+        backoff_max: float = 2.0,
+        on_wait: Optional[Callable[[float], None]] = None,
+    ):
+        """
+        Args:
+            name: Имя операции для логов
+            bucket: Ограничитель частоты
+            concurrency: Ограничитель параллельности
+            retry_on: Исключения, означающие перегрузку или сбой сервера
+            no_retry: Подклассы retry_on, которые не повторяются
+            retries: Максимальное количество повторов
+            backoff_base: Базовая задержка перед повтором в секундах
+            backoff_max: Максимальная задержка перед повтором в секундах
+            on_wait: Функция, получающая время ожидания лимитов в секундах
+        """
+        self.name = name
+        self.bucket = bucket
+        self.concurrency = concurrency
+        self.retry_on = retry_on
+        self.no_retry = no_retry
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._on_wait = on_wait
+        self.calls = 0
+        self.retried = 0
+        self.overloads = 0
+        self.failures = 0
+
+    def _is_overload(self, error: BaseException) -> bool:
+        return isinstance(error, self.retry_on) and not isinstance(error, self.no_retry)
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Вычисляет задержку перед повтором.
+
+        Args:
+            attempt: Номер повтора, начиная с 0
+
+        Returns:
+            Случайная задержка от 0 до экспоненциальной границы
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Выполняет запрос с учетом лимитов и повторов.
+
+        Args:
+            func: Асинхронная функция запроса
+            *args: Позиционные аргументы функции
+            **kwargs: Именованные аргументы функции
+
+        Returns:
+            Результат функции
+
+        Raises:
+            Exception: Ошибка последней попытки или ошибка, не подлежащая повтору
+        """
+        self.calls += 1
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            await self.bucket.acquire()
+            generation = await self.concurrency.acquire()
+            if self._on_wait is not None:
+                self._on_wait(time.monotonic() - started)
+
+            overloaded = None
+            try:
+                result = await func(*args, **kwargs)
+                overloaded = False
+                return result
+            except Exception as e:
+                overloaded = self._is_overload(e)
+                if overloaded:
+                    self.overloads += 1
+                if not overloaded or attempt >= self.retries:
+                    self.failures += 1
+                    raise
+                error = e
+            finally:
+                self.concurrency.release(generation, overloaded)
+
+            self.retried += 1
+            delay = self.backoff(attempt)
+            attempt += 1
+            logger.warning(
+                f"Повтор запроса {self.name} через {delay:.2f} с "
+                f"(попытка {attempt}/{self.retries}): {error}"
+            )
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Возвращает статистику ограничителя.
+
+        Returns:
+            Словарь с количеством запросов, повторов, ошибок и текущим лимитом
+        """
+        return {
+            'calls': self.calls,
+            'retries': self.retried,
+            'overloads': self.overloads,
+            'failures': self.failures,
+            'concurrency_limit': self.concurrency.limit,
+            'inflight': self.concurrency.inflight,
+        }
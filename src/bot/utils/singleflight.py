@@ -0,0 +1,64 @@
+"""
+Объединение одинаковых параллельных вызовов (single-flight).
+
+Этот модуль позволяет нескольким одновременным вызывающим с одинаковым ключом
+дождаться результата одного общего запроса вместо выполнения своих копий.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Группа вызовов, в которой для каждого ключа выполняется не более одного запроса."""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Выполняет func или присоединяется к уже выполняющемуся вызову с тем же ключом.
+
+        Отмена одного из ожидающих не отменяет общий запрос для остальных.
+
+        Args:
+            key: Ключ, по которому объединяются вызовы
+            func: Функция без аргументов, возвращающая корутину
+
+        Returns:
+            Результат общего вызова
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Помечаем исключение как полученное, если все ожидающие были отменены
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает статистику объединения вызовов.
+
+        Returns:
+            Словарь с количеством реальных вызовов, объединенных вызовов и активных запросов
+        """
+        return {
+            'calls': self.calls,
+            'coalesced': self.coalesced,
+            'inflight': len(self._inflight),
+        }
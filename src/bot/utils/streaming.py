@@ -0,0 +1,51 @@
+"""
+Буферизованная передача потоков данных.
+
+Этот модуль позволяет читать следующий блок данных из источника, пока
+предыдущий отправляется получателю. Размер буфера ограничен: когда получатель
+не успевает, чтение из источника приостанавливается, и замедление передается
+дальше по цепочке до соединения с хранилищем.
+"""
+
+import asyncio
+from typing import AsyncIterable, AsyncIterator
+
+
+_END = object()
+
+
+async def buffered(source: AsyncIterable[bytes], max_chunks: int = 4) -> AsyncIterator[bytes]:
+    """
+    Читает источник в фоне с ограниченным буфером.
+
+    Args:
+        source: Асинхронный поток байтов
+        max_chunks: Максимальное количество прочитанных, но не отданных блоков
+
+    Yields:
+        Блоки данных источника в исходном порядке
+    """
+    queue: "asyncio.Queue" = asyncio.Queue(maxsize=max_chunks)
+
+    async def produce() -> None:
+        try:
+            async for chunk in source:
+                # Ожидание места в очереди приостанавливает чтение источника
+                await queue.put(chunk)
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(_END)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
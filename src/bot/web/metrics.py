@@ -0,0 +1,114 @@
+"""
+Эндпоинт /metrics для Prometheus.
+
+Этот модуль регистрирует источники статистики сервисов в коллекторе метрик
+и добавляет в веб-приложение маршрут, который опрашивает fly.io.
+"""
+
+from aiohttp import web
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+
+from bot.handlers.inline import inline_debouncer
+from bot.services.blob_cache import blob_cache
+from bot.services.file_cache import file_id_cache
+from bot.services.http import http_client
+from bot.services.identity import bot_identity
+from bot.services.music import music_service
+from bot.services.pagination import inline_paginator
+from bot.services.scheduler import download_scheduler
+from bot.utils.metrics import stats_collector
+
+
+CACHE_COUNTERS = ('hits', 'misses', 'evictions', 'expirations', 'invalidations')
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    """
+    Отдает метрики в текстовом формате Prometheus.
+    """
+    return web.Response(
+        body=generate_latest(REGISTRY),
+        headers={'Content-Type': CONTENT_TYPE_LATEST}
+    )
+
+
+def setup_metrics(app: web.Application, path: str = "/metrics") -> None:
+    """
+    Регистрирует источники статистики и маршрут для метрик.
+
+    Args:
+        app: Веб-приложение
+        path: Путь, по которому отдаются метрики
+    """
+    stats_collector.register(
+        'search_cache',
+        lambda: music_service.cache_stats()['search'],
+        counters=CACHE_COUNTERS
+    )
+    stats_collector.register(
+        'resolve_cache',
+        lambda: music_service.cache_stats()['resolve'],
+        counters=CACHE_COUNTERS
+    )
+    stats_collector.register(
+        'resolve_prefetch',
+        music_service.prefetch_stats,
+        counters=('scheduled', 'skipped')
+    )
+    stats_collector.register(
+        'tracks_batching',
+        music_service.batch_stats,
+        counters=('requests', 'batches', 'keys', 'splits')
+    )
+    for name in music_service.limiters:
+        stats_collector.register(
+            f'upstream_limiter_{name}',
+            lambda name=name: music_service.limiter_stats()[name],
+            counters=('calls', 'retries', 'overloads', 'failures')
+        )
+    for name in music_service.breakers:
+        stats_collector.register(
+            f'upstream_breaker_{name}',
+            lambda name=name: music_service.breaker_stats()[name],
+            counters=('opened', 'rejected', 'failures')
+        )
+    stats_collector.register(
+        'stale_results',
+        lambda: {'served': music_service.stale_served},
+        counters=('served',)
+    )
+    stats_collector.register(
+        'blob_cache',
+        blob_cache.stats,
+        counters=('hits', 'misses', 'fills', 'evictions')
+    )
+    stats_collector.register('file_id_cache', file_id_cache.stats, counters=CACHE_COUNTERS)
+    stats_collector.register(
+        'upstream_flights',
+        music_service.flight_stats,
+        counters=('calls', 'coalesced')
+    )
+    stats_collector.register(
+        'downloads',
+        download_scheduler.stats,
+        counters=('submitted', 'completed', 'failed', 'rejected', 'cancelled')
+    )
+    stats_collector.register(
+        'http_pool',
+        http_client.stats,
+        counters=('requests', 'connections_created', 'connections_reused',
+                  'dns_cache_hits', 'dns_cache_misses')
+    )
+    stats_collector.register(
+        'inline_pages',
+        inline_paginator.stats,
+        counters=('pages', 'upstream_pages', 'prefetches')
+    )
+    stats_collector.register(
+        'inline_debounce',
+        inline_debouncer.stats,
+        counters=('calls', 'superseded', 'dispatched')
+    )
+    stats_collector.register('bot_identity', bot_identity.stats, counters=('fetches', 'errors'))
+
+    app.router.add_get(path, metrics_handler)
@@ -0,0 +1,96 @@
+"""
+Разбор заголовков HTTP Range и условных запросов.
+
+Этот модуль содержит функции для поддержки частичной (206) и условной (304)
+отдачи файлов: разбор заголовка Range, сравнение ETag и формирование ETag
+для MP3 файла трека.
+"""
+
+import hashlib
+from typing import Dict, Optional, Tuple
+
+
+class RangeNotSatisfiable(Exception):
+    """Запрошенный диапазон лежит за пределами файла."""
+
+
+def parse_range(value: str, total: int) -> Optional[Tuple[int, int]]:
+    """
+    Разбирает заголовок Range с одним диапазоном байтов.
+
+    Args:
+        value: Значение заголовка Range
+        total: Полный размер файла в байтах
+
+    Returns:
+        Кортеж (первый байт, последний байт) включительно или None, если
+        заголовок некорректен или содержит несколько диапазонов и должен
+        быть проигнорирован
+
+    Raises:
+        RangeNotSatisfiable: Если диапазон не пересекается с файлом
+    """
+    unit, _, spec = value.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+
+    first, sep, last = spec.strip().partition('-')
+    if not sep:
+        return None
+    try:
+        if not first:
+            # Суффиксный диапазон: последние N байт
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable(value)
+            return max(total - length, 0), total - 1
+        start = int(first)
+        end = int(last) if last else total - 1
+    except ValueError:
+        return None
+
+    if start < 0 or (last and end < start):
+        return None
+    if start >= total:
+        raise RangeNotSatisfiable(value)
+    return start, min(end, total - 1)
+
+
+def make_etag(track_info: Dict, header: bytes) -> str:
+    """
+    Формирует ETag MP3 файла трека.
+
+    Данные трека в заданном качестве не меняются, поэтому ETag зависит
+    только от ID трека, битрейта и ID3 тега с метаданными.
+
+    Args:
+        track_info: Словарь с информацией о треке
+        header: ID3 тег, отдаваемый перед данными трека
+
+    Returns:
+        Значение заголовка ETag в кавычках
+    """
+    digest = hashlib.md5(header).hexdigest()[:16]
+    return f'"{track_info["id"]}-{track_info["bitrate"]}-{digest}"'
+
+
+def etag_matches(value: Optional[str], etag: str) -> bool:
+    """
+    Проверяет, совпадает ли ETag с одним из перечисленных в заголовке.
+
+    Args:
+        value: Значение заголовка If-None-Match или If-Range
+        etag: ETag текущей версии файла
+
+    Returns:
+        True если ETag совпадает
+    """
+    if not value:
+        return False
+    for candidate in value.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == '*' or candidate == etag:
+            return True
+    return False
@@ -3,20 +3,23 @@
 
 Этот модуль содержит обработчики для веб-сервера, который обслуживает
 запросы на скачивание треков. Он предоставляет прямые ссылки для скачивания
-MP3 файлов, полученных через API Яндекс.Музыки.
+MP3 файлов, полученных через API Яндекс.Музыки. Поддерживаются частичные
+запросы (Range, If-Range) и условные запросы по ETag (If-None-Match), чтобы
+плееры и браузеры не скачивали файл заново при перемотке и повторе.
 """
 
 from aiohttp import web
 from loguru import logger
+from bot.config.config import config
 from bot.services.music import music_service
-import aiohttp
-import re
+from bot.utils.streaming import buffered
+from bot.web.ranges import RangeNotSatisfiable, etag_matches, make_etag, parse_range
 
 
 routes = web.RouteTableDef()
 
 
-@routes.get("/track/{track_id}.mp3")
+@routes.get(r"/track/{track_id:\d+}.mp3")
 async def download_track(request: web.Request) -> web.StreamResponse:
     """
     Обработчик для скачивания трека.
@@ -24,40 +27,124 @@ async def download_track(request: web.Request) -> web.StreamResponse:
     """
     try:
         # Получаем ID трека из URL
-        track_id = request.match_info['track_id'].replace('.mp3', '')
+        track_id = request.match_info['track_id']
         
         # Получаем информацию о треке
         track_info = await music_service.get_track_full_info(track_id)
         if not track_info:
             return web.Response(status=404, text="Track not found")
-            
-        # Получаем прямую ссылку на скачивание
-        download_link = track_info['download_link']
-        
-        # Создаем асинхронную сессию для скачивания
-        async with aiohttp.ClientSession() as session:
-            async with session.get(download_link) as response:
-                if response.status != 200:
-                    return web.Response(status=response.status, text="Failed to download track")
-                    
-                # Создаем StreamResponse для отправки файла
-                stream = web.StreamResponse(
-                    status=200,
-                    reason='OK',
-                    headers={
-                        'Content-Type': 'audio/mpeg',
-                        'Content-Disposition': f'attachment; filename="{track_info["title"]}.mp3"'
-                    }
-                )
-                
-                await stream.prepare(request)
-                
-                # Читаем и отправляем файл по частям
-                async for chunk in response.content.iter_chunked(8192):
-                    await stream.write(chunk)
-                    
-                return stream
+        
+        cover = await music_service.get_track_cover(track_info)
+        header = music_service.build_track_header(track_info, cover)
+        headers = {
+            'Content-Type': 'audio/mpeg',
+            'Content-Disposition': f'attachment; filename="{track_info["title"]}.mp3"'
+        }
+        
+        # Размер файла нужен для Content-Length и частичных ответов
+        layout = None
+        if track_info.get('bitrate'):
+            layout = await music_service.get_track_layout(track_info['download_link'], track_info)
+        if layout is None:
+            # Без размера файла на HEAD отвечаем только заголовками, не открывая поток
+            if request.method == 'HEAD':
+                return web.Response(status=200, headers=headers)
+            stream = await music_service.open_track_stream(track_info['download_link'], track_info, header)
+            return await send_stream(request, web.StreamResponse(status=200, headers=headers), stream, track_id)
+        
+        tag_size, body_size = layout
+        total = len(header) + body_size
+        etag = make_etag(track_info, header)
+        headers.update({'ETag': etag, 'Accept-Ranges': 'bytes'})
+        
+        # Клиент уже получил эту версию файла
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return web.Response(status=304, headers={'ETag': etag})
+        
+        # Диапазон учитывается, только если If-Range совпадает с текущим ETag
+        byte_range = None
+        range_header = request.headers.get('Range')
+        if_range = request.headers.get('If-Range')
+        if range_header and (if_range is None or if_range.strip() == etag):
+            try:
+                byte_range = parse_range(range_header, total)
+            except RangeNotSatisfiable:
+                return web.Response(status=416, headers={'Content-Range': f'bytes */{total}'})
+        
+        if byte_range is None:
+            response = web.StreamResponse(status=200, headers=headers)
+            response.content_length = total
+            if request.method == 'HEAD':
+                await response.prepare(request)
+                return response
+            stream = await music_service.open_track_stream(track_info['download_link'], track_info, header)
+            return await send_stream(request, response, stream, track_id)
+        
+        start, end = byte_range
+        headers['Content-Range'] = f'bytes {start}-{end}/{total}'
+        response = web.StreamResponse(status=206, headers=headers)
+        response.content_length = end - start + 1
+        if request.method == 'HEAD':
+            await response.prepare(request)
+            return response
+        
+        # Начало диапазона может приходиться на ID3 тег, остальное - на данные трека
+        prefix = header[start:end + 1]
+        stream = None
+        if end >= len(header):
+            stream = await music_service.open_track_range(
+                track_info['download_link'],
+                track_info,
+                max(start - len(header), 0),
+                end - len(header),
+                tag_size
+            )
+            if stream is None:
+                music_service.invalidate_track_info(track_id)
+                return web.Response(status=502, text="Failed to download track")
+        
+        try:
+            await response.prepare(request)
+            if prefix:
+                await response.write(prefix)
+            if stream is not None:
+                async for chunk in buffered(stream, config.stream_buffer_chunks):
+                    await response.write(chunk)
+        finally:
+            if stream is not None:
+                await stream.close()
+        return response
                     
     except Exception as e:
         logger.error(f"Ошибка при скачивании трека {track_id}: {e}")
-        return web.Response(status=500, text=str(e)) 
\ No newline at end of file
+        return web.Response(status=500, text=str(e))
+
+
+async def send_stream(request: web.Request, response: web.StreamResponse, stream, track_id: str) -> web.StreamResponse:
+    """
+    Отправляет поток данных трека целиком.
+    
+    Args:
+        request: Входящий HTTP запрос
+        response: Подготовленный к отправке ответ
+        stream: Поток данных трека или None, если открыть его не удалось
+        track_id: ID трека в Яндекс.Музыке
+        
+    Returns:
+        HTTP ответ
+    """
+    if stream is None:
+        # Ссылка из кэша могла устареть, следующий запрос получит новую
+        music_service.invalidate_track_info(track_id)
+        return web.Response(status=502, text="Failed to download track")
+    
+    try:
+        await response.prepare(request)
+        
+        # Следующий блок читается из хранилища, пока предыдущий уходит клиенту
+        async for chunk in buffered(stream, config.stream_buffer_chunks):
+            await response.write(chunk)
+    finally:
+        await stream.close()
+        
+    return response
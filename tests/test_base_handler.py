@@ -7,6 +7,7 @@
 
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
+from aiogram.filters import CommandObject
 from aiogram.types import Message, User, Chat
 from bot.handlers.base import cmd_start, cmd_help
 
@@ -66,6 +67,18 @@ async def test_cmd_start_with_invalid_download(mock_message):
         mock_message.answer.assert_called_with("❌ Произошла ошибка при скачивании трека")
 
 
+@pytest.mark.asyncio
+async def test_cmd_start_rejects_non_numeric_track_id(mock_message):
+    """Тест того, что некорректный ID из ссылки не доходит до скачивания."""
+    mock_message.text = "/start download_abc"
+    
+    with patch('bot.handlers.base.download_and_send_track', AsyncMock()) as mock_download:
+        await cmd_start(mock_message, CommandObject(command="start", args="download_abc"))
+    
+    mock_download.assert_not_called()
+    mock_message.answer.assert_called_once_with("❌ Некорректная ссылка на трек")
+
+
 @pytest.mark.asyncio
 async def test_cmd_help(mock_message):
     """Тест команды /help."""
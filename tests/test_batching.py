@@ -0,0 +1,93 @@
+"""
+Тесты для объединения запросов в пакеты.
+
+Этот модуль тестирует BatchLoader: сбор одновременных запросов в один
+пакет, ограничение размера пакета и передачу ошибок ожидающим.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from bot.utils.batching import BatchLoader
+
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_are_batched():
+    """Тест объединения одновременных запросов в один вызов."""
+    load = AsyncMock(side_effect=lambda keys: {key: key.upper() for key in keys})
+    loader = BatchLoader(load, max_batch_size=10, max_wait=0.01)
+
+    results = await asyncio.gather(loader.load("a"), loader.load("b"), loader.load("a"))
+
+    assert results == ["A", "B", "A"]
+    load.assert_awaited_once_with(["a", "b"])
+    stats = loader.stats()
+    assert stats['requests'] == 3
+    assert stats['batches'] == 1
+    assert stats['keys'] == 2
+
+
+@pytest.mark.asyncio
+async def test_max_batch_size_dispatches_immediately():
+    """Тест разбиения на пакеты по максимальному размеру."""
+    load = AsyncMock(side_effect=lambda keys: {key: key for key in keys})
+    loader = BatchLoader(load, max_batch_size=2, max_wait=10)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(*(loader.load(i) for i in range(4))),
+        timeout=1
+    )
+
+    assert results == [0, 1, 2, 3]
+    assert [call.args[0] for call in load.await_args_list] == [[0, 1], [2, 3]]
+
+
+@pytest.mark.asyncio
+async def test_missing_key_returns_none():
+    """Тест ключа, отсутствующего в ответе пакетной загрузки."""
+    loader = BatchLoader(AsyncMock(return_value={}), max_wait=0)
+
+    assert await loader.load("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_load_error_propagates_to_all_waiters():
+    """Тест передачи ошибки пакетной загрузки всем ожидающим."""
+    loader = BatchLoader(AsyncMock(side_effect=Exception("API Error")), max_wait=0.01)
+
+    results = await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+
+    assert all(isinstance(result, Exception) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_invalid_key_error_is_isolated():
+    """Тест того, что ошибка из-за одного ключа не передается остальным ключам пакета."""
+    async def load(keys):
+        if 'abc' in keys:
+            raise ValueError("Bad Request")
+        return {key: f"value-{key}" for key in keys}
+
+    loader = BatchLoader(AsyncMock(side_effect=load), max_wait=0.01, isolate=(ValueError,))
+
+    results = await asyncio.gather(loader.load('123'), loader.load('abc'), return_exceptions=True)
+
+    assert results[0] == 'value-123'
+    assert isinstance(results[1], ValueError)
+    assert loader.stats()['splits'] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_batch():
+    """Тест того, что отмена одного из ожидающих не отменяет пакет."""
+    async def slow_load(keys):
+        await asyncio.sleep(0.02)
+        return {key: key for key in keys}
+
+    loader = BatchLoader(slow_load, max_wait=0.001)
+    first = asyncio.create_task(loader.load(1))
+    second = asyncio.create_task(loader.load(2))
+    await asyncio.sleep(0.005)
+    first.cancel()
+
+    assert await second == 2
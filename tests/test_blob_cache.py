@@ -0,0 +1,129 @@
+"""
+Тесты для дискового кэша треков.
+
+Этот модуль тестирует BlobCache: атомарную запись, вытеснение по объему,
+восстановление индекса при запуске и ожидание заполнения другим запросом.
+"""
+
+import asyncio
+import os
+import pytest
+from bot.services.blob_cache import BlobCache
+
+
+async def fill(cache: BlobCache, key, data: bytes) -> None:
+    writer = cache.writer(key)
+    await writer.write(data)
+    await writer.commit()
+
+
+@pytest.mark.asyncio
+async def test_commit_makes_blob_available(tmp_path):
+    """Тест атомарной записи файла в кэш."""
+    cache = BlobCache(str(tmp_path), max_bytes=1024)
+    key = BlobCache.make_key(123, 320)
+
+    assert cache.get(key) is None
+    writer = cache.writer(key)
+    await writer.write(b'data')
+    assert not os.path.exists(cache.path(key))
+    await writer.commit()
+
+    path = cache.get(key)
+    assert path == cache.path(key)
+    with open(path, 'rb') as f:
+        assert f.read() == b'data'
+    assert cache.stats()['bytes'] == 4
+
+
+@pytest.mark.asyncio
+async def test_abort_removes_partial_file(tmp_path):
+    """Тест отмены записи."""
+    cache = BlobCache(str(tmp_path), max_bytes=1024)
+    key = BlobCache.make_key(123, 320)
+
+    writer = cache.writer(key)
+    await writer.write(b'partial')
+    await writer.abort()
+
+    assert cache.get(key) is None
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_by_bytes(tmp_path):
+    """Тест вытеснения давно не использованных файлов при превышении объема."""
+    cache = BlobCache(str(tmp_path), max_bytes=10)
+    a, b, c = (BlobCache.make_key(i, 320) for i in range(3))
+
+    await fill(cache, a, b'aaaa')
+    await fill(cache, b, b'bbbb')
+    cache.get(a)
+    await fill(cache, c, b'cccc')
+
+    assert cache.get(b) is None
+    assert cache.get(a) is not None
+    assert cache.get(c) is not None
+    assert not os.path.exists(cache.path(b))
+    assert cache.stats()['evictions'] == 1
+
+
+@pytest.mark.asyncio
+async def test_scan_rebuilds_index(tmp_path):
+    """Тест восстановления индекса и удаления недописанных файлов."""
+    (tmp_path / "1-320.mp3").write_bytes(b'12345')
+    (tmp_path / "2-192.mp3").write_bytes(b'123')
+    (tmp_path / "3-320.mp3.part").write_bytes(b'partial')
+    (tmp_path / "other.txt").write_bytes(b'x')
+
+    cache = BlobCache(str(tmp_path), max_bytes=1024)
+    await cache.scan()
+
+    assert len(cache) == 2
+    assert cache.stats()['bytes'] == 8
+    assert cache.get(("2", 192)) is not None
+    assert not (tmp_path / "3-320.mp3.part").exists()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reader_waits_for_fill(tmp_path):
+    """Тест ожидания заполнения, начатого другим запросом."""
+    cache = BlobCache(str(tmp_path), max_bytes=1024)
+    key = BlobCache.make_key(123, 320)
+
+    writer = cache.writer(key)
+    assert cache.writer(key) is None
+    waiter = asyncio.create_task(cache.wait(key))
+    await writer.write(b'data')
+    await writer.commit()
+
+    assert await waiter == cache.path(key)
+
+
+@pytest.mark.asyncio
+async def test_failed_fill_releases_waiters(tmp_path):
+    """Тест того, что неудачное заполнение не блокирует ожидающих."""
+    cache = BlobCache(str(tmp_path), max_bytes=1024)
+    key = BlobCache.make_key(123, 320)
+
+    writer = cache.writer(key)
+    waiter = asyncio.create_task(cache.wait(key))
+    await writer.abort()
+
+    assert await waiter is None
+    assert cache.writer(key) is not None
+
+
+@pytest.mark.asyncio
+async def test_wait_gives_up_after_timeout(tmp_path):
+    """Тест ограничения времени ожидания медленного заполнения."""
+    cache = BlobCache(str(tmp_path), max_bytes=1024)
+    key = BlobCache.make_key(123, 320)
+
+    writer = cache.writer(key)
+    assert await cache.wait(key, timeout=0.01) is None
+    assert cache.stats()['wait_timeouts'] == 1
+
+    await writer.write(b'data')
+    await writer.commit()
+    assert cache.get(key) == cache.path(key)
@@ -0,0 +1,132 @@
+"""
+Тесты для автоматического выключателя запросов.
+
+Этот модуль тестирует размыкание выключателя после серии сбоев, отклонение
+запросов без обращения к сервису и пробные запросы в полуоткрытом состоянии.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from yandex_music.exceptions import NetworkError, NotFoundError
+from bot.utils.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class FakeTimer:
+    """Управляемые часы для тестов."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def timer():
+    return FakeTimer()
+
+
+@pytest.fixture
+def breaker(timer):
+    return CircuitBreaker(
+        'search',
+        failure_threshold=3,
+        reset_timeout=10.0,
+        failures=(NetworkError,),
+        ignore=(NotFoundError,),
+        timer=timer
+    )
+
+
+async def fail(breaker, error=None):
+    with pytest.raises(Exception):
+        await breaker.call(AsyncMock(side_effect=error or NetworkError('Bad Gateway')))
+
+
+@pytest.mark.asyncio
+async def test_opens_after_consecutive_failures(breaker):
+    """Тест размыкания после серии сбоев подряд и отказа без вызова сервиса."""
+    await fail(breaker)
+    await fail(breaker)
+    await breaker.call(AsyncMock())
+    assert breaker.state == CLOSED
+
+    for _ in range(3):
+        await fail(breaker)
+    assert breaker.state == OPEN
+
+    func = AsyncMock()
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(func)
+    func.assert_not_awaited()
+    assert breaker.stats() == {'state': 2, 'opened': 1, 'rejected': 1, 'failures': 5}
+
+
+@pytest.mark.asyncio
+async def test_client_errors_do_not_open(breaker):
+    """Тест того, что ошибки запроса не считаются сбоем сервиса."""
+    for _ in range(5):
+        await fail(breaker, NotFoundError('not found'))
+
+    assert breaker.state == CLOSED
+
+
+@pytest.mark.asyncio
+async def test_half_open_probe_closes(breaker, timer):
+    """Тест единственной пробы в полуоткрытом состоянии и замыкания после успеха."""
+    for _ in range(3):
+        await fail(breaker)
+
+    timer.now = 10.0
+    probe_started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def probe():
+        probe_started.set()
+        await release.wait()
+        return 'ok'
+
+    task = asyncio.ensure_future(breaker.call(probe))
+    await probe_started.wait()
+    assert breaker.state == HALF_OPEN
+    # Пока проба выполняется, остальные запросы отклоняются
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(AsyncMock())
+
+    release.set()
+    assert await task == 'ok'
+    assert breaker.state == CLOSED
+
+
+@pytest.mark.asyncio
+async def test_half_open_probe_failure_reopens(breaker, timer):
+    """Тест повторного размыкания при неудачной пробе."""
+    for _ in range(3):
+        await fail(breaker)
+
+    timer.now = 10.0
+    await fail(breaker)
+
+    assert breaker.state == OPEN
+    assert breaker.stats()['opened'] == 2
+    timer.now = 15.0
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(AsyncMock())
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_frees_slot(breaker, timer):
+    """Тест освобождения слота пробы при отмене запроса."""
+    for _ in range(3):
+        await fail(breaker)
+
+    timer.now = 10.0
+    task = asyncio.ensure_future(breaker.call(asyncio.sleep, 10))
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert await breaker.call(AsyncMock(return_value='ok')) == 'ok'
+    assert breaker.state == CLOSED
@@ -0,0 +1,63 @@
+"""
+Тесты для модуля кэширования.
+
+Этот модуль тестирует TTLCache: вытеснение по LRU,
+истечение времени жизни записей и счетчики статистики.
+"""
+
+from bot.utils.cache import TTLCache
+
+
+class FakeTimer:
+    """Управляемый таймер для тестов."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_hit_and_miss():
+    """Тест попадания и промаха."""
+    cache = TTLCache(maxsize=2, ttl=10)
+    
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+
+def test_cache_lru_eviction():
+    """Тест вытеснения давно не использованной записи."""
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    
+    # Обращение к "a" делает ее самой свежей
+    cache.get("a")
+    cache.set("c", 3)
+    
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.stats()['evictions'] == 1
+
+
+def test_cache_ttl_expiration():
+    """Тест истечения времени жизни записи."""
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=2, ttl=10, timer=timer)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=30)
+    
+    timer.now = 15
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    
+    stats = cache.stats()
+    assert stats['expirations'] == 1
+    assert stats['size'] == 1
@@ -0,0 +1,71 @@
+"""
+Тесты для подавления частых повторных запросов.
+
+Этот модуль тестирует Debouncer: выполнение только последнего вызова
+с одним ключом, независимость разных ключей и отмену вызывающего.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from bot.utils.debounce import Debouncer
+
+
+@pytest.mark.asyncio
+async def test_newer_call_supersedes_pending():
+    """Тест отмены ожидающего вызова более новым."""
+    debouncer = Debouncer(delay=0.05)
+    func = AsyncMock(side_effect=lambda value: "result")
+
+    results = await asyncio.gather(
+        debouncer.run(1, lambda: func("r")),
+        debouncer.run(1, lambda: func("ra")),
+        debouncer.run(1, lambda: func("rad")),
+    )
+
+    assert results == [None, None, "result"]
+    func.assert_awaited_once_with("rad")
+    stats = debouncer.stats()
+    assert stats['superseded'] == 2
+    assert stats['dispatched'] == 1
+    assert stats['pending'] == 0
+
+
+@pytest.mark.asyncio
+async def test_different_keys_are_independent():
+    """Тест независимости вызовов разных пользователей."""
+    debouncer = Debouncer(delay=0.01)
+
+    async def echo(value):
+        return value
+
+    results = await asyncio.gather(
+        debouncer.run(1, lambda: echo("a")),
+        debouncer.run(2, lambda: echo("b")),
+    )
+
+    assert results == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_caller_cancellation_propagates():
+    """Тест отмены вызывающего: задача отменяется, ошибка пробрасывается."""
+    debouncer = Debouncer(delay=10)
+    func = AsyncMock()
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(debouncer.run(1, func), timeout=0.01)
+
+    func.assert_not_awaited()
+    assert debouncer.stats()['pending'] == 0
+
+
+@pytest.mark.asyncio
+async def test_delay_override():
+    """Тест выполнения без паузы для отдельного вызова."""
+    debouncer = Debouncer(delay=10)
+
+    async def echo():
+        return "now"
+
+    assert await asyncio.wait_for(debouncer.run(1, echo, delay=0), timeout=1) == "now"
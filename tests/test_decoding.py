@@ -0,0 +1,70 @@
+"""
+Тесты для разбора входящих обновлений.
+
+Этот модуль тестирует выбор JSON декодера и создание объекта Update,
+привязанного к боту.
+"""
+
+import json
+import sys
+from unittest.mock import patch
+
+from aiogram import Bot
+from bot.utils.decoding import decode_update, select_json_backend
+
+
+MESSAGE_UPDATE = {
+    'update_id': 1,
+    'message': {
+        'message_id': 10,
+        'date': 1737614400,
+        'chat': {'id': 42, 'type': 'private'},
+        'from': {'id': 42, 'is_bot': False, 'first_name': 'Test'},
+        'text': '/start download_123',
+    },
+}
+
+INLINE_UPDATE = {
+    'update_id': 2,
+    'inline_query': {
+        'id': '77',
+        'from': {'id': 42, 'is_bot': False, 'first_name': 'Test'},
+        'query': 'test query',
+        'offset': '',
+    },
+}
+
+
+def test_decode_message_update():
+    """Тест разбора сообщения из байтов."""
+    update = decode_update(json.dumps(MESSAGE_UPDATE).encode())
+
+    assert update.update_id == 1
+    assert update.message.chat.id == 42
+    assert update.message.text == '/start download_123'
+
+
+def test_decode_inline_update():
+    """Тест разбора inline-запроса из строки."""
+    update = decode_update(json.dumps(INLINE_UPDATE))
+
+    assert update.inline_query.query == 'test query'
+    assert update.inline_query.from_user.id == 42
+
+
+def test_decode_binds_bot():
+    """Тест привязки обновления и вложенных объектов к боту."""
+    bot = Bot(token='123456:TEST')
+    update = decode_update(json.dumps(MESSAGE_UPDATE).encode(), bot)
+
+    assert update.bot is bot
+    assert update.message.bot is bot
+
+
+def test_select_json_backend_fallback():
+    """Тест возврата к стандартному json без быстрых библиотек."""
+    with patch.dict(sys.modules, {'orjson': None, 'msgspec': None}):
+        name, loads = select_json_backend()
+
+    assert name == 'json'
+    assert loads is json.loads
@@ -8,7 +8,34 @@
 import pytest
 from unittest.mock import Mock, AsyncMock, patch, ANY
 from aiogram.types import Message, User, Chat, FSInputFile
-from bot.utils.downloader import download_and_send_track
+from aiogram.exceptions import TelegramBadRequest
+from bot.services.file_cache import FileIdCache
+from bot.services.music import MusicService
+from bot.utils.downloader import download_and_send_track, _download_and_send, StreamInputFile
+
+
+class FakeStream:
+    """Поток данных трека для тестов."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def file_id_cache(tmp_path):
+    """Фикстура, подменяющая кэш file_id временной базой."""
+    cache = FileIdCache(str(tmp_path / "file_ids.sqlite3"))
+    with patch('bot.utils.downloader.file_id_cache', cache):
+        yield cache
+    cache.close()
 
 
 @pytest.fixture
@@ -175,4 +202,186 @@ async def test_download_and_send_track_http_error(mock_message, mock_status_mess
         result = await download_and_send_track(mock_message, '123', mock_status_message)
 
         assert result is False
-        mock_status_message.edit_text.assert_called_with("❌ Ошибка при скачивании трека") 
\ No newline at end of file
+        mock_status_message.edit_text.assert_called_with("❌ Ошибка при скачивании трека") 
+
+@pytest.mark.asyncio
+async def test_download_pipeline_upstream_calls(mock_message, mock_status_message):
+    """
+    Тест количества обращений к API Яндекс.Музыки за одно скачивание.
+
+    Проверяет, что на одно скачивание приходится ровно один вызов tracks()
+    и одно получение прямой ссылки.
+    """
+    artist = Mock()
+    artist.name = 'Test Artist'
+    download_info = Mock(bitrate_in_kbps=320)
+    download_info.get_direct_link_async = AsyncMock(return_value='https://test.com/track.mp3')
+    track = Mock(id='123', title='Test Track', artists=[artist], duration_ms=180000, albums=[], cover_uri=None)
+    track.get_download_info_async = AsyncMock(return_value=[download_info])
+    
+    client = AsyncMock()
+    client.tracks.return_value = [track]
+    service = MusicService(client=client)
+    service.open_track_stream = AsyncMock(return_value=None)
+
+    with patch('bot.utils.downloader.music_service', service):
+        await _download_and_send(mock_message, '123', mock_status_message)
+
+    client.tracks.assert_called_once_with(['123'])
+    track.get_download_info_async.assert_called_once()
+    download_info.get_direct_link_async.assert_called_once()
+    service.open_track_stream.assert_called_once_with('https://test.com/track.mp3', ANY, progress=ANY)
+
+
+@pytest.mark.asyncio
+async def test_download_served_from_file_id_cache(mock_message, mock_status_message, mock_music_service, file_id_cache):
+    """
+    Тест отправки ранее загруженного трека по file_id.
+
+    Проверяет, что при наличии file_id трек не скачивается заново
+    и не ставится в очередь загрузок.
+    """
+    await file_id_cache.set('123', 'cached-file-id', 'Test Track - Test Artist')
+    scheduler = Mock()
+
+    with patch('bot.utils.downloader.music_service', mock_music_service), \
+            patch('bot.utils.downloader.download_scheduler', scheduler):
+        assert await download_and_send_track(mock_message, '123', mock_status_message) is True
+
+    mock_message.answer_audio.assert_called_once_with('cached-file-id')
+    mock_music_service.get_track_full_info.assert_not_called()
+    scheduler.submit.assert_not_called()
+    mock_status_message.edit_text.assert_called_once_with("✅ Трек Test Track - Test Artist успешно загружен!")
+    assert file_id_cache.stats()['hits'] == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_file_id_is_invalidated(mock_message, mock_status_message, mock_music_service, file_id_cache):
+    """
+    Тест инвалидации file_id, который отклонил Telegram.
+
+    Проверяет, что после ошибки file_id удаляется и трек ставится в очередь загрузок.
+    """
+    await file_id_cache.set('123', 'stale-file-id')
+    mock_message.answer_audio.side_effect = TelegramBadRequest(
+        method=Mock(), message="Bad Request: wrong file identifier"
+    )
+    scheduler = Mock()
+    scheduler.submit.return_value = 0
+
+    with patch('bot.utils.downloader.download_scheduler', scheduler):
+        assert await download_and_send_track(mock_message, '123', mock_status_message) is True
+
+    scheduler.submit.assert_called_once()
+    assert await file_id_cache.get('123') is None
+    assert file_id_cache.stats()['invalidations'] == 1
+
+
+@pytest.mark.asyncio
+async def test_file_id_saved_after_upload(mock_message, mock_status_message, mock_music_service, file_id_cache):
+    """
+    Тест сохранения file_id после успешной отправки трека.
+    """
+    mock_music_service.get_track_full_info.return_value = {
+        'id': '123',
+        'title': 'Test Track',
+        'artists': ['Test Artist'],
+        'duration_ms': 180000,
+        'track_link': 'https://music.yandex.ru/track/123',
+        'download_link': 'https://test.com/track.mp3'
+    }
+    mock_music_service.open_track_stream = AsyncMock(return_value=FakeStream([b'ID3', b'data']))
+    mock_message.answer_audio.return_value = Mock(audio=Mock(file_id='new-file-id'))
+
+    with patch('bot.utils.downloader.music_service', mock_music_service):
+        await _download_and_send(mock_message, '123', mock_status_message)
+
+    assert await file_id_cache.get('123') == ('new-file-id', 'Test Track - Test Artist')
+
+
+@pytest.mark.asyncio
+async def test_upload_streams_without_temp_file(mock_message, mock_status_message, mock_music_service):
+    """
+    Тест потоковой отправки трека без записи на диск.
+
+    Проверяет, что в Telegram уходят данные из потока с метаданными.
+    """
+    mock_music_service.get_track_full_info.return_value = {
+        'id': '123',
+        'title': 'Test Track',
+        'artists': ['Test Artist'],
+        'duration_ms': 180000,
+        'track_link': 'https://music.yandex.ru/track/123',
+        'download_link': 'https://test.com/track.mp3'
+    }
+    stream = FakeStream([b'ID3-header', b'mp3-data'])
+    mock_music_service.open_track_stream = AsyncMock(return_value=stream)
+
+    with patch('bot.utils.downloader.music_service', mock_music_service), \
+         patch('builtins.open') as mock_open:
+        await _download_and_send(mock_message, '123', mock_status_message)
+
+    mock_open.assert_not_called()
+    audio = mock_message.answer_audio.call_args[0][0]
+    assert isinstance(audio, StreamInputFile)
+    assert audio.filename == 'Test Track - Test Artist.mp3'
+    assert [chunk async for chunk in audio.read(None)] == [b'ID3-header', b'mp3-data']
+    assert stream.closed
+    mock_status_message.edit_text.assert_called_with("✅ Трек Test Track - Test Artist успешно загружен!")
+
+
+@pytest.mark.asyncio
+async def test_download_queue_position_and_overflow(mock_message, mock_status_message):
+    """
+    Тест сообщений о позиции в очереди и переполнении очереди.
+    """
+    scheduler = Mock()
+    
+    scheduler.submit.return_value = 2
+    with patch('bot.utils.downloader.download_scheduler', scheduler):
+        assert await download_and_send_track(mock_message, '123', mock_status_message) is True
+    mock_status_message.edit_text.assert_called_with("⏳ Трек в очереди, перед ним загрузок: 2")
+    assert scheduler.submit.call_args[0][0] == 12345
+    
+    scheduler.submit.return_value = None
+    with patch('bot.utils.downloader.download_scheduler', scheduler):
+        assert await download_and_send_track(mock_message, '123', mock_status_message) is False
+    mock_status_message.edit_text.assert_called_with("⚠️ Слишком много загрузок, попробуйте позже")
+
+
+@pytest.mark.asyncio
+async def test_download_retries_stale_cached_link(mock_message, mock_status_message, mock_music_service):
+    """
+    Тест повторного получения ссылки, если заранее полученная устарела.
+    """
+    cached_info = {
+        'id': '123', 'title': 'Test Track', 'artists': ['Test Artist'],
+        'duration_ms': 180000, 'download_link': 'https://old.link', 'cached': True,
+    }
+    fresh_info = dict(cached_info, download_link='https://new.link')
+    del fresh_info['cached']
+    mock_music_service.get_track_full_info.side_effect = [cached_info, fresh_info]
+    mock_music_service.invalidate_track_info = Mock()
+    mock_music_service.open_track_stream = AsyncMock(side_effect=[None, FakeStream([b'ID3', b'data'])])
+    mock_message.answer_audio = AsyncMock(return_value=None)
+    
+    with patch('bot.utils.downloader.music_service', mock_music_service):
+        await _download_and_send(mock_message, '123', mock_status_message)
+    
+    mock_music_service.invalidate_track_info.assert_called_once_with('123')
+    assert mock_music_service.open_track_stream.call_args_list[1].args[0] == 'https://new.link'
+    mock_message.answer_audio.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_stream_input_file_is_read_once():
+    """
+    Тест ошибки при повторном чтении файла из потока.
+
+    Повторная отправка не должна загрузить в Telegram неполный файл.
+    """
+    audio = StreamInputFile(FakeStream([b'ID3', b'data']), filename='track.mp3')
+
+    assert b''.join([chunk async for chunk in audio.read(Mock())]) == b'ID3data'
+    with pytest.raises(RuntimeError):
+        [chunk async for chunk in audio.read(Mock())]
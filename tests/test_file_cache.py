@@ -0,0 +1,68 @@
+"""
+Тесты для кэша Telegram file_id.
+
+Этот модуль тестирует сохранение, вытеснение и инвалидацию file_id
+в локальной базе SQLite.
+"""
+
+import pytest
+from bot.services.file_cache import FileIdCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Фикстура, создающая кэш во временной директории."""
+    cache = FileIdCache(str(tmp_path / "cache" / "file_ids.sqlite3"), max_entries=2)
+    yield cache
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_set_and_get(cache):
+    """Тест сохранения и чтения file_id."""
+    assert await cache.get("123") is None
+    
+    await cache.set("123", "file-id-1", "Test Track - Test Artist")
+    
+    assert await cache.get(123) == ("file-id-1", "Test Track - Test Artist")
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_ratio'] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_eviction_of_least_recently_used(cache):
+    """Тест вытеснения давно не использованного file_id."""
+    await cache.set("1", "file-1")
+    await cache.set("2", "file-2")
+    await cache.get("1")
+    await cache.set("3", "file-3")
+    
+    assert await cache.get("2") is None
+    assert await cache.get("1") is not None
+    assert await cache.get("3") is not None
+    assert cache.stats()['evictions'] == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate(cache):
+    """Тест удаления устаревшего file_id."""
+    await cache.set("123", "file-id-1")
+    await cache.invalidate("123")
+    
+    assert await cache.get("123") is None
+    assert cache.stats()['invalidations'] == 1
+
+
+@pytest.mark.asyncio
+async def test_persistence(tmp_path):
+    """Тест того, что file_id сохраняются между перезапусками."""
+    path = str(tmp_path / "file_ids.sqlite3")
+    first = FileIdCache(path)
+    await first.set("123", "file-id-1")
+    first.close()
+    
+    second = FileIdCache(path)
+    assert await second.get("123") == ("file-id-1", None)
+    second.close()
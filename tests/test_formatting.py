@@ -7,7 +7,7 @@
 """
 
 import pytest
-from bot.utils.formatting import format_duration, format_track_message, format_search_results
+from bot.utils.formatting import format_duration, format_progress, format_track_message, format_search_results
 
 
 def test_format_duration():
@@ -101,4 +101,12 @@ def test_format_search_results():
     
     # Тест без имени бота
     results = format_search_results(tracks)
-    assert "Скачать MP3" not in results 
\ No newline at end of file
+    assert "Скачать MP3" not in results 
+
+
+def test_format_progress():
+    """Тест форматирования прогресса скачивания."""
+    mb = 1024 * 1024
+    assert format_progress(3 * mb, 10 * mb) == "30% (3.0 из 10.0 МБ)"
+    assert format_progress(10 * mb, 10 * mb) == "100% (10.0 из 10.0 МБ)"
+    assert format_progress(mb // 2, None) == "0.5 МБ"
@@ -0,0 +1,74 @@
+"""
+Тесты для общего HTTP клиента.
+
+Этот модуль тестирует создание, переиспользование и закрытие
+общей aiohttp сессии, а также статистику пула соединений.
+"""
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from bot.services.http import HttpClient
+
+
+@pytest_asyncio.fixture
+async def server_url():
+    """Фикстура, запускающая локальный HTTP сервер."""
+    async def handler(request):
+        return web.Response(body=b'data')
+    
+    app = web.Application()
+    app.router.add_get('/file', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f'http://127.0.0.1:{port}/file'
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_session_is_shared():
+    """Тест того, что все обращения получают одну и ту же сессию."""
+    client = HttpClient(limit=10, limit_per_host=5)
+    
+    session = client.session
+    
+    assert client.session is session
+    assert session.connector.limit == 10
+    assert session.connector.limit_per_host == 5
+    await client.close()
+    assert session.closed
+
+
+@pytest.mark.asyncio
+async def test_session_recreated_after_close():
+    """Тест повторного создания сессии после закрытия."""
+    client = HttpClient()
+    first = client.session
+    await client.close()
+    
+    second = client.session
+    
+    assert second is not first
+    assert not second.closed
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_connections_are_reused(server_url):
+    """Тест повторного использования соединений пула."""
+    client = HttpClient()
+    
+    for _ in range(3):
+        async with client.session.get(server_url) as response:
+            assert await response.read() == b'data'
+    
+    stats = client.stats()
+    assert stats['requests'] == 3
+    assert stats['connections_created'] == 1
+    assert stats['connections_reused'] == 2
+    assert stats['idle'] == 1
+    assert stats['acquired'] == 0
+    await client.close()
@@ -0,0 +1,76 @@
+"""
+Тесты для утилит работы с ID3 тегами.
+
+Этот модуль тестирует формирование ID3v2 тега в памяти и удаление
+исходного тега из потока MP3 данных.
+"""
+
+import io
+import pytest
+from mutagen.id3 import ID3
+from bot.utils.id3 import build_id3_tag, id3v2_tag_size, strip_id3v2
+
+
+async def as_stream(data: bytes, chunk_size: int):
+    """Разбивает байты на асинхронный поток чанков."""
+    for i in range(0, len(data), chunk_size):
+        yield data[i:i + chunk_size]
+
+
+TRACK_INFO = {'title': 'Test Track', 'artists': ['Test Artist', 'Second Artist']}
+
+
+def test_build_id3_tag():
+    """Тест формирования тега с названием и исполнителями."""
+    tag = build_id3_tag(TRACK_INFO)
+    
+    assert id3v2_tag_size(tag[:10]) == len(tag)
+    tags = ID3(io.BytesIO(tag + b'\xff\xfb' * 64))
+    assert tags['TIT2'].text == ['Test Track']
+    assert tags['TPE1'].text == ['Test Artist, Second Artist']
+
+
+def test_build_id3_tag_full_metadata():
+    """Тест тега с альбомом, номером трека, обложкой и не-латинским текстом."""
+    cover = b'\xff\xd8\xff\xe0' + b'\x00' * 100
+    info = {'title': 'Песня', 'artists': ['Исполнитель'], 'album': 'Альбом', 'track_number': 7}
+    tag = build_id3_tag(info, cover, padding=64)
+    
+    assert id3v2_tag_size(tag[:10]) == len(tag)
+    assert tag.endswith(b'\x00' * 64)
+    tags = ID3(io.BytesIO(tag + b'\xff\xfb' * 64))
+    assert tags['TIT2'].text == ['Песня']
+    assert tags['TPE1'].text == ['Исполнитель']
+    assert tags['TALB'].text == ['Альбом']
+    assert tags['TRCK'].text == ['7']
+    picture = tags.getall('APIC')[0]
+    assert picture.mime == 'image/jpeg'
+    assert picture.type == 3
+    assert picture.data == cover
+
+
+def test_id3v2_tag_size_without_tag():
+    """Тест определения размера при отсутствии тега."""
+    assert id3v2_tag_size(b'\xff\xfb\x90\x00' + b'\x00' * 6) == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 4096])
+async def test_strip_id3v2(chunk_size):
+    """Тест удаления исходного тега при любом разбиении потока."""
+    audio = b'\xff\xfb\x90\x00' * 50
+    data = build_id3_tag({'title': 'Old', 'artists': ['Old Artist']}) + audio
+    
+    result = b''.join([chunk async for chunk in strip_id3v2(as_stream(data, chunk_size))])
+    
+    assert result == audio
+
+
+@pytest.mark.asyncio
+async def test_strip_id3v2_without_tag():
+    """Тест потока без исходного тега."""
+    audio = b'\xff\xfb\x90\x00' * 50
+    
+    result = b''.join([chunk async for chunk in strip_id3v2(as_stream(audio, 5))])
+    
+    assert result == audio
@@ -0,0 +1,83 @@
+"""
+Тесты для кэша данных бота.
+
+Этот модуль тестирует BotIdentity: однократную загрузку get_me,
+фоновое обновление устаревших данных и обработку ошибок.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+from bot.services.identity import BotIdentity
+
+
+class FakeTimer:
+    """Управляемый таймер для тестов."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_bot(*usernames):
+    bot = Mock()
+    bot.get_me = AsyncMock(side_effect=[Mock(username=name) for name in usernames])
+    return bot
+
+
+@pytest.mark.asyncio
+async def test_username_is_cached():
+    """Тест однократного запроса get_me."""
+    identity = BotIdentity(ttl=60)
+    bot = make_bot("testbot")
+
+    assert await identity.username(bot) == "testbot"
+    assert await identity.username(bot) == "testbot"
+    bot.get_me.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_access_fetches_once():
+    """Тест одновременных обращений до загрузки данных."""
+    identity = BotIdentity(ttl=60)
+    bot = make_bot("testbot")
+
+    names = await asyncio.gather(*(identity.username(bot) for _ in range(5)))
+
+    assert names == ["testbot"] * 5
+    bot.get_me.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_stale_identity_refreshed_in_background():
+    """Тест возврата устаревших данных с фоновым обновлением."""
+    timer = FakeTimer()
+    identity = BotIdentity(ttl=60, timer=timer)
+    bot = make_bot("oldname", "newname")
+    await identity.load(bot)
+
+    timer.now = 61
+    assert await identity.username(bot) == "oldname"
+    await asyncio.sleep(0)
+
+    assert await identity.username(bot) == "newname"
+    assert bot.get_me.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_refresh_error_keeps_stale_identity():
+    """Тест сохранения данных при ошибке обновления."""
+    timer = FakeTimer()
+    identity = BotIdentity(ttl=60, timer=timer)
+    bot = Mock()
+    bot.get_me = AsyncMock(side_effect=[Mock(username="testbot"), Exception("network")])
+    await identity.load(bot)
+
+    timer.now = 61
+    assert await identity.username(bot) == "testbot"
+    await asyncio.sleep(0)
+
+    assert await identity.username(bot) == "testbot"
+    assert identity.stats()['errors'] == 1
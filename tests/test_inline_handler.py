@@ -10,6 +10,9 @@ from unittest.mock import Mock, AsyncMock, patch
 from aiogram.types import InlineQuery, User, InlineQueryResultArticle, InputTextMessageContent
 from aiogram import Bot
 from bot.handlers.inline import inline_search
+from bot.services.identity import BotIdentity
+from bot.services.pagination import InlinePaginator
+from bot.utils.debounce import Debouncer
 import asyncio
 
 
@@ -18,6 +21,7 @@ def inline_query():
     """Фикстура для создания мок-объекта inline-запроса."""
     query = Mock(spec=InlineQuery)
     query.query = "test query"
+    query.offset = ""
     query.from_user = Mock(spec=User, id=12345, username="testuser")
     query.answer = AsyncMock()
     
@@ -33,10 +37,22 @@ def inline_query():
 def mock_music_service():
     """Фикстура для создания мок-объекта музыкального сервиса."""
     service = Mock()
-    service.search_track = AsyncMock()
+    service.search_page = AsyncMock()
     return service
 
 
+@pytest.fixture
+def paginator(mock_music_service):
+    """Фикстура для создания постраничной выдачи поверх мок-сервиса."""
+    return InlinePaginator(mock_music_service.search_page, page_size=10)
+
+
+@pytest.fixture
+def debouncer():
+    """Фикстура для создания debouncer без паузы."""
+    return Debouncer(delay=0)
+
+
 @pytest.mark.asyncio
 async def test_inline_search_empty_query(inline_query):
     """
@@ -59,7 +75,7 @@ async def test_inline_search_empty_query(inline_query):
 
 
 @pytest.mark.asyncio
-async def test_inline_search_success(inline_query, mock_music_service):
+async def test_inline_search_success(inline_query, mock_music_service, paginator, debouncer):
     """
     Тест успешного поиска через inline-запрос.
 
@@ -75,15 +91,12 @@ async def test_inline_search_success(inline_query, mock_music_service):
         'track_link': 'https://music.yandex.ru/track/123',
         'download_link': 'http://test.com/download'
     }]
-    mock_music_service.search_track.return_value = mock_tracks
+    mock_music_service.search_page.return_value = mock_tracks
     
-    with patch('bot.handlers.inline.music_service', mock_music_service):
-        await inline_search(inline_query)
+    await inline_search(inline_query, paginator=paginator, debouncer=debouncer)
     
     # Проверяем вызов поиска
-    mock_music_service.search_track.assert_called_once_with(
-        "test query", limit=10, fetch_download_info=False
-    )
+    mock_music_service.search_page.assert_any_call("test query", 0)
     
     # Проверяем ответ
     inline_query.answer.assert_called_once()
@@ -96,17 +109,16 @@ async def test_inline_search_success(inline_query, mock_music_service):
 
 
 @pytest.mark.asyncio
-async def test_inline_search_no_results(inline_query, mock_music_service):
+async def test_inline_search_no_results(inline_query, mock_music_service, paginator, debouncer):
     """
     Тест поиска при отсутствии результатов.
 
     Проверяет, что обработчик корректно обрабатывает случай,
     когда поиск не возвращает результатов.
     """
-    mock_music_service.search_track.return_value = []
+    mock_music_service.search_page.return_value = []
     
-    with patch('bot.handlers.inline.music_service', mock_music_service):
-        await inline_search(inline_query)
+    await inline_search(inline_query, paginator=paginator, debouncer=debouncer)
     
     # Проверяем ответ
     inline_query.answer.assert_called_once()
@@ -115,7 +127,7 @@ async def test_inline_search_no_results(inline_query, mock_music_service):
 
 
 @pytest.mark.asyncio
-async def test_inline_search_timeout(inline_query, mock_music_service):
+async def test_inline_search_timeout(inline_query, mock_music_service, paginator, debouncer):
     """
     Тест обработки таймаута при поиске.
 
@@ -126,9 +138,8 @@ async def test_inline_search_timeout(inline_query, mock_music_service):
     async def mock_wait_for(*args, **kwargs):
         raise asyncio.TimeoutError()
     
-    with patch('bot.handlers.inline.music_service', mock_music_service), \
-         patch('asyncio.wait_for', mock_wait_for):
-        await inline_search(inline_query)
+    with patch('asyncio.wait_for', mock_wait_for):
+        await inline_search(inline_query, paginator=paginator, debouncer=debouncer)
     
     # Проверяем ответ с сообщением о таймауте
     inline_query.answer.assert_called_once()
@@ -141,17 +152,16 @@ async def test_inline_search_timeout(inline_query, mock_music_service):
 
 
 @pytest.mark.asyncio
-async def test_inline_search_error(inline_query, mock_music_service):
+async def test_inline_search_error(inline_query, mock_music_service, paginator, debouncer):
     """
     Тест обработки ошибок при поиске.
 
     Проверяет, что обработчик корректно обрабатывает непредвиденные
     ошибки, возникающие в процессе поиска.
     """
-    mock_music_service.search_track.side_effect = Exception("Test error")
+    mock_music_service.search_page.side_effect = Exception("Test error")
     
-    with patch('bot.handlers.inline.music_service', mock_music_service):
-        await inline_search(inline_query)
+    await inline_search(inline_query, paginator=paginator, debouncer=debouncer)
     
     # Проверяем ответ с сообщением об ошибке
     inline_query.answer.assert_called_once()
@@ -160,4 +170,153 @@ async def test_inline_search_error(inline_query, mock_music_service):
     result = args[0]
     assert isinstance(result, InlineQueryResultArticle)
     assert result.id == "error"
-    assert "Произошла ошибка" in result.title 
\ No newline at end of file
+    assert "Произошла ошибка" in result.title 
+
+
+@pytest.mark.asyncio
+async def test_inline_search_uses_cached_identity(inline_query, mock_music_service, paginator, debouncer):
+    """
+    Тест получения имени бота из кэша.
+
+    Проверяет, что обработчик не запрашивает get_me, если данные бота
+    уже загружены.
+    """
+    identity = BotIdentity(ttl=3600)
+    await identity.load(Mock(get_me=AsyncMock(return_value=Mock(username="cachedbot"))))
+    mock_music_service.search_page.return_value = [{
+        'id': '123',
+        'title': 'Test Track',
+        'artists': ['Test Artist'],
+        'duration_ms': 180000,
+        'track_link': 'https://music.yandex.ru/track/123',
+    }]
+    
+    await inline_search(inline_query, bot_identity=identity, paginator=paginator, debouncer=debouncer)
+    
+    inline_query.bot.get_me.assert_not_called()
+    result = inline_query.answer.call_args[0][0][0]
+    assert "cachedbot" in result.input_message_content.message_text
+
+
+@pytest.mark.asyncio
+async def test_inline_search_next_page(inline_query, mock_music_service, paginator, debouncer):
+    """
+    Тест выдачи следующей страницы по смещению.
+
+    Проверяет, что в ответ передается смещение следующей страницы,
+    а вторая страница отдается из уже найденных результатов.
+    """
+    mock_music_service.search_page.side_effect = lambda query, page: [
+        {
+            'id': str(page * 20 + i),
+            'title': f'Track {i}',
+            'artists': ['Test Artist'],
+            'duration_ms': 180000,
+            'track_link': 'https://music.yandex.ru/track/1',
+        }
+        for i in range(20)
+    ] if page == 0 else []
+    
+    await inline_search(inline_query, paginator=paginator, debouncer=debouncer)
+    assert inline_query.answer.call_args.kwargs['next_offset'] == "10"
+    
+    # Даем завершиться фоновой подгрузке следующей страницы выдачи
+    for _ in range(5):
+        await asyncio.sleep(0)
+    inline_query.offset = "10"
+    await inline_search(inline_query, paginator=paginator, debouncer=debouncer)
+    
+    results = inline_query.answer.call_args[0][0]
+    assert len(results) == 10
+    assert "Track 10" in results[0].title
+    assert inline_query.answer.call_args.kwargs['next_offset'] == ""
+
+
+
+@pytest.mark.asyncio
+async def test_inline_search_superseded_query(inline_query, mock_music_service, paginator):
+    """
+    Тест отмены устаревшего inline-запроса.
+
+    Проверяет, что при наборе текста поиск выполняется только по последнему
+    запросу пользователя, а на замененный запрос ответ не отправляется.
+    """
+    mock_music_service.search_page.return_value = []
+    debouncer = Debouncer(delay=0.05)
+    newer = Mock(spec=InlineQuery)
+    newer.query = "test query longer"
+    newer.offset = ""
+    newer.from_user = inline_query.from_user
+    newer.bot = inline_query.bot
+    newer.answer = AsyncMock()
+    
+    first = asyncio.create_task(inline_search(inline_query, paginator=paginator, debouncer=debouncer))
+    await asyncio.sleep(0.01)
+    await inline_search(newer, paginator=paginator, debouncer=debouncer)
+    await first
+    
+    inline_query.answer.assert_not_called()
+    newer.answer.assert_called_once()
+    mock_music_service.search_page.assert_called_once_with("test query longer", 0)
+
+
+@pytest.mark.asyncio
+async def test_inline_search_provisional_results(inline_query, mock_music_service, paginator, debouncer):
+    """
+    Тест предварительных результатов для уточненного запроса.
+
+    Проверяет, что уточненный запрос сразу получает результаты, отобранные
+    из найденных ранее, с коротким временем кэширования, а настоящий поиск
+    выполняется после ответа.
+    """
+    track = {
+        'id': '1',
+        'title': 'Test Track',
+        'artists': ['Test Artist'],
+        'duration_ms': 180000,
+        'track_link': 'https://music.yandex.ru/track/1',
+    }
+    mock_music_service.search_page.side_effect = lambda query, page: [track] if page == 0 else []
+    inline_query.query = "test"
+    await inline_search(inline_query, paginator=paginator, debouncer=debouncer)
+    mock_music_service.search_page.reset_mock()
+    
+    inline_query.query = "test tra"
+    answered_before_search = []
+    inline_query.answer.side_effect = lambda *args, **kwargs: answered_before_search.append(
+        mock_music_service.search_page.await_count == 0
+    )
+    await inline_search(inline_query, paginator=paginator, debouncer=debouncer)
+    
+    assert answered_before_search == [True]
+    assert inline_query.answer.call_args.kwargs['cache_time'] == 5
+    assert "Test Track" in inline_query.answer.call_args[0][0][0].title
+    # Обработчик не ждет настоящего поиска, он идет в фоновой задаче
+    mock_music_service.search_page.assert_not_called()
+    for _ in range(5):
+        await asyncio.sleep(0)
+    mock_music_service.search_page.assert_any_call("test tra", 0)
+
+
+@pytest.mark.asyncio
+async def test_inline_search_stale_results(inline_query, mock_music_service, paginator, debouncer):
+    """
+    Тест ответа сохраненными результатами при недоступности API.
+
+    Проверяет, что результаты с пометкой stale отдаются сразу, а Telegram
+    кэширует такой ответ недолго.
+    """
+    mock_music_service.search_page.side_effect = [[{
+        'id': '123',
+        'title': 'Test Track',
+        'artists': ['Test Artist'],
+        'duration_ms': 180000,
+        'track_link': 'https://music.yandex.ru/track/123',
+        'stale': True
+    }], None]
+    
+    await inline_search(inline_query, paginator=paginator, debouncer=debouncer)
+    
+    args = inline_query.answer.call_args[0][0]
+    assert len(args) == 1
+    assert inline_query.answer.call_args.kwargs['cache_time'] == 5
@@ -0,0 +1,65 @@
+"""
+Тесты для метрик Prometheus.
+
+Этот модуль тестирует эндпоинт /metrics и учет задержек
+горячих участков кода.
+"""
+
+import pytest
+from unittest.mock import AsyncMock
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from prometheus_client import REGISTRY
+from bot.services.music import MusicService
+from bot.utils.metrics import StatsCollector
+from bot.web.metrics import setup_metrics
+
+
+def sample(name, labels=None):
+    """Возвращает текущее значение метрики из реестра."""
+    return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint():
+    """Тест того, что /metrics отдает метрики в формате Prometheus."""
+    app = web.Application()
+    setup_metrics(app)
+    
+    async with TestClient(TestServer(app)) as client:
+        response = await client.get("/metrics")
+        body = await response.text()
+    
+    assert response.status == 200
+    assert response.headers['Content-Type'].startswith('text/plain')
+    assert 'aamuzbot_search_track_seconds_bucket' in body
+    assert 'aamuzbot_search_cache_hits_total' in body
+    assert 'aamuzbot_downloads_running' in body
+    assert 'aamuzbot_http_pool_acquired' in body
+
+
+@pytest.mark.asyncio
+async def test_search_latency_and_errors_are_recorded():
+    """Тест учета времени поиска и ошибок поиска."""
+    service = MusicService(client=AsyncMock())
+    service.client.search.side_effect = Exception("API Error")
+    count_before = sample('aamuzbot_search_track_seconds_count')
+    errors_before = sample('aamuzbot_errors_total', {'operation': 'search'})
+    
+    await service.search_track("test query")
+    
+    assert sample('aamuzbot_search_track_seconds_count') == count_before + 1
+    assert sample('aamuzbot_errors_total', {'operation': 'search'}) == errors_before + 1
+
+
+def test_stats_collector_types():
+    """Тест экспорта полей статистики как счетчиков и gauge."""
+    collector = StatsCollector()
+    collector.register('test', lambda: {'hits': 3, 'size': 7, 'label': 'x'}, counters=('hits',))
+    
+    metrics = {metric.name: metric for metric in collector.collect()}
+    
+    assert metrics['aamuzbot_test_hits'].type == 'counter'
+    assert metrics['aamuzbot_test_size'].type == 'gauge'
+    assert metrics['aamuzbot_test_size'].samples[0].value == 7
+    assert 'aamuzbot_test_label' not in metrics
@@ -5,9 +5,11 @@
 включая поиск треков и получение информации для скачивания.
 """
 
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from bot.services.music import MusicService
+from bot.config.config import config
 
 
 @pytest.fixture
@@ -202,4 +204,537 @@ async def test_get_track_full_info_error(music_service):
     assert track_info is None
     
     # Проверяем, что попытка получения информации была сделана
-    music_service.client.tracks.assert_called_once_with(["123456"]) 
\ No newline at end of file
+    music_service.client.tracks.assert_called_once_with(["123456"]) 
+
+@pytest.mark.asyncio
+async def test_search_track_uses_cache(music_service, mock_track):
+    """Тест повторного поиска: второй запрос обслуживается из кэша."""
+    search_result = MagicMock()
+    search_result.tracks.results = [mock_track]
+    music_service.client.search.return_value = search_result
+    
+    first = await music_service.search_track("Test  Query", fetch_download_info=False)
+    second = await music_service.search_track("test query", fetch_download_info=False)
+    
+    # Запрос к API выполнен только один раз
+    music_service.client.search.assert_called_once_with("Test  Query")
+    assert first == second
+    
+    stats = music_service.cache_stats()['search']
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+
+@pytest.mark.asyncio
+async def test_search_track_cache_key_includes_limit(music_service, mock_track):
+    """Тест того, что разные лимиты кэшируются раздельно."""
+    search_result = MagicMock()
+    search_result.tracks.results = [mock_track]
+    music_service.client.search.return_value = search_result
+    
+    await music_service.search_track("test query", limit=5, fetch_download_info=False)
+    await music_service.search_track("test query", limit=10, fetch_download_info=False)
+    
+    assert music_service.client.search.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_search_track_error_not_cached(music_service):
+    """Тест того, что ошибки API не попадают в кэш."""
+    music_service.client.search.side_effect = Exception("API Error")
+    
+    await music_service.search_track("test query")
+    await music_service.search_track("test query")
+    
+    assert music_service.client.search.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_search_is_coalesced(music_service, mock_track):
+    """Тест объединения одинаковых параллельных поисковых запросов."""
+    search_result = MagicMock()
+    search_result.tracks.results = [mock_track]
+    
+    async def slow_search(query):
+        await asyncio.sleep(0.01)
+        return search_result
+    
+    music_service.client.search.side_effect = slow_search
+    
+    results = await asyncio.gather(*[
+        music_service.search_track("test query", fetch_download_info=False)
+        for _ in range(5)
+    ])
+    
+    music_service.client.search.assert_called_once_with("test query")
+    assert all(len(r) == 1 for r in results)
+    assert music_service.flight_stats()['coalesced'] == 4
+
+
+@pytest.mark.asyncio
+async def test_concurrent_download_info_is_coalesced(music_service):
+    """Тест объединения параллельных запросов ссылки на один трек."""
+    download_info = MagicMock()
+    download_info.bitrate_in_kbps = 320
+    download_info.get_direct_link_async = AsyncMock(return_value="https://test-download-link.com")
+    track = MagicMock()
+    track.get_download_info_async = AsyncMock(return_value=[download_info])
+    
+    async def slow_tracks(track_ids):
+        await asyncio.sleep(0.01)
+        return [track]
+    
+    music_service.client.tracks.side_effect = slow_tracks
+    
+    links = await asyncio.gather(*[
+        music_service.get_track_download_info("123456") for _ in range(3)
+    ])
+    
+    assert links == ["https://test-download-link.com"] * 3
+    music_service.client.tracks.assert_called_once_with(["123456"])
+    download_info.get_direct_link_async.assert_called_once()
+    assert music_service.flight_stats()['coalesced'] == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_call(music_service):
+    """Тест того, что отмена одного из ожидающих не прерывает общий запрос."""
+    started = asyncio.Event()
+    release = asyncio.Event()
+    
+    async def slow_tracks(track_ids):
+        started.set()
+        await release.wait()
+        return []
+    
+    music_service.client.tracks.side_effect = slow_tracks
+    
+    first = asyncio.create_task(music_service.get_track_download_info("123456"))
+    await started.wait()
+    second = asyncio.create_task(music_service.get_track_download_info("123456"))
+    await asyncio.sleep(0)
+    
+    first.cancel()
+    release.set()
+    
+    assert await second is None
+    music_service.client.tracks.assert_called_once_with(["123456"])
+
+
+@pytest.fixture
+def resolvable_track():
+    """Фикстура трека с асинхронными методами получения ссылки."""
+    artist = MagicMock()
+    artist.name = "Test Artist"
+    download_info = MagicMock()
+    download_info.bitrate_in_kbps = 320
+    download_info.get_direct_link_async = AsyncMock(return_value="https://test-download-link.com")
+    
+    track = MagicMock()
+    track.title = "Test Track"
+    track.artists = [artist]
+    track.duration_ms = 180000
+    track.id = "123456"
+    track.get_download_info_async = AsyncMock(return_value=[download_info])
+    track.download_info = download_info
+    return track
+
+
+@pytest.mark.asyncio
+async def test_get_track_full_info_single_upstream_lookup(music_service, resolvable_track):
+    """Тест того, что метаданные и ссылка получаются одним вызовом tracks()."""
+    music_service.client.tracks.return_value = [resolvable_track]
+    
+    track_info = await music_service.get_track_full_info("123456")
+    
+    assert track_info["title"] == "Test Track"
+    assert track_info["artists"] == ["Test Artist"]
+    assert track_info["download_link"] == "https://test-download-link.com"
+    music_service.client.tracks.assert_called_once_with(["123456"])
+    resolvable_track.get_download_info_async.assert_called_once()
+    resolvable_track.download_info.get_direct_link_async.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_get_track_full_info_uses_resolve_cache(music_service, resolvable_track):
+    """Тест повторного получения информации о треке из кэша."""
+    music_service.client.tracks.return_value = [resolvable_track]
+    
+    first = await music_service.get_track_full_info("123456")
+    second = await music_service.get_track_full_info("123456")
+    
+    assert 'cached' not in first
+    assert second['cached'] is True
+    assert second['download_link'] == first['download_link']
+    music_service.client.tracks.assert_called_once()
+    
+    music_service.invalidate_track_info("123456")
+    await music_service.get_track_full_info("123456")
+    assert music_service.client.tracks.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_full_info_metadata_in_track_header(music_service, resolvable_track):
+    """Тест альбома, номера трека и обложки из метаданных трека в ID3 теге."""
+    import io
+    from mutagen.id3 import ID3
+    album = MagicMock(title="Test Album")
+    album.track_position.index = 3
+    resolvable_track.albums = [album]
+    resolvable_track.cover_uri = "avatars.yandex.net/get-music-content/%%"
+    resolvable_track.get_cover_url.return_value = "https://avatars.yandex.net/get-music-content/400x400"
+    music_service.client.tracks.return_value = [resolvable_track]
+    cover = b'\xff\xd8\xff\xe0' + b'\x00' * 32
+    music_service._fetch_cover = AsyncMock(return_value=cover)
+    
+    track_info = await music_service.get_track_full_info("123456")
+    header = music_service.build_track_header(track_info, await music_service.get_track_cover(track_info))
+    
+    assert track_info["album"] == "Test Album"
+    assert track_info["track_number"] == 3
+    music_service._fetch_cover.assert_called_once_with(track_info["cover_url"])
+    tags = ID3(io.BytesIO(header + b'\xff\xfb\x90\x00' * 100))
+    assert tags["TALB"].text == ["Test Album"]
+    assert tags["TRCK"].text == ["3"]
+    assert tags.getall("APIC")[0].data == cover
+
+
+@pytest.mark.asyncio
+async def test_prefetch_track_info(music_service, resolvable_track):
+    """Тест фоновой подготовки первых результатов с ограничением числа запросов."""
+    music_service.client.tracks.return_value = [resolvable_track]
+    music_service.prefetch_max_inflight = 1
+    
+    scheduled = music_service.prefetch_track_info(["123456", "654321"])
+    assert scheduled == 1
+    await asyncio.gather(*music_service._prefetches)
+    
+    assert music_service.prefetch_stats() == {'scheduled': 1, 'skipped': 1, 'inflight': 0}
+    track_info = await music_service.get_track_full_info("123456")
+    assert track_info['cached'] is True
+    music_service.client.tracks.assert_called_once_with(["123456"])
+    
+    # Уже подготовленные треки повторно не запрашиваются
+    assert music_service.prefetch_track_info(["123456"]) == 0
+
+
+@pytest.mark.asyncio
+async def test_search_resolves_download_links_in_parallel(music_service, mock_track):
+    """Тест параллельного получения ссылок с частичным результатом при ошибке."""
+    search_result = MagicMock()
+    tracks = []
+    for i in range(3):
+        track = MagicMock()
+        track.title = f"Track {i}"
+        track.artists = []
+        track.duration_ms = 180000
+        track.id = str(i)
+        tracks.append(track)
+    search_result.tracks.results = tracks
+    music_service.client.search.return_value = search_result
+    
+    active = 0
+    max_active = 0
+    
+    async def download_info(track_id):
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return None if track_id == "1" else f"https://link/{track_id}"
+    
+    with patch.object(music_service, 'get_track_download_info', side_effect=download_info):
+        results = await music_service.search_track("test query", limit=3)
+    
+    assert max_active == 3
+    assert [r.get('download_link') for r in results] == ["https://link/0", None, "https://link/2"]
+
+
+@pytest.mark.asyncio
+async def test_search_download_link_timeout(music_service, mock_track):
+    """Тест таймаута получения ссылки для одного трека."""
+    search_result = MagicMock()
+    search_result.tracks.results = [mock_track]
+    music_service.client.search.return_value = search_result
+    
+    async def slow_download_info(track_id):
+        await asyncio.sleep(10)
+    
+    with patch.object(music_service, 'get_track_download_info', side_effect=slow_download_info), \
+         patch('bot.services.music.config.resolve_timeout', 0.01):
+        results = await music_service.search_track("test query")
+    
+    assert len(results) == 1
+    assert 'download_link' not in results[0]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_track_lookups_are_batched(music_service):
+    """Тест объединения запросов разных треков в один вызов tracks()."""
+    def make_track(track_id):
+        download_info = MagicMock()
+        download_info.bitrate_in_kbps = 320
+        download_info.get_direct_link_async = AsyncMock(return_value=f"https://link/{track_id}")
+        track = MagicMock()
+        track.id = track_id
+        track.get_download_info_async = AsyncMock(return_value=[download_info])
+        return track
+    
+    music_service.client.tracks.side_effect = lambda track_ids: [make_track(i) for i in reversed(track_ids)]
+    
+    links = await asyncio.gather(*[
+        music_service.get_track_download_info(track_id) for track_id in ("1", "2", "3")
+    ])
+    
+    assert links == ["https://link/1", "https://link/2", "https://link/3"]
+    music_service.client.tracks.assert_called_once_with(["1", "2", "3"])
+    assert music_service.batch_stats()['batches'] == 1
+
+
+@pytest.mark.asyncio
+async def test_batched_lookup_isolates_invalid_id(music_service):
+    """Тест ID вида "<трек>:<альбом>" и некорректного ID в общем пакете."""
+    from yandex_music.exceptions import BadRequestError
+    def tracks(track_ids):
+        if '999' in track_ids:
+            raise BadRequestError("Bad Request")
+        return [MagicMock(id=int(track_id)) for track_id in track_ids]
+    
+    music_service.client.tracks.side_effect = tracks
+    
+    results = await asyncio.gather(
+        music_service._fetch_track("1"),
+        music_service._fetch_track("2:300"),
+        music_service._fetch_track("abc"),
+    )
+    
+    assert [track.id for track in results[:2]] == [1, 2]
+    assert results[2] is None
+    music_service.client.tracks.assert_called_once_with(["1", "2"])
+    
+    # Ошибка из-за одного ID в пакете достается только его запросу
+    results = await asyncio.gather(
+        music_service._fetch_track("3"),
+        music_service._fetch_track("999"),
+        return_exceptions=True,
+    )
+    assert results[0].id == 3
+    assert isinstance(results[1], BadRequestError)
+    assert music_service.batch_stats()['splits'] == 1
+
+
+class FakeResponse:
+    """Ответ хранилища с данными, отдаваемыми чанками."""
+
+    def __init__(self, data: bytes):
+        self.status = 200
+        self.data = data
+        self.content_length = len(data)
+        self.content = MagicMock()
+        self.content.iter_chunked = self.iter_chunked
+        self.released = False
+
+    async def iter_chunked(self, size):
+        for i in range(0, len(self.data), size):
+            yield self.data[i:i + size]
+
+    def release(self):
+        self.released = True
+
+
+@pytest.mark.asyncio
+async def test_open_track_stream_fills_blob_cache(mock_client, tmp_path):
+    """Тест сохранения трека в дисковый кэш и повторной отдачи из него."""
+    from bot.services.blob_cache import BlobCache
+    service = MusicService(client=mock_client, blob_cache=BlobCache(str(tmp_path), max_bytes=1 << 20))
+    track_info = {'id': '123', 'title': 'Test Track', 'artists': ['Test Artist'], 'bitrate': 320}
+    body = b'\xff\xfb' * 1000
+    session = MagicMock()
+    session.get = AsyncMock(return_value=FakeResponse(body))
+    
+    with patch('bot.services.music.http_client', MagicMock(session=session)):
+        first = await service.open_track_stream('https://test.com/track.mp3', track_info)
+        first_data = b''.join([chunk async for chunk in first])
+        second = await service.open_track_stream('https://test.com/track.mp3', track_info)
+        second_data = b''.join([chunk async for chunk in second])
+    
+    assert first_data.endswith(body)
+    assert second_data == first_data
+    session.get.assert_called_once()
+    assert service.blob_cache.stats()['hits'] == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_stream_survives_eviction(mock_client, tmp_path):
+    """Тест чтения файла кэша, вытесненного после открытия потока."""
+    import os
+    from bot.services.blob_cache import BlobCache
+    service = MusicService(client=mock_client, blob_cache=BlobCache(str(tmp_path), max_bytes=1 << 20))
+    track_info = {'id': '123', 'title': 'Test Track', 'artists': ['Test Artist'], 'bitrate': 320}
+    body = b'\xff\xfb' * 1000
+    session = MagicMock()
+    session.get = AsyncMock(side_effect=lambda url: FakeResponse(body))
+    key = BlobCache.make_key('123', 320)
+    
+    with patch('bot.services.music.http_client', MagicMock(session=session)):
+        first = await service.open_track_stream('https://test.com/track.mp3', track_info)
+        expected = b''.join([chunk async for chunk in first])
+        
+        # Файл удаляется уже после того, как поток его открыл
+        cached = await service.open_track_stream('https://test.com/track.mp3', track_info)
+        os.remove(service.blob_cache.path(key))
+        assert b''.join([chunk async for chunk in cached]) == expected
+        session.get.assert_called_once()
+        
+        # Файл удален между получением пути и открытием: трек скачивается заново
+        with patch.object(service.blob_cache, 'get', return_value=str(tmp_path / 'gone.mp3')):
+            fallback = await service.open_track_stream('https://test.com/track.mp3', track_info)
+            assert b''.join([chunk async for chunk in fallback]) == expected
+    
+    assert session.get.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_open_track_stream_does_not_wait_for_slow_fill(mock_client, tmp_path):
+    """Тест прямого скачивания, если кэш заполняется дольше допустимого."""
+    from bot.services.blob_cache import BlobCache
+    service = MusicService(client=mock_client, blob_cache=BlobCache(str(tmp_path), max_bytes=1 << 20))
+    track_info = {'id': '123', 'title': 'Test Track', 'artists': ['Test Artist'], 'bitrate': 320}
+    body = b'\xff\xfb' * 1000
+    session = MagicMock()
+    session.get = AsyncMock(side_effect=lambda url: FakeResponse(body))
+    
+    with patch('bot.services.music.http_client', MagicMock(session=session)), \
+         patch.object(config, 'blob_cache_wait_timeout', 0.01):
+        # Первый запрос занимает заполнение кэша, но данные пока не читает
+        slow = await service.open_track_stream('https://test.com/track.mp3', track_info)
+        fast = await service.open_track_stream('https://test.com/track.mp3', track_info)
+        data = b''.join([chunk async for chunk in fast])
+        await slow.close()
+    
+    assert data.endswith(body)
+    assert session.get.call_count == 2
+    assert service.blob_cache.stats()['wait_timeouts'] == 1
+    assert service.blob_cache.stats()['filling'] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_download_releases_blob_fill(mock_client, tmp_path):
+    """Тест освобождения заполнения кэша, занятого до неудачного запроса."""
+    from bot.services.blob_cache import BlobCache
+    service = MusicService(client=mock_client, blob_cache=BlobCache(str(tmp_path), max_bytes=1 << 20))
+    track_info = {'id': '123', 'title': 'Test Track', 'artists': ['Test Artist'], 'bitrate': 320}
+    session = MagicMock()
+    session.get = AsyncMock(side_effect=Exception("connection reset"))
+    
+    with patch('bot.services.music.http_client', MagicMock(session=session)):
+        assert await service.open_track_stream('https://test.com/track.mp3', track_info) is None
+    
+    assert service.blob_cache.stats()['filling'] == 0
+
+
+@pytest.mark.asyncio
+async def test_track_range_forwarded_upstream(mock_client, tmp_path):
+    """Тест определения размера трека и запроса части данных из хранилища."""
+    from bot.services.blob_cache import BlobCache
+    service = MusicService(client=mock_client, blob_cache=BlobCache(str(tmp_path), max_bytes=1 << 20))
+    track_info = {'id': '123', 'title': 'Test Track', 'artists': ['Test Artist'], 'bitrate': 320}
+    # Исходный тег: заголовок 10 байт с размером 20 байт данных тега
+    upstream = b'ID3\x03\x00\x00\x00\x00\x00\x14' + b'\x00' * 20 + b'\xff\xfb' * 500
+    
+    probe = FakeResponse(upstream[:10])
+    probe.status = 206
+    probe.headers = {'Content-Range': f'bytes 0-9/{len(upstream)}'}
+    probe.read = AsyncMock(return_value=upstream[:10])
+    part = FakeResponse(upstream[30 + 100:30 + 200])
+    part.status = 206
+    session = MagicMock()
+    session.get = AsyncMock(side_effect=[probe, part])
+    
+    with patch('bot.services.music.http_client', MagicMock(session=session)):
+        layout = await service.get_track_layout('https://test.com/track.mp3', track_info)
+        assert await service.get_track_layout('https://test.com/track.mp3', track_info) == layout
+        stream = await service.open_track_range('https://test.com/track.mp3', track_info, 100, 199, layout[0])
+        data = b''.join([chunk async for chunk in stream])
+    
+    assert layout == (30, len(upstream) - 30)
+    assert data == upstream[130:230]
+    assert session.get.call_args_list[0].kwargs['headers'] == {'Range': 'bytes=0-9'}
+    assert session.get.call_args_list[1].kwargs['headers'] == {'Range': 'bytes=130-229'}
+
+
+@pytest.mark.asyncio
+async def test_search_retried_after_throttling(music_service, mock_track):
+    """Тест повтора поиска после ошибки перегрузки API."""
+    from yandex_music.exceptions import NetworkError
+    search_result = MagicMock()
+    search_result.tracks.results = [mock_track]
+    music_service.client.search.side_effect = [NetworkError('Too Many Requests'), search_result]
+    music_service.client.tracks.return_value = [mock_track]
+    music_service.limiters['search'].backoff = lambda attempt: 0
+    
+    results = await music_service.search_track("test query", fetch_download_info=False)
+    
+    assert len(results) == 1
+    assert music_service.client.search.call_count == 2
+    assert music_service.limiter_stats()['search']['retries'] == 1
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_serves_stale_results(music_service, mock_track, resolvable_track):
+    """Тест отдачи сохраненных результатов без ожидания API при разомкнутом выключателе."""
+    from yandex_music.exceptions import NetworkError
+    search_result = MagicMock()
+    search_result.tracks.results = [mock_track]
+    music_service.client.search.return_value = search_result
+    music_service.client.tracks.return_value = [resolvable_track]
+    assert await music_service.search_page("test query", 0)
+    assert await music_service.get_track_full_info("123456")
+    
+    # API перестает отвечать, выключатели размыкаются
+    for name in ('search', 'tracks'):
+        music_service.limiters[name].retries = 0
+        for _ in range(config.breaker_failure_threshold):
+            with pytest.raises(NetworkError):
+                await music_service._call(name, AsyncMock(side_effect=NetworkError('Bad Gateway')))
+    music_service.invalidate_track_info("123456")
+    music_service.client.search.reset_mock()
+    music_service.client.tracks.reset_mock()
+    
+    page = await music_service.search_page("Test Query", 0)
+    track_info = await music_service.get_track_full_info("123456")
+    
+    assert [track['id'] for track in page] == ["123456"]
+    assert page[0]['stale'] is True
+    assert track_info['stale'] is True
+    assert track_info['download_link'] == "https://test-download-link.com"
+    music_service.client.search.assert_not_called()
+    music_service.client.tracks.assert_not_called()
+    assert music_service.breaker_stats()['search']['rejected'] == 1
+    assert await music_service.search_page("other query", 0) is None
+
+
+@pytest.mark.asyncio
+async def test_open_track_stream_reports_progress(mock_client, tmp_path):
+    """Тест уведомлений о прогрессе скачивания с размером из Content-Length."""
+    from bot.services.blob_cache import BlobCache
+    service = MusicService(client=mock_client, blob_cache=BlobCache(str(tmp_path), max_bytes=1 << 20))
+    track_info = {'id': '123', 'title': 'Test Track', 'artists': ['Test Artist']}
+    body = b'\xff\xfb' * 1000
+    session = MagicMock()
+    session.get = AsyncMock(return_value=FakeResponse(body))
+    calls = []
+    
+    with patch('bot.services.music.http_client', MagicMock(session=session)), \
+         patch.object(config, 'stream_chunk_size', 512):
+        stream = await service.open_track_stream(
+            'https://test.com/track.mp3', track_info, progress=lambda *args: calls.append(args)
+        )
+        data = b''.join([chunk async for chunk in stream])
+    
+    assert data.endswith(body)
+    assert calls[0] == (512, len(body))
+    assert calls[-1] == (len(body), len(body))
+    assert stream.stats.ttfb is not None
+    assert stream.stats.finished_at is not None
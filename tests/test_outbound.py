@@ -0,0 +1,128 @@
+"""
+Тесты для планировщика исходящих запросов к Bot API.
+
+Этот модуль тестирует лимиты отправки сообщений в чат, объединение
+изменений одного сообщения и повтор запроса после TelegramRetryAfter.
+"""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock, Mock
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import EditMessageText, GetMe, SendAudio, SendMessage
+from aiogram.types import BufferedInputFile
+from bot.middlewares.outbound import OutboundThrottleMiddleware
+from bot.utils.downloader import StreamInputFile
+
+
+def make_request(result='ok'):
+    return AsyncMock(return_value=result)
+
+
+@pytest.mark.asyncio
+async def test_edits_are_coalesced():
+    """Тест отправки только последнего из ожидающих изменений сообщения."""
+    middleware = OutboundThrottleMiddleware(chat_rate=20, chat_burst=1)
+    request = make_request()
+    bot = Mock()
+
+    await middleware(request, bot, SendMessage(chat_id=1, text='⏳'))
+    results = await asyncio.gather(*(
+        middleware(request, bot, EditMessageText(chat_id=1, message_id=5, text=text))
+        for text in ('⬇️', '📝', '📤')
+    ))
+
+    assert results == ['ok', 'ok', 'ok']
+    sent = [call.args[1] for call in request.await_args_list]
+    assert [method.text for method in sent] == ['⏳', '📤']
+    assert middleware.stats()['coalesced'] == 2
+    assert middleware.stats()['pending_edits'] == 0
+
+
+@pytest.mark.asyncio
+async def test_edit_error_reaches_all_callers():
+    """Тест передачи ошибки отправки всем объединенным изменениям."""
+    middleware = OutboundThrottleMiddleware()
+    request = AsyncMock(side_effect=RuntimeError('Bad Request'))
+
+    results = await asyncio.gather(*(
+        middleware(request, Mock(), EditMessageText(chat_id=1, message_id=5, text=text))
+        for text in ('a', 'b')
+    ), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    request.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_chat_rate_limit():
+    """Тест ограничения частоты сообщений в один чат, но не в разные."""
+    middleware = OutboundThrottleMiddleware(chat_rate=10, chat_burst=1)
+    request = make_request()
+
+    started = time.monotonic()
+    await asyncio.gather(*(middleware(request, Mock(), SendMessage(chat_id=i, text='x')) for i in range(5)))
+    assert time.monotonic() - started < 0.05
+
+    started = time.monotonic()
+    await middleware(request, Mock(), SendMessage(chat_id=1, text='x'))
+    await middleware(request, Mock(), SendMessage(chat_id=1, text='y'))
+    assert time.monotonic() - started >= 0.15
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_honoured():
+    """Тест повтора запроса после ответа Too Many Requests."""
+    middleware = OutboundThrottleMiddleware(chat_rate=100, chat_burst=5, max_retries=1)
+    method = SendMessage(chat_id=1, text='x')
+    flood = TelegramRetryAfter(method=method, message='Flood control exceeded', retry_after=0)
+    request = AsyncMock(side_effect=[flood, 'ok'])
+
+    assert await middleware(request, Mock(), method) == 'ok'
+    assert request.await_count == 2
+    assert middleware.stats()['retries'] == 1
+
+    request = AsyncMock(side_effect=flood)
+    with pytest.raises(TelegramRetryAfter):
+        await middleware(request, Mock(), method)
+    assert request.await_count == 2
+
+
+async def as_stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_stream_upload_is_not_retried():
+    """Тест того, что загрузка файла из потока не повторяется после Too Many Requests."""
+    middleware = OutboundThrottleMiddleware(chat_rate=100, chat_burst=5, max_retries=3)
+    audio = StreamInputFile(as_stream(b'ID3', b'data'), filename='track.mp3')
+    method = SendAudio(chat_id=1, audio=audio)
+    flood = TelegramRetryAfter(method=method, message='Flood control exceeded', retry_after=0)
+    request = AsyncMock(side_effect=[flood, 'ok'])
+
+    with pytest.raises(TelegramRetryAfter):
+        await middleware(request, Mock(), method)
+    assert request.await_count == 1
+    assert middleware.stats()['retries'] == 0
+
+    # Файл из памяти можно отправить повторно
+    method = SendAudio(chat_id=1, audio=BufferedInputFile(b'ID3data', filename='track.mp3'))
+    request = AsyncMock(side_effect=[flood, 'ok'])
+    assert await middleware(request, Mock(), method) == 'ok'
+    assert request.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_methods_without_chat_pass_through():
+    """Тест того, что служебные методы не ограничиваются."""
+    middleware = OutboundThrottleMiddleware(chat_rate=0.001, chat_burst=1)
+    request = make_request()
+
+    for _ in range(3):
+        await middleware(request, Mock(), GetMe())
+
+    assert request.await_count == 3
+    assert middleware.stats()['requests'] == 0
@@ -0,0 +1,213 @@
+"""
+Тесты для постраничной выдачи inline-поиска.
+
+Этот модуль тестирует InlinePaginator: выдачу страниц из накопленного
+набора результатов, фоновую подгрузку следующей страницы и окончание выдачи.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+from bot.services.pagination import InlinePaginator, rank_tracks
+
+
+def make_tracks(start: int, count: int):
+    return [{'id': str(i), 'title': f'Track {i}'} for i in range(start, start + count)]
+
+
+def make_fetch(pages):
+    """Мок загрузки страниц выдачи: пустой список после последней страницы."""
+    async def fetch(query, page):
+        return pages[page] if page < len(pages) else []
+    return AsyncMock(side_effect=fetch)
+
+
+async def settle():
+    """Дает завершиться фоновым задачам подгрузки."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_first_page_and_next_offset():
+    """Тест первой страницы и смещения следующей."""
+    fetch = make_fetch([make_tracks(0, 20), make_tracks(20, 20)])
+    paginator = InlinePaginator(fetch, page_size=10)
+
+    tracks, next_offset = await paginator.get_page("query", "")
+
+    assert [t['id'] for t in tracks] == [str(i) for i in range(10)]
+    assert next_offset == "10"
+    fetch.assert_awaited_once_with("query", 0)
+
+
+@pytest.mark.asyncio
+async def test_next_pages_served_from_result_set():
+    """Тест выдачи следующих страниц без повторного поиска."""
+    fetch = make_fetch([make_tracks(0, 20), make_tracks(20, 20)])
+    paginator = InlinePaginator(fetch, page_size=10)
+
+    await paginator.get_page("query", "")
+    await settle()
+    tracks, next_offset = await paginator.get_page("Query ", "10")
+    await settle()
+
+    assert [t['id'] for t in tracks] == [str(i) for i in range(10, 20)]
+    assert next_offset == "20"
+    # Вторая страница выдачи загружена в фоне во время показа первой
+    assert [call.args for call in fetch.await_args_list] == [("query", 0), ("query", 1)]
+
+
+@pytest.mark.asyncio
+async def test_prefetch_loads_next_upstream_page():
+    """Тест фоновой загрузки следующей страницы выдачи."""
+    fetch = make_fetch([make_tracks(0, 10), make_tracks(10, 10)])
+    paginator = InlinePaginator(fetch, page_size=10)
+
+    await paginator.get_page("query", "")
+    await settle()
+
+    # Подгружены обе оставшиеся страницы и обнаружен конец выдачи
+    assert fetch.await_count == 3
+    tracks, _ = await paginator.get_page("query", "10")
+    assert [t['id'] for t in tracks] == [str(i) for i in range(10, 20)]
+    assert paginator.stats()['prefetches'] >= 1
+
+
+@pytest.mark.asyncio
+async def test_last_page_has_empty_next_offset():
+    """Тест окончания выдачи."""
+    fetch = make_fetch([make_tracks(0, 15)])
+    paginator = InlinePaginator(fetch, page_size=10)
+
+    await paginator.get_page("query", "")
+    await settle()
+    tracks, next_offset = await paginator.get_page("query", "10")
+
+    assert len(tracks) == 5
+    assert next_offset == ""
+
+
+@pytest.mark.asyncio
+async def test_duplicate_tracks_end_result_set():
+    """Тест пропуска повторов и окончания выдачи на странице без новых треков."""
+    fetch = AsyncMock(return_value=make_tracks(0, 5))
+    paginator = InlinePaginator(fetch, page_size=10)
+
+    tracks, next_offset = await paginator.get_page("query", "")
+
+    assert len(tracks) == 5
+    assert next_offset == ""
+    assert fetch.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_is_retried():
+    """Тест повторной загрузки страницы после ошибки."""
+    fetch = AsyncMock(side_effect=[None, make_tracks(0, 10), []])
+    paginator = InlinePaginator(fetch, page_size=10)
+
+    tracks, next_offset = await paginator.get_page("query", "")
+    assert tracks == []
+    assert next_offset == ""
+
+    tracks, _ = await paginator.get_page("query", "")
+    assert len(tracks) == 10
+
+
+@pytest.mark.asyncio
+async def test_stale_page_not_kept():
+    """Тест того, что сохраненные при сбое API результаты не запоминаются."""
+    stale = [dict(track, stale=True) for track in make_tracks(0, 20)]
+    fetch = AsyncMock(side_effect=[stale, make_tracks(0, 20), make_tracks(20, 20), []])
+    paginator = InlinePaginator(fetch, page_size=10)
+
+    tracks, _ = await paginator.get_page("query", "")
+    await settle()
+    assert tracks[0]['stale'] is True
+    fetch.assert_awaited_once()
+
+    tracks, _ = await paginator.get_page("query", "")
+    assert 'stale' not in tracks[0]
+    assert fetch.await_args_list[1].args == ("query", 0)
+
+
+def test_parse_offset():
+    """Тест разбора смещения inline-запроса."""
+    assert InlinePaginator.parse_offset("") == 0
+    assert InlinePaginator.parse_offset("20") == 20
+    assert InlinePaginator.parse_offset("abc") == 0
+
+
+def test_rank_tracks():
+    """Тест отбора и ранжирования треков по уточненному запросу."""
+    tracks = [
+        {'id': '1', 'title': 'Enter Sandman', 'artists': ['Metallica']},
+        {'id': '2', 'title': 'Metal Heart', 'artists': ['Accept']},
+        {'id': '3', 'title': 'Metallica Medley', 'artists': ['Cover Band']},
+        {'id': '4', 'title': 'Heavy Metal', 'artists': ['Sammy Hagar']},
+    ]
+
+    ranked = rank_tracks("metallica", tracks)
+
+    assert [t['id'] for t in ranked] == ['3', '1']
+
+
+@pytest.mark.asyncio
+async def test_provisional_page_from_prefix():
+    """Тест предварительной выдачи из результатов более короткого запроса."""
+    tracks = [
+        {'id': '1', 'title': 'Master of Puppets', 'artists': ['Metallica']},
+        {'id': '2', 'title': 'Metal Heart', 'artists': ['Accept']},
+    ]
+    fetch = make_fetch([tracks])
+    paginator = InlinePaginator(fetch, page_size=10)
+
+    assert paginator.provisional_page("metall") is None
+    await paginator.get_page("metal", "")
+    await settle()
+
+    provisional = paginator.provisional_page("Metall")
+    assert [t['id'] for t in provisional] == ['1']
+    assert paginator.provisional_page("metalx") is None
+    assert paginator.provisional_page("metal") is None
+    assert paginator.stats()['provisional'] == 1
+
+
+@pytest.mark.asyncio
+async def test_provisional_page_uses_longest_matching_prefix():
+    """Тест выбора самого длинного сохраненного запроса по индексу."""
+    pages = {
+        'met': [{'id': '1', 'title': 'Master of Puppets', 'artists': ['Metallica']}],
+        'metal': [{'id': '2', 'title': 'Metal Heart', 'artists': ['Accept']}],
+        'metala': [{'id': '3', 'title': 'Other', 'artists': ['Metallica']}],
+        'metalb': [{'id': '4', 'title': 'Other', 'artists': ['Metallica']}],
+        'metallica master': [{'id': '5', 'title': 'Master', 'artists': ['Metallica']}],
+    }
+    fetch = AsyncMock(side_effect=lambda query, page: pages[query] if page == 0 else [])
+    paginator = InlinePaginator(fetch, page_size=10)
+    for query in pages:
+        await paginator.get_page(query, "")
+    await settle()
+
+    # "metal" - самое длинное начало, но треков под запрос в нем нет
+    provisional = paginator.provisional_page("metallica")
+    assert [t['id'] for t in provisional] == ['1']
+
+    paginator._sets.pop('met')
+    assert paginator.provisional_page("metallica") is None
+    assert 'met' not in paginator._keys
+
+
+@pytest.mark.asyncio
+async def test_first_page_prefetches_top_results():
+    """Тест передачи первых результатов первой страницы на подготовку к скачиванию."""
+    fetch = make_fetch([make_tracks(0, 20)])
+    prefetch = Mock()
+    paginator = InlinePaginator(fetch, page_size=10, prefetch=prefetch, prefetch_top_k=2)
+
+    await paginator.get_page("query", "")
+    await settle()
+    await paginator.get_page("query", "10")
+
+    prefetch.assert_called_once_with(['0', '1'])
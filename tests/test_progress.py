@@ -0,0 +1,102 @@
+"""
+Тесты для учета хода скачивания.
+
+Этот модуль тестирует запись о скачивании (TTFB, скорость, общее время)
+и ограничение частоты уведомлений о прогрессе.
+"""
+
+import pytest
+from unittest.mock import AsyncMock
+from prometheus_client import REGISTRY
+from bot.utils.progress import DownloadStats, ThrottledProgress
+
+
+class FakeTimer:
+    """Управляемые часы для тестов."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def sample(name):
+    return REGISTRY.get_sample_value(name) or 0
+
+
+def test_download_stats():
+    """Тест расчета TTFB, скорости и общего времени скачивания."""
+    timer = FakeTimer()
+    calls = []
+    stats = DownloadStats('https://s1.storage.yandex.net/get-mp3/abc', lambda *args: calls.append(args), timer)
+    stats.start(3000)
+    ttfb_count = sample('aamuzbot_download_ttfb_seconds_count')
+
+    timer.now = 0.5
+    stats.add(1000)
+    timer.now = 1.5
+    stats.add(2000)
+    stats.finish()
+
+    assert calls == [(1000, 3000), (3000, 3000)]
+    assert stats.as_dict() == {
+        'host': 's1.storage.yandex.net',
+        'received': 3000,
+        'total': 3000,
+        'ttfb': 0.5,
+        'throughput': 3000.0,
+        'elapsed': 1.5,
+    }
+    assert sample('aamuzbot_download_ttfb_seconds_count') == ttfb_count + 1
+
+
+def test_download_stats_progress_error_ignored():
+    """Тест того, что ошибка уведомления не прерывает скачивание."""
+    def progress(received, total):
+        raise RuntimeError('edit failed')
+
+    stats = DownloadStats('https://test.com/track.mp3', progress)
+    stats.add(10)
+
+    assert stats.received == 10
+
+
+@pytest.mark.asyncio
+async def test_throttled_progress():
+    """Тест уведомлений не чаще интервала и шага в процентах."""
+    timer = FakeTimer()
+    report = AsyncMock()
+    progress = ThrottledProgress(report, interval=1.0, step=10.0, timer=timer)
+
+    # Интервал еще не прошел
+    progress(50, 100)
+    timer.now = 1.0
+    progress(50, 100)
+    await progress.wait()
+    # Прогресс вырос меньше чем на шаг
+    timer.now = 2.0
+    progress(55, 100)
+    # Завершение не ограничивается шагом
+    timer.now = 3.0
+    progress(100, 100)
+    await progress.wait()
+
+    assert [call.args for call in report.await_args_list] == [(50, 100), (100, 100)]
+    assert progress.reports == 2
+
+
+@pytest.mark.asyncio
+async def test_throttled_progress_skips_while_reporting():
+    """Тест пропуска уведомлений, пока выполняется предыдущее."""
+    timer = FakeTimer()
+    report = AsyncMock()
+    progress = ThrottledProgress(report, interval=0, step=0, timer=timer)
+
+    progress(10, None)
+    progress(20, None)
+    await progress.wait()
+    progress(30, None)
+    await progress.wait()
+
+    assert [call.args for call in report.await_args_list] == [(10, None), (30, None)]
@@ -0,0 +1,141 @@
+"""
+Тесты для ограничителей запросов к внешнему API.
+
+Этот модуль тестирует token bucket, адаптивный лимит параллельности
+по схеме AIMD и повтор запросов при перегрузке сервера.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from yandex_music.exceptions import NetworkError, NotFoundError
+from bot.utils.ratelimit import AdaptiveConcurrency, TokenBucket, UpstreamLimiter
+
+
+class FakeTimer:
+    """Управляемые часы для тестов."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_limiter(**kwargs):
+    defaults = dict(
+        bucket=TokenBucket(rate=1000, burst=1000),
+        concurrency=AdaptiveConcurrency(initial=4),
+        retry_on=(NetworkError,),
+        no_retry=(NotFoundError,),
+        backoff_base=0.001,
+        backoff_max=0.001,
+    )
+    defaults.update(kwargs)
+    return UpstreamLimiter('test', **defaults)
+
+
+def test_token_bucket_burst_and_refill():
+    """Тест выдачи всплеска жетонов и ожидания пополнения."""
+    timer = FakeTimer()
+    bucket = TokenBucket(rate=10, burst=3, timer=timer)
+
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Жетоны резервируются по очереди
+    assert bucket.reserve() == pytest.approx(0.1)
+    assert bucket.reserve() == pytest.approx(0.2)
+
+    timer.now = 1.0
+    assert bucket.reserve() == 0.0
+
+
+def test_aimd_limit_adjustment():
+    """Тест аддитивного роста и мультипликативного уменьшения лимита."""
+    limiter = AdaptiveConcurrency(initial=4, min_limit=1, max_limit=8)
+
+    limiter.inflight = 1
+    limiter.release(0, overloaded=False)
+    assert limiter.limit == pytest.approx(4.25)
+
+    # Две перегрузки из одного поколения уменьшают лимит один раз
+    limiter.inflight = 2
+    limiter.release(0, overloaded=True)
+    limiter.release(0, overloaded=True)
+    assert limiter.limit == pytest.approx(2.125)
+
+    # Отмененный запрос не влияет на лимит
+    limiter.inflight = 1
+    limiter.release(1)
+    assert limiter.limit == pytest.approx(2.125)
+    assert limiter.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrency_waiters_and_cancellation():
+    """Тест очереди ожидающих слот и отмены ожидания."""
+    limiter = AdaptiveConcurrency(initial=1)
+    generation = await limiter.acquire()
+
+    cancelled = asyncio.ensure_future(limiter.acquire())
+    waiting = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.sleep(0)
+
+    limiter.release(generation, overloaded=False)
+    await asyncio.wait_for(waiting, 1)
+    assert limiter.inflight == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_on_overload():
+    """Тест повтора при перегрузке и уменьшения лимита."""
+    limiter = make_limiter()
+    func = AsyncMock(side_effect=[NetworkError('Too Many Requests'), 'ok'])
+
+    assert await limiter.call(func, 'query') == 'ok'
+
+    assert func.await_count == 2
+    assert limiter.concurrency.limit < 4
+    assert limiter.stats()['retries'] == 1
+    assert limiter.stats()['inflight'] == 0
+
+
+@pytest.mark.asyncio
+async def test_no_retry_on_client_errors():
+    """Тест отсутствия повторов для ошибок запроса."""
+    limiter = make_limiter()
+    for error in (NotFoundError('not found'), ValueError('bug')):
+        func = AsyncMock(side_effect=error)
+        with pytest.raises(type(error)):
+            await limiter.call(func)
+        func.assert_awaited_once()
+
+    assert limiter.stats()['failures'] == 2
+    assert limiter.concurrency.limit >= 4
+
+
+@pytest.mark.asyncio
+async def test_retries_exhausted():
+    """Тест ошибки после исчерпания повторов."""
+    limiter = make_limiter(retries=2)
+    func = AsyncMock(side_effect=NetworkError('Bad Gateway'))
+
+    with pytest.raises(NetworkError):
+        await limiter.call(func)
+
+    assert func.await_count == 3
+    assert limiter.stats()['overloads'] == 3
+
+
+@pytest.mark.asyncio
+async def test_wait_time_reported():
+    """Тест передачи времени ожидания лимитов в метрики."""
+    waits = []
+    limiter = make_limiter(bucket=TokenBucket(rate=10, burst=1), on_wait=waits.append)
+
+    await limiter.call(AsyncMock())
+    await limiter.call(AsyncMock())
+
+    assert len(waits) == 2
+    assert waits[1] >= 0.05
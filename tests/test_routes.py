@@ -0,0 +1,168 @@
+"""
+Тесты для веб-маршрута скачивания трека.
+
+Этот модуль тестирует отдачу /track/{id}.mp3: Content-Length, частичные
+ответы по заголовку Range, If-Range и условные запросы по ETag.
+"""
+
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock, patch
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from bot.services.blob_cache import BlobCache
+from bot.services.music import MusicService
+from bot.web.ranges import RangeNotSatisfiable, etag_matches, parse_range
+from bot.web.routes import routes
+
+
+TRACK_INFO = {
+    'id': '123',
+    'title': 'Test Track',
+    'artists': ['Test Artist'],
+    'duration_ms': 180000,
+    'download_link': 'https://test.com/track.mp3',
+    'bitrate': 320,
+}
+BODY = bytes(range(256)) * 40
+
+
+@pytest_asyncio.fixture
+async def service(tmp_path):
+    """Сервис с треком, уже сохраненным в дисковый кэш."""
+    cache = BlobCache(str(tmp_path), max_bytes=1 << 20)
+    writer = cache.writer(BlobCache.make_key('123', 320))
+    await writer.write(BODY)
+    await writer.commit()
+    service = MusicService(client=AsyncMock(), blob_cache=cache)
+    service.get_track_full_info = AsyncMock(side_effect=lambda track_id: dict(TRACK_INFO))
+    return service
+
+
+@pytest_asyncio.fixture
+async def client(service):
+    app = web.Application()
+    app.add_routes(routes)
+    with patch('bot.web.routes.music_service', service):
+        async with TestClient(TestServer(app)) as client:
+            yield client
+
+
+@pytest.mark.asyncio
+async def test_full_response_has_length_and_etag(client, service):
+    """Тест полного ответа с Content-Length, ETag и Accept-Ranges."""
+    response = await client.get('/track/123.mp3')
+    data = await response.read()
+    header = service.build_track_header(TRACK_INFO)
+
+    assert response.status == 200
+    assert data == header + BODY
+    assert int(response.headers['Content-Length']) == len(header) + len(BODY)
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['ETag']
+
+
+@pytest.mark.asyncio
+async def test_range_request_from_cache(client, service):
+    """Тест частичного ответа, попадающего на тег и данные трека."""
+    full = service.build_track_header(TRACK_INFO) + BODY
+    start, end = len(full) // 2 - 5, len(full) // 2 + 100
+
+    response = await client.get('/track/123.mp3', headers={'Range': f'bytes={start}-{end}'})
+
+    assert response.status == 206
+    assert await response.read() == full[start:end + 1]
+    assert response.headers['Content-Range'] == f'bytes {start}-{end}/{len(full)}'
+
+
+@pytest.mark.asyncio
+async def test_range_within_tag_and_suffix(client, service):
+    """Тест диапазона внутри ID3 тега и суффиксного диапазона."""
+    full = service.build_track_header(TRACK_INFO) + BODY
+
+    response = await client.get('/track/123.mp3', headers={'Range': 'bytes=0-9'})
+    assert await response.read() == full[:10]
+
+    response = await client.get('/track/123.mp3', headers={'Range': 'bytes=-100'})
+    assert await response.read() == full[-100:]
+
+
+@pytest.mark.asyncio
+async def test_if_none_match_returns_304(client):
+    """Тест условного запроса с совпадающим ETag."""
+    etag = (await client.get('/track/123.mp3')).headers['ETag']
+
+    response = await client.get('/track/123.mp3', headers={'If-None-Match': etag})
+
+    assert response.status == 304
+    assert response.headers['ETag'] == etag
+
+
+@pytest.mark.asyncio
+async def test_if_range_mismatch_returns_full_file(client, service):
+    """Тест игнорирования Range при устаревшем If-Range."""
+    full = service.build_track_header(TRACK_INFO) + BODY
+
+    response = await client.get(
+        '/track/123.mp3',
+        headers={'Range': 'bytes=0-9', 'If-Range': '"old-etag"'}
+    )
+
+    assert response.status == 200
+    assert await response.read() == full
+
+
+@pytest.mark.asyncio
+async def test_unsatisfiable_range(client, service):
+    """Тест диапазона за пределами файла."""
+    total = len(service.build_track_header(TRACK_INFO)) + len(BODY)
+
+    response = await client.get('/track/123.mp3', headers={'Range': f'bytes={total}-'})
+
+    assert response.status == 416
+    assert response.headers['Content-Range'] == f'bytes */{total}'
+
+
+@pytest.mark.asyncio
+async def test_head_without_layout_does_not_open_stream(client, service):
+    """Тест ответа на HEAD, когда размер трека неизвестен."""
+    service.get_track_full_info = AsyncMock(
+        side_effect=lambda track_id: dict(TRACK_INFO, bitrate=None)
+    )
+    service.open_track_stream = AsyncMock()
+
+    response = await client.head('/track/123.mp3')
+
+    assert response.status == 200
+    assert response.headers['Content-Type'] == 'audio/mpeg'
+    service.open_track_stream.assert_not_called()
+
+
+def test_parse_range():
+    """Тест разбора заголовка Range."""
+    assert parse_range('bytes=0-99', 1000) == (0, 99)
+    assert parse_range('bytes=900-', 1000) == (900, 999)
+    assert parse_range('bytes=-100', 1000) == (900, 999)
+    assert parse_range('bytes=0-5000', 1000) == (0, 999)
+    assert parse_range('bytes=0-1,5-6', 1000) is None
+    assert parse_range('items=0-1', 1000) is None
+    assert parse_range('bytes=abc', 1000) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range('bytes=1000-', 1000)
+
+
+def test_etag_matches():
+    """Тест сравнения ETag из If-None-Match."""
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches('*', '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
+
+
+@pytest.mark.asyncio
+async def test_invalid_track_id_not_found(client):
+    """Тест запроса с некорректным ID трека."""
+    response = await client.get('/track/abc.mp3')
+
+    assert response.status == 404
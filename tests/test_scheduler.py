@@ -0,0 +1,126 @@
+"""
+Тесты для планировщика загрузок.
+
+Этот модуль тестирует ограничение параллельности, справедливое
+распределение загрузок между чатами, отмену и остановку планировщика.
+"""
+
+import asyncio
+import pytest
+from bot.services.scheduler import DownloadScheduler
+
+
+def make_job(log, name, release=None):
+    """Создает функцию загрузки, записывающую порядок выполнения."""
+    async def job():
+        log.append(name)
+        if release is not None:
+            await release.wait()
+    return lambda: job()
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit():
+    """Тест того, что одновременно выполняется не больше max_concurrent загрузок."""
+    scheduler = DownloadScheduler(max_concurrent=2, max_queue=10, max_per_chat=10)
+    release = asyncio.Event()
+    log = []
+    
+    for i in range(5):
+        scheduler.submit(i, make_job(log, i, release))
+    await asyncio.sleep(0.01)
+    
+    assert scheduler.running == 2
+    assert scheduler.queued == 3
+    
+    release.set()
+    await scheduler.shutdown(timeout=1)
+    assert sorted(log) == [0, 1, 2, 3, 4]
+    assert scheduler.stats()['completed'] == 5
+
+
+@pytest.mark.asyncio
+async def test_round_robin_between_chats():
+    """Тест чередования загрузок разных чатов."""
+    scheduler = DownloadScheduler(max_concurrent=1, max_queue=10, max_per_chat=10)
+    release = asyncio.Event()
+    log = []
+    
+    # Первая загрузка занимает единственный слот
+    scheduler.submit(0, make_job(log, 'blocker', release))
+    await asyncio.sleep(0)
+    
+    assert scheduler.submit(1, make_job(log, 'a1')) == 1
+    assert scheduler.submit(1, make_job(log, 'a2')) == 2
+    assert scheduler.submit(1, make_job(log, 'a3')) == 3
+    # Загрузка другого чата обгоняет очередь первого
+    assert scheduler.submit(2, make_job(log, 'b1')) == 2
+    
+    release.set()
+    await scheduler.shutdown(timeout=1)
+    assert log == ['blocker', 'a1', 'b1', 'a2', 'a3']
+
+
+@pytest.mark.asyncio
+async def test_queue_limits():
+    """Тест отклонения загрузок при переполнении очереди."""
+    scheduler = DownloadScheduler(max_concurrent=1, max_queue=3, max_per_chat=2)
+    release = asyncio.Event()
+    log = []
+    
+    scheduler.submit(0, make_job(log, 'blocker', release))
+    await asyncio.sleep(0)
+    
+    assert scheduler.submit(1, make_job(log, 'a1')) is not None
+    assert scheduler.submit(1, make_job(log, 'a2')) is not None
+    # Превышен лимит на чат
+    assert scheduler.submit(1, make_job(log, 'a3')) is None
+    assert scheduler.submit(2, make_job(log, 'b1')) is not None
+    # Превышен общий лимит очереди
+    assert scheduler.submit(3, make_job(log, 'c1')) is None
+    assert scheduler.stats()['rejected'] == 2
+    
+    release.set()
+    await scheduler.shutdown(timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_cancel_chat():
+    """Тест отмены ожидающих и выполняющихся загрузок чата."""
+    scheduler = DownloadScheduler(max_concurrent=1, max_queue=10, max_per_chat=10)
+    release = asyncio.Event()
+    log = []
+    cancelled = []
+    
+    async def on_cancel():
+        cancelled.append(True)
+    
+    scheduler.submit(1, make_job(log, 'a1', release), on_cancel=on_cancel)
+    scheduler.submit(1, make_job(log, 'a2'), on_cancel=on_cancel)
+    scheduler.submit(2, make_job(log, 'b1'))
+    await asyncio.sleep(0.01)
+    
+    assert await scheduler.cancel(1) == 2
+    await scheduler.shutdown(timeout=1)
+    
+    assert log == ['a1', 'b1']
+    assert len(cancelled) == 2
+    assert scheduler.stats()['cancelled'] == 2
+
+
+@pytest.mark.asyncio
+async def test_shutdown_cancels_after_timeout():
+    """Тест отмены загрузок, не завершившихся за время остановки."""
+    scheduler = DownloadScheduler(max_concurrent=1, max_queue=10, max_per_chat=10)
+    log = []
+    
+    scheduler.submit(1, make_job(log, 'stuck', asyncio.Event()))
+    scheduler.submit(2, make_job(log, 'queued'))
+    await asyncio.sleep(0)
+    
+    await scheduler.shutdown(timeout=0.05)
+    
+    assert log == ['stuck']
+    assert scheduler.running == 0
+    assert scheduler.queued == 0
+    assert scheduler.submit(3, make_job(log, 'late')) is None
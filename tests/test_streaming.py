@@ -0,0 +1,62 @@
+"""
+Тесты для буферизованной передачи потоков.
+
+Этот модуль тестирует buffered: сохранение порядка блоков, ограничение
+чтения источника размером буфера и передачу ошибок источника.
+"""
+
+import asyncio
+import pytest
+from bot.utils.streaming import buffered
+
+
+class Source:
+    """Источник, считающий прочитанные блоки."""
+
+    def __init__(self, count: int, error: Exception = None):
+        self.count = count
+        self.error = error
+        self.read = 0
+        self.closed = False
+
+    async def __aiter__(self):
+        try:
+            for i in range(self.count):
+                self.read += 1
+                yield bytes([i])
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_buffered_preserves_order():
+    """Тест передачи всех блоков в исходном порядке."""
+    chunks = [chunk async for chunk in buffered(Source(10), max_chunks=2)]
+
+    assert chunks == [bytes([i]) for i in range(10)]
+
+
+@pytest.mark.asyncio
+async def test_buffered_applies_backpressure():
+    """Тест того, что источник не читается дальше размера буфера."""
+    source = Source(100)
+    stream = buffered(source, max_chunks=3)
+
+    assert await stream.__anext__() == b'\x00'
+    await asyncio.sleep(0.01)
+
+    # Один блок отдан, три лежат в буфере, один ждет места в очереди
+    assert source.read <= 5
+    await stream.aclose()
+    await asyncio.sleep(0)
+    assert source.closed
+
+
+@pytest.mark.asyncio
+async def test_buffered_propagates_errors():
+    """Тест передачи ошибки источника получателю."""
+    with pytest.raises(ValueError):
+        async for _ in buffered(Source(3, error=ValueError("broken")), max_chunks=2):
+            pass
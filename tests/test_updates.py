@@ -0,0 +1,146 @@
+"""
+Тесты для очереди входящих обновлений.
+
+Этот модуль тестирует фоновую обработку обновлений: порядок внутри чата,
+параллельность между чатами, переполнение очереди и остановку.
+"""
+
+import asyncio
+import pytest
+from aiogram.types import Update
+from bot.services.updates import UpdateQueue
+
+
+def message_update(update_id, chat_id, text="test"):
+    """Создает обновление с текстовым сообщением."""
+    return Update.model_validate({
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 0,
+            'chat': {'id': chat_id, 'type': 'private'},
+            'text': text,
+        },
+    })
+
+
+def inline_update(update_id, user_id, query="test"):
+    """Создает обновление с inline-запросом."""
+    return Update.model_validate({
+        'update_id': update_id,
+        'inline_query': {
+            'id': str(update_id),
+            'from': {'id': user_id, 'is_bot': False, 'first_name': 'Test'},
+            'query': query,
+            'offset': '',
+        },
+    })
+
+
+@pytest.mark.asyncio
+async def test_order_within_chat_and_parallel_chats():
+    """Тест порядка обработки внутри чата и параллельности между чатами."""
+    log = []
+    release = asyncio.Event()
+    
+    async def handler(update):
+        if update.update_id == 1:
+            await release.wait()
+        log.append(update.update_id)
+    
+    queue = UpdateQueue(handler, workers=4)
+    await queue.start()
+    
+    assert queue.put(message_update(1, chat_id=100))
+    assert queue.put(message_update(2, chat_id=100))
+    assert queue.put(message_update(3, chat_id=200))
+    await asyncio.sleep(0.01)
+    
+    # Второй чат не ждет медленное обновление первого,
+    # а второе обновление первого чата ждет первое
+    assert log == [3]
+    
+    release.set()
+    await queue.shutdown(timeout=1)
+    assert log == [3, 1, 2]
+    assert queue.stats()['processed'] == 3
+
+
+@pytest.mark.asyncio
+async def test_inline_queries_are_not_serialized():
+    """Тест параллельной обработки inline-запросов одного пользователя."""
+    started = []
+    release = asyncio.Event()
+    
+    async def handler(update):
+        started.append(update.update_id)
+        await release.wait()
+    
+    queue = UpdateQueue(handler, workers=4)
+    await queue.start()
+    queue.put(inline_update(1, user_id=100, query="rad"))
+    queue.put(inline_update(2, user_id=100, query="radio"))
+    await asyncio.sleep(0.01)
+    
+    assert sorted(started) == [1, 2]
+    release.set()
+    await queue.shutdown(timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_overflow_policies():
+    """Тест отказа и отбрасывания обновлений при переполнении."""
+    async def handler(update):
+        pass
+    
+    rejecting = UpdateQueue(handler, max_size=1, overflow="reject")
+    assert rejecting.put(message_update(1, chat_id=100))
+    assert not rejecting.put(message_update(2, chat_id=100))
+    assert rejecting.stats()['rejected'] == 1
+    
+    dropping = UpdateQueue(handler, max_size=1, overflow="drop")
+    assert dropping.put(message_update(1, chat_id=100))
+    assert dropping.put(message_update(2, chat_id=100))
+    assert dropping.stats()['dropped'] == 1
+    assert len(dropping) == 1
+
+
+@pytest.mark.asyncio
+async def test_shutdown_drains_queue_and_rejects_new_updates():
+    """Тест обработки оставшихся обновлений при остановке."""
+    log = []
+    
+    async def handler(update):
+        await asyncio.sleep(0.01)
+        log.append(update.update_id)
+    
+    queue = UpdateQueue(handler, workers=1)
+    await queue.start()
+    for i in range(3):
+        queue.put(message_update(i, chat_id=i))
+    
+    await queue.shutdown(timeout=1)
+    
+    assert sorted(log) == [0, 1, 2]
+    assert not queue.put(message_update(10, chat_id=1))
+
+
+@pytest.mark.asyncio
+async def test_handler_errors_do_not_stop_workers():
+    """Тест того, что ошибка обработчика не останавливает очередь."""
+    log = []
+    
+    async def handler(update):
+        if update.update_id == 1:
+            raise RuntimeError("Test error")
+        log.append(update.update_id)
+    
+    queue = UpdateQueue(handler, workers=1)
+    await queue.start()
+    queue.put(message_update(1, chat_id=100))
+    queue.put(message_update(2, chat_id=100))
+    
+    await queue.shutdown(timeout=1)
+    
+    assert log == [2]
+    assert queue.stats()['failed'] == 1